@@ -31,6 +31,52 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str
     FRONTEND_DOMAIN: str
     ENV: str
+    RENDER_CACHE_DIR: str = "videos/render_cache"
+    RENDER_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: int = 6 * 60 * 60
+    RESULT_CACHE_MAX_ENTRIES: int = 512
+    RENDER_SECTION_WORKERS: int = 0
+    RENDER_SECTION_MIN_ANIMATIONS: int = 12
+    RENDER_PREFLIGHT: bool = True
+    CODE_CHECK_LLM_FALLBACK: bool = True
+    SCENE_CHECKER: bool = True
+    SCENE_CHECK_TIMEOUT: int = 60
+    RENDER_POOL_SIZE: int = 2
+    RENDER_SLOTS: int = 2
+    # "single" runs a job in one task; "split" chains stage tasks over the llm and render queues
+    PIPELINE_MODE: str = "single"
+    FREE_USER_MAX_ACTIVE_JOBS: int = 2
+    PAID_USER_MAX_ACTIVE_JOBS: int = 5
+    # LLM tokens (input + output) a user may spend per UTC day; 0 means no quota
+    FREE_USER_DAILY_TOKEN_QUOTA: int = 0
+    PAID_USER_DAILY_TOKEN_QUOTA: int = 0
+    SCHEDULER_BACKLOG_PENALTY: int = 2
+    ACTIVE_JOB_TTL_SECONDS: int = 2 * 60 * 60
+    ETA_SAMPLE_WINDOW: int = 200
+    ETA_PARALLEL_JOBS: int = 4
+    REDIS_MAX_CONNECTIONS: int = 50
+    METRICS_ENABLED: bool = True
+    # Seconds between flushes of a process's buffered metrics to Redis
+    METRICS_FLUSH_SECONDS: float = 5.0
+    # Bearer token a scraper must send to /metrics; empty turns the endpoint off
+    METRICS_TOKEN: str = ""
+    # "redis", "sqlite", "memory" or "off"; "replay" mode fails on a miss instead of calling Gemini
+    LLM_CACHE: str = "redis"
+    LLM_CACHE_MODE: str = "readwrite"
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    LLM_CACHE_SQLITE_PATH: str = "llm_cache.sqlite3"
+    # Send each stage only its tagged, budgeted rule sections instead of the whole block
+    RULE_SELECTION: bool = True
+    RULE_RANKING: bool = True
+    # Generate the description for a keyword-predicted animation type while the feasibility check runs
+    SPECULATIVE_DESCRIPTION: bool = True
+    MANIM_RENDER_TIMEOUT: int = 1000
+    PREFLIGHT_TIMEOUT: int = 180
+    RENDER_CPU_LIMIT_SECONDS: int = 3600
+    RENDER_MEMORY_LIMIT_MB: int = 6144
+    TEX_CACHE_DIR: str = "videos/tex_cache"
+    TEX_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
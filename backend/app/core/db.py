@@ -5,9 +5,13 @@ from app.models.RefreshToken import RefreshToken
 from app.models.UserHistory import UsersHistory
 from app.config import Config
 import asyncio
+import os
 
-# Global variable to store the client for workers
+# Process-wide client for workers, bound to the event loop it was created on
 _worker_client = None
+_worker_loop = None
+_worker_pid = None
+_worker_init_lock = None
 
 async def init_db(app):
     client = AsyncMongoClient(Config.MONGODB_URL)
@@ -17,12 +21,20 @@ async def init_db(app):
     )
     app.state.mongo_client = client
 
+def _worker_client_is_current():
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return _worker_client is not None and _worker_loop is loop and _worker_pid == os.getpid()
+
 async def init_beanie_for_workers():
     """Initialize Beanie for Celery workers without FastAPI app context"""
-    global _worker_client
+    global _worker_client, _worker_loop, _worker_pid
     
-    # Close existing client if it exists and was created in a different loop
-    if _worker_client is not None:
+    # Close the existing client if it belongs to this process but a different loop.
+    # A client inherited through fork is dropped, never closed: its sockets are the parent's.
+    if _worker_client is not None and _worker_pid == os.getpid():
         try:
             await _worker_client.close()
         except Exception:
@@ -34,11 +46,29 @@ async def init_beanie_for_workers():
         database=_worker_client["manimVideoGenerator"], 
         document_models=[Users, RefreshToken, UsersHistory]
     )
+    _worker_loop = asyncio.get_running_loop()
+    _worker_pid = os.getpid()
+    return _worker_client
+
+async def get_worker_db():
+    """Return the worker's client, running init_beanie only when the process or loop changed"""
+    global _worker_init_lock
+    if _worker_client_is_current():
+        return _worker_client
+
+    loop = asyncio.get_running_loop()
+    if _worker_init_lock is None or _worker_init_lock[0] is not loop:
+        _worker_init_lock = (loop, asyncio.Lock())
+    async with _worker_init_lock[1]:
+        if not _worker_client_is_current():
+            await init_beanie_for_workers()
     return _worker_client
 
 async def close_worker_db():
     """Close the worker database connection"""
-    global _worker_client
-    if _worker_client is not None:
+    global _worker_client, _worker_loop, _worker_pid
+    if _worker_client is not None and _worker_pid == os.getpid():
         await _worker_client.close()
-        _worker_client = None
\ No newline at end of file
+    _worker_client = None
+    _worker_loop = None
+    _worker_pid = None
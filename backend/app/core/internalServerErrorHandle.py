@@ -1,5 +1,6 @@
 import asyncio
 from google.api_core.exceptions import InternalServerError
+from app.core.metrics import increment
 
 
 async def retry(agent_executor, payload, retries=3, delay=1):
@@ -9,6 +10,7 @@ async def retry(agent_executor, payload, retries=3, delay=1):
         except InternalServerError as e:
             if attempt < retries - 1:
                 wait_time =  delay * (2 ** attempt)
+                increment("manim_llm_retries_total")
                 print(f"Internal error ({e}), retrying in {wait_time}s... (attempt {attempt+1})")
                 await asyncio.sleep(wait_time)
             else:
@@ -1,17 +1,28 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from app.core.llmCache import llmCache
+from app.core.llmUsage import llmUsageTracker
 import os
 
 
 load_dotenv()
 
+# AgentExecutor streams the model, and streamed calls bypass the cache
+cacheable = llmCache is not None
+
 
 llmFlash = ChatGoogleGenerativeAI(
     api_key = os.getenv("GOOGLE_API_KEY"),
     model="gemini-2.5-flash",
+    cache=llmCache,
+    disable_streaming=cacheable,
+    callbacks=[llmUsageTracker],
 )
 
 llmPro = ChatGoogleGenerativeAI(
     api_key = os.getenv("GOOGLE_API_KEY"),
     model="gemini-2.5-pro",
+    cache=llmCache,
+    disable_streaming=cacheable,
+    callbacks=[llmUsageTracker],
 )
@@ -0,0 +1,231 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Sequence
+from cachetools import LRUCache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from redis.exceptions import RedisError
+from app.config import Config
+from app.core.logger import logger
+from app.core.redis import r
+
+LLM_CACHE_PREFIX = "llmCache:"
+# Responses of a running job, held back until it ends: a job that failed must
+# not leave answers behind that replay the same failure when it is resubmitted
+PENDING_PREFIX = "llmCachePending:"
+
+# Code agents are prompted with a fresh `Animation_<uuid>` file and class name.
+# It is swapped for a placeholder in keys and stored responses, and back for
+# the current name on a hit, so a resubmitted scene still hits the cache.
+SCENE_NAME_PATTERN = re.compile(r"\bAnimation_[0-9a-f]{8}\b")
+SCENE_NAME_PLACEHOLDER = "Animation_SCENE"
+
+# Jobs submitted with bypassCache still refresh the cache, they just never read it
+skipLlmCacheReads: ContextVar[bool] = ContextVar("skipLlmCacheReads", default=False)
+
+# Id of the job whose responses are held back in this context; None writes through
+llmCacheJob: ContextVar[Optional[str]] = ContextVar("llmCacheJob", default=None)
+
+
+class LlmCacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"No recorded LLM response for prompt {key[:12]}")
+
+
+def llmCacheKey(prompt: str, llm_string: str) -> str:
+    # langchain renders the messages into `prompt`, and the model name,
+    # temperature, bound tools and structured-output schema into `llm_string`
+    prompt = SCENE_NAME_PATTERN.sub(SCENE_NAME_PLACEHOLDER, prompt)
+    return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _sceneName(prompt: str) -> Optional[str]:
+    match = SCENE_NAME_PATTERN.search(prompt)
+    return match.group(0) if match else None
+
+
+class _RedisTier:
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return r.get(f"{LLM_CACHE_PREFIX}{key}")
+        except RedisError as e:
+            logger.warning(f"LLM cache lookup in Redis failed: {e}")
+            return None
+
+    def set(self, key: str, value: str):
+        try:
+            r.set(f"{LLM_CACHE_PREFIX}{key}", value, ex=Config.LLM_CACHE_TTL_SECONDS)
+        except RedisError as e:
+            logger.warning(f"LLM cache write to Redis failed: {e}")
+
+    def clear(self):
+        for key in r.scan_iter(f"{LLM_CACHE_PREFIX}*"):
+            r.delete(key)
+
+
+class _SqliteTier:
+    """File-backed tier; handy for recording fixtures that a replay run reads back."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        expired = Config.LLM_CACHE_TTL_SECONDS and time.time() - created > Config.LLM_CACHE_TTL_SECONDS
+        # Recorded fixtures stay valid for replays however old they are
+        if expired and Config.LLM_CACHE_MODE != "replay":
+            return None
+        return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+
+
+class TieredLlmCache(BaseCache):
+    """LangChain cache: a per-process LRU in front of a shared Redis or SQLite tier.
+
+    In "replay" mode a miss raises LlmCacheMiss instead of reaching Gemini, so
+    a recorded run can be replayed deterministically. Responses made for a job
+    (see llmCacheJob) are only cached by settleJob once the job succeeded.
+    """
+
+    def __init__(self, tier=None, maxEntries: int = 1024, replay: bool = False):
+        self._local = LRUCache(maxsize=maxEntries)
+        self._localLock = threading.Lock()
+        self._tier = tier
+        self._replay = replay
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = llmCacheKey(prompt, llm_string)
+        if skipLlmCacheReads.get() and not self._replay:
+            return None
+
+        with self._localLock:
+            raw = self._local.get(key)
+        if raw is None and self._tier is not None:
+            raw = self._tier.get(key)
+            if raw is not None:
+                with self._localLock:
+                    self._local[key] = raw
+        if raw is None:
+            if self._replay:
+                raise LlmCacheMiss(key)
+            return None
+
+        sceneName = _sceneName(prompt)
+        if sceneName is not None:
+            raw = raw.replace(SCENE_NAME_PLACEHOLDER, sceneName)
+        try:
+            # Deserialized per hit, so callers never share message objects
+            generations = loads(raw)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {key[:12]}: {e}")
+            return None
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                # A hit costs no tokens; keep it out of usage accounting
+                message.usage_metadata = None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = llmCacheKey(prompt, llm_string)
+        raw = dumps(list(return_val))
+        sceneName = _sceneName(prompt)
+        if sceneName is not None:
+            raw = raw.replace(sceneName, SCENE_NAME_PLACEHOLDER)
+        jobId = llmCacheJob.get()
+        if jobId is None:
+            self._store(key, raw)
+            return
+        # In Redis, as the split pipeline's stages run on different workers
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.hset(f"{PENDING_PREFIX}{jobId}", key, raw)
+            pipe.expire(f"{PENDING_PREFIX}{jobId}", Config.ACTIVE_JOB_TTL_SECONDS)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to hold back LLM cache entry for job {jobId}: {e}")
+
+    def _store(self, key: str, raw: str):
+        with self._localLock:
+            self._local[key] = raw
+        if self._tier is not None:
+            self._tier.set(key, raw)
+
+    def settleJob(self, jobId: str, succeeded: bool):
+        """Cache the responses held back for `jobId` if it succeeded, otherwise drop them."""
+        pendingKey = f"{PENDING_PREFIX}{jobId}"
+        try:
+            pipe = r.pipeline()
+            pipe.hgetall(pendingKey)
+            pipe.delete(pendingKey)
+            pending, _ = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to settle LLM cache entries of job {jobId}: {e}")
+            return
+        if not succeeded:
+            if pending:
+                logger.info(f"Dropped {len(pending)} LLM cache entries of failed job {jobId}")
+            return
+        for key, raw in pending.items():
+            self._store(key, raw)
+
+    def clear(self, **kwargs) -> None:
+        with self._localLock:
+            self._local.clear()
+        if self._tier is not None:
+            self._tier.clear()
+
+
+def buildLlmCache() -> Optional[TieredLlmCache]:
+    """The cache selected by LLM_CACHE, or None when caching is off."""
+    if Config.LLM_CACHE == "off":
+        return None
+    if Config.LLM_CACHE == "redis":
+        tier = _RedisTier()
+    elif Config.LLM_CACHE == "sqlite":
+        tier = _SqliteTier(Config.LLM_CACHE_SQLITE_PATH)
+    else:
+        tier = None
+    return TieredLlmCache(
+        tier=tier,
+        maxEntries=Config.LLM_CACHE_MAX_ENTRIES,
+        replay=Config.LLM_CACHE_MODE == "replay",
+    )
+
+
+llmCache = buildLlmCache()
+
+
+def settleJobLlmCache(jobId: str, succeeded: bool):
+    if llmCache is not None:
+        llmCache.settleJob(jobId, succeeded)
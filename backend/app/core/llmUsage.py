@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from redis.exceptions import RedisError
+from app.config import Config
+from app.core.logger import logger
+from app.core.metrics import increment, observe, currentNode
+from app.core.redis import r, ar
+
+# Token accounting. Every LLM call reports its tokens, estimated cost and
+# latency to the metrics, and, inside a job, to a per-job hash keyed by node
+# (`<node>|<field>`) and a per-user hash for the current UTC day. Both live in
+# Redis so the split pipeline's stages add to the same totals.
+JOB_USAGE_PREFIX = "llmUsage:job:"
+USER_USAGE_PREFIX = "llmUsage:user:"
+USER_USAGE_TTL_SECONDS = 2 * 24 * 60 * 60
+
+USAGE_FIELDS = ("input", "cached", "output", "calls", "seconds", "costUsd")
+
+# USD per million tokens as (input, cached input, output); list prices for prompts up to 200k tokens
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+}
+
+# (jobId, userId) of the job whose LLM calls are counted in this context
+usageJob: ContextVar[Optional[Tuple[str, str]]] = ContextVar("usageJob", default=None)
+
+
+class TokenQuotaExceeded(Exception):
+    """Raised when a user has used up their daily token quota."""
+    def __init__(self, quota: int):
+        self.quota = quota
+        super().__init__(f"The daily limit of {quota} LLM tokens has been reached")
+
+
+def tokenUsage(message) -> dict:
+    """Input, cached input and output tokens reported on a chat model's reply."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input": usage.get("input_tokens", 0),
+        "cached": details.get("cache_read", 0) or 0,
+        "output": usage.get("output_tokens", 0),
+    }
+
+
+def estimateCost(model: str, usage: dict) -> float:
+    inputPrice, cachedPrice, outputPrice = MODEL_PRICES.get(model, (0, 0, 0))
+    uncached = usage["input"] - usage["cached"]
+    return (uncached * inputPrice + usage["cached"] * cachedPrice + usage["output"] * outputPrice) / 1_000_000
+
+
+def bindJobUsage(jobId: str, userId: str):
+    """Count the LLM calls made from this context towards `jobId` and `userId`."""
+    usageJob.set((jobId, str(userId)))
+
+
+def _jobKey(jobId: str) -> str:
+    return f"{JOB_USAGE_PREFIX}{jobId}"
+
+
+def _userKey(userId: str) -> str:
+    return f"{USER_USAGE_PREFIX}{userId}:{datetime.now(timezone.utc).date().isoformat()}"
+
+
+def _recordJobUsage(job, node: str, usage: dict, seconds: float, cost: float):
+    jobId, userId = job
+    jobKey, userKey = _jobKey(jobId), _userKey(userId)
+    try:
+        pipe = r.pipeline(transaction=False)
+        for field in ("input", "cached", "output"):
+            pipe.hincrby(jobKey, f"{node}|{field}", usage[field])
+            pipe.hincrby(userKey, field, usage[field])
+        pipe.hincrby(jobKey, f"{node}|calls", 1)
+        pipe.hincrby(userKey, "calls", 1)
+        pipe.hincrbyfloat(jobKey, f"{node}|seconds", seconds)
+        pipe.hincrbyfloat(jobKey, f"{node}|costUsd", cost)
+        pipe.hincrbyfloat(userKey, "costUsd", cost)
+        pipe.expire(jobKey, Config.ACTIVE_JOB_TTL_SECONDS)
+        pipe.expire(userKey, USER_USAGE_TTL_SECONDS)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to record LLM usage for job {jobId}: {e}")
+
+
+def _emptyUsage() -> dict:
+    return {field: 0 for field in USAGE_FIELDS}
+
+
+def jobUsageSummary(jobId: str) -> Optional[dict]:
+    """Totals and per-node usage of a job, or None when it made no counted calls."""
+    try:
+        raw = r.hgetall(_jobKey(jobId))
+    except RedisError as e:
+        logger.warning(f"Failed to read LLM usage for job {jobId}: {e}")
+        return None
+    if not raw:
+        return None
+
+    total, nodes = _emptyUsage(), defaultdict(_emptyUsage)
+    for key, value in raw.items():
+        node, field = key.rsplit("|", 1)
+        number = float(value) if field in ("seconds", "costUsd") else int(value)
+        nodes[node][field] += number
+        total[field] += number
+    for usage in (total, *nodes.values()):
+        usage["seconds"] = round(usage["seconds"], 3)
+        usage["costUsd"] = round(usage["costUsd"], 6)
+    return {**total, "nodes": dict(nodes)}
+
+
+def currentJobUsage() -> Optional[dict]:
+    job = usageJob.get()
+    return jobUsageSummary(job[0]) if job else None
+
+
+def dailyTokenQuota(isPaid: bool) -> int:
+    return Config.PAID_USER_DAILY_TOKEN_QUOTA if isPaid else Config.FREE_USER_DAILY_TOKEN_QUOTA
+
+
+async def userUsageToday(userId: str) -> dict:
+    raw = await ar.hgetall(_userKey(str(userId)))
+    usage = _emptyUsage()
+    usage.pop("seconds")
+    for field, value in raw.items():
+        usage[field] = float(value) if field == "costUsd" else int(value)
+    return usage
+
+
+async def checkTokenQuota(userId: str, isPaid: bool):
+    """Raise TokenQuotaExceeded when the user's tokens today reach their quota; 0 means no quota.
+
+    A job already running is never stopped, so a user can go over the quota
+    by the jobs that were admitted before it was reached.
+    """
+    quota = dailyTokenQuota(isPaid)
+    if not quota:
+        return
+    usage = await userUsageToday(userId)
+    if usage["input"] + usage["output"] >= quota:
+        raise TokenQuotaExceeded(quota)
+
+
+class LlmUsageTracker(BaseCallbackHandler):
+    """Accounts tokens, cost and latency of every LLM call.
+
+    Cache hits carry no usage and only count towards latency.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+        self.totals = defaultdict(lambda: {"cached": 0, "uncached": 0, "output": 0})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        nodeLabels = currentNode.get()
+        run = {
+            "model": metadata.get("ls_model_name", "unknown"),
+            "node": nodeLabels.get("node") or metadata.get("langgraph_node", "other"),
+            "animationType": nodeLabels.get("animationType"),
+            "job": usageJob.get(),
+            "start": time.perf_counter(),
+        }
+        with self._lock:
+            self._runs[run_id] = run
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, node = run["model"], run["node"]
+        seconds = time.perf_counter() - run["start"]
+        observe("manim_llm_call_duration_seconds", seconds, model=model, node=node)
+
+        for generations in response.generations:
+            for generation in generations:
+                usage = tokenUsage(getattr(generation, "message", None))
+                if not usage["input"]:
+                    continue
+                uncached = usage["input"] - usage["cached"]
+                cost = estimateCost(model, usage)
+                with self._lock:
+                    totals = self.totals[model]
+                    totals["cached"] += usage["cached"]
+                    totals["uncached"] += uncached
+                    totals["output"] += usage["output"]
+
+                labels = {"model": model, "node": node, "animationType": run["animationType"]}
+                increment("manim_llm_tokens_total", usage["cached"], kind="cached", **labels)
+                increment("manim_llm_tokens_total", uncached, kind="uncached", **labels)
+                increment("manim_llm_tokens_total", usage["output"], kind="output", **labels)
+                increment("manim_llm_cost_usd_total", cost, **labels)
+                if run["job"] is not None:
+                    _recordJobUsage(run["job"], node, usage, seconds, cost)
+                logger.info(
+                    f"LLM call on {model} in {node}: {usage['cached']} cached / {uncached} uncached input, "
+                    f"{usage['output']} output tokens, {seconds:.1f}s"
+                )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            observe("manim_llm_call_duration_seconds", time.perf_counter() - run["start"], model=run["model"], node=run["node"])
+
+
+llmUsageTracker = LlmUsageTracker()
@@ -0,0 +1,237 @@
+import atexit
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from redis.exceptions import RedisError
+from app.config import Config
+from app.core.logger import logger
+from app.core.redis import r, ar
+
+# Metrics live in Redis so every Celery process, thread and container adds to
+# the same series, and any API process can serve /metrics. One hash per metric;
+# fields are `<labels>` for counters and `<labels>|<le|sum|count>` for histograms.
+# Recording only adds to an in-process buffer, which a background thread flushes
+# every METRICS_FLUSH_SECONDS, so jobs on the worker event loop never wait on Redis.
+METRICS_PREFIX = "metrics:"
+
+# Labels of the LangGraph node running in this context, so calls made inside a
+# node (LLM usage, for one) can be attributed to it
+currentNode: ContextVar[dict] = ContextVar("currentNode", default={})
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+HISTOGRAMS = {
+    "manim_node_duration_seconds": "Time spent in one LangGraph node call",
+    "manim_stage_duration_seconds": "Time a completed job spent in each pipeline stage",
+    "manim_job_duration_seconds": "Wall-clock time of a completed job, queueing excluded",
+    "manim_render_duration_seconds": "Time of one Manim render of a generated scene",
+    "manim_upload_duration_seconds": "Time to upload a rendered video",
+    "manim_llm_call_duration_seconds": "Time of one LLM call, cache hits included",
+}
+
+COUNTERS = {
+    "manim_jobs_total": "Finished generation jobs by outcome",
+    "manim_llm_retries_total": "LLM calls retried after a server error",
+    "manim_rewrites_total": "Code rewrites by animation type and what triggered them",
+    "manim_render_failures_total": "Failed Manim renders by animation type",
+    "manim_start_over_total": "Code generations restarted from scratch after the rewrite limit",
+    "manim_llm_tokens_total": "LLM tokens by model and node; kind is cached or uncached input, or output",
+    "manim_llm_cost_usd_total": "Estimated LLM spend in US dollars by model and node",
+    "manim_speculations_total": "Speculative description generations by predicted type and outcome",
+}
+
+
+def _labelString(labels: dict) -> str:
+    return ",".join(
+        f'{name}="{str(getattr(value, "value", value))}"'
+        for name, value in sorted(labels.items())
+        if value is not None
+    )
+
+
+class _MetricBuffer:
+    """Increments not yet written to Redis, keyed by (hash, field)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.amounts = defaultdict(float)
+        self.flusherPid = None
+
+    def take(self):
+        with self.lock:
+            counts, amounts = self.counts, self.amounts
+            self.counts, self.amounts = defaultdict(int), defaultdict(float)
+        return counts, amounts
+
+    def putBack(self, counts, amounts):
+        with self.lock:
+            for field, value in counts.items():
+                self.counts[field] += value
+            for field, value in amounts.items():
+                self.amounts[field] += value
+
+
+_buffer = _MetricBuffer()
+
+
+def _resetAfterFork():
+    # The parent's buffered increments are the parent's to flush
+    global _buffer
+    _buffer = _MetricBuffer()
+
+
+os.register_at_fork(after_in_child=_resetAfterFork)
+
+
+def flushMetrics():
+    """Write this process's buffered increments to Redis."""
+    counts, amounts = _buffer.take()
+    if not counts and not amounts:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for (key, field), value in counts.items():
+            pipe.hincrby(key, field, value)
+        for (key, field), value in amounts.items():
+            pipe.hincrbyfloat(key, field, value)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to flush metrics, keeping them for the next flush: {e}")
+        _buffer.putBack(counts, amounts)
+
+
+def _flushForever():
+    while True:
+        time.sleep(Config.METRICS_FLUSH_SECONDS)
+        flushMetrics()
+
+
+def _ensureFlusher():
+    buffer = _buffer
+    if buffer.flusherPid == os.getpid():
+        return
+    with buffer.lock:
+        if buffer.flusherPid == os.getpid():
+            return
+        buffer.flusherPid = os.getpid()
+    threading.Thread(target=_flushForever, name="metrics-flush", daemon=True).start()
+    atexit.register(flushMetrics)
+
+
+def increment(name: str, amount: float = 1, **labels):
+    if not Config.METRICS_ENABLED:
+        return
+    _ensureFlusher()
+    buffer = _buffer
+    with buffer.lock:
+        buffer.amounts[(f"{METRICS_PREFIX}{name}", _labelString(labels))] += amount
+
+
+def observe(name: str, seconds: float, **labels):
+    if not Config.METRICS_ENABLED:
+        return
+    _ensureFlusher()
+    key = f"{METRICS_PREFIX}{name}"
+    series = _labelString(labels)
+    buffer = _buffer
+    with buffer.lock:
+        for bound in LATENCY_BUCKETS:
+            if seconds <= bound:
+                buffer.counts[(key, f"{series}|{bound}")] += 1
+        buffer.counts[(key, f"{series}|+Inf")] += 1
+        buffer.counts[(key, f"{series}|count")] += 1
+        buffer.amounts[(key, f"{series}|sum")] += seconds
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Observe the duration of the block, labelled with outcome="ok" or "error"."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe(name, time.perf_counter() - start, outcome=outcome, **labels)
+
+
+def timedNode(node: str, fn):
+    """Wrap a LangGraph node so each call is observed in manim_node_duration_seconds.
+
+    While the node runs, its labels are available through `currentNode`.
+
+    The wrapper keeps the node's signature, which LangGraph inspects to decide
+    whether to pass `config`.
+    """
+    def labels(args):
+        state = args[0] if args else None
+        return {"node": node, "animationType": getattr(state, "animationType", None)}
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def asyncWrapper(*args, **kwargs):
+            nodeLabels = labels(args)
+            token = currentNode.set(nodeLabels)
+            try:
+                with timed("manim_node_duration_seconds", **nodeLabels):
+                    return await fn(*args, **kwargs)
+            finally:
+                currentNode.reset(token)
+        return asyncWrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        nodeLabels = labels(args)
+        token = currentNode.set(nodeLabels)
+        try:
+            with timed("manim_node_duration_seconds", **nodeLabels):
+                return fn(*args, **kwargs)
+        finally:
+            currentNode.reset(token)
+    return wrapper
+
+
+def _formatValue(value: str) -> str:
+    number = float(value)
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def _withLabel(series: str, extra: str) -> str:
+    labels = ",".join(part for part in (series, extra) if part)
+    return "{" + labels + "}" if labels else ""
+
+
+async def renderMetrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    names = list(HISTOGRAMS) + list(COUNTERS)
+    pipe = ar.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(f"{METRICS_PREFIX}{name}")
+    values = dict(zip(names, await pipe.execute()))
+
+    lines = []
+    for name, help in COUNTERS.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} counter")
+        for series, value in sorted(values[name].items()):
+            lines.append(f"{name}{_withLabel(series, '')} {_formatValue(value)}")
+
+    bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+    for name, help in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+        fields = values[name]
+        for series in sorted({field.rpartition("|")[0] for field in fields}):
+            for bound in bounds:
+                count = fields.get(f"{series}|{bound}", "0")
+                bucket = _withLabel(series, 'le="' + bound + '"')
+                lines.append(f"{name}_bucket{bucket} {_formatValue(count)}")
+            lines.append(f"{name}_sum{_withLabel(series, '')} {_formatValue(fields.get(f'{series}|sum', '0'))}")
+            lines.append(f"{name}_count{_withLabel(series, '')} {_formatValue(fields.get(f'{series}|count', '0'))}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+import asyncio
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from app.config import Config
+from app.core.logger import logger
+from app.core.redis import r, ar
+
+# Every job event is appended to a capped stream (replay for reconnecting
+# clients, keyed by Last-Event-ID) and announced on a pub/sub channel (live
+# fan-out). Workers write both; the API holds one pub/sub connection.
+STREAM_PREFIX = "progress:stream:"
+CHANNEL_PREFIX = "progress:channel:"
+STREAM_MAXLEN = 200
+KEEPALIVE_SECONDS = 15
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _streamKey(taskId: str) -> str:
+    return f"{STREAM_PREFIX}{taskId}"
+
+
+def _channel(taskId: str) -> str:
+    return f"{CHANNEL_PREFIX}{taskId}"
+
+
+def progressPayload(meta: dict) -> dict:
+    return {"status": "in_progress", "state": "PROGRESS", **meta}
+
+
+def resultPayload(result) -> dict:
+    return {"status": "completed", "state": "SUCCESS", "data": result}
+
+
+def failedPayload(error) -> dict:
+    return {"status": "failed", "state": "FAILURE", "error": str(error)}
+
+
+def cancelledPayload() -> dict:
+    return {"status": "cancelled", "state": "REVOKED", "message": "Task was cancelled by user"}
+
+
+# One thread keeps a process's job writes (progress, events, final results) in order
+_jobWriter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-writes")
+
+
+def _logWriteFailure(future):
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"Failed to write a job update: {error}")
+
+
+def runJobWrite(fn, *args):
+    """Run `fn(*args)`, a job's Redis writes, on the job writer thread.
+
+    On an event loop the write is queued and the caller carries on, so the
+    other jobs on the worker loop never wait on Redis; from any other thread
+    the call waits and raises like a direct call. Either way it lands after
+    every write queued before it, so no progress update can overwrite a final
+    result.
+    """
+    future = _jobWriter.submit(fn, *args)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return future.result()
+    future.add_done_callback(_logWriteFailure)
+
+
+def publishJobEvent(taskId: str, payload: dict):
+    """Record a job event and notify live subscribers. Payloads match `/result/{task_id}` responses."""
+    data = json.dumps(payload, default=str)
+    eventId = r.xadd(_streamKey(taskId), {"data": data}, maxlen=STREAM_MAXLEN, approximate=True)
+    pipe = r.pipeline()
+    pipe.expire(_streamKey(taskId), Config.ACTIVE_JOB_TTL_SECONDS)
+    pipe.publish(_channel(taskId), json.dumps({"id": eventId, "data": data}))
+    pipe.execute()
+
+
+def _eventOrder(eventId: str):
+    milliseconds, _, sequence = eventId.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def _isTerminal(data: str) -> bool:
+    try:
+        return json.loads(data).get("status") in TERMINAL_STATUSES
+    except ValueError:
+        return False
+
+
+class ProgressHub:
+    """Fans job events out to the SSE clients of this API process over one pub/sub connection.
+
+    Channels are subscribed while at least one client listens to the job. After
+    a dropped connection every listener re-reads the stream, so no event is lost.
+    """
+
+    def __init__(self, client=ar):
+        self._redis = client
+        self._pubsub = None
+        self._listeners = defaultdict(set)
+        self._reader = None
+
+    async def _subscribe(self, taskId: str, queue: asyncio.Queue):
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub()
+        first = not self._listeners[taskId]
+        self._listeners[taskId].add(queue)
+        if first:
+            await self._pubsub.subscribe(_channel(taskId))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _unsubscribe(self, taskId: str, queue: asyncio.Queue):
+        listeners = self._listeners.get(taskId)
+        if listeners is None:
+            return
+        listeners.discard(queue)
+        if not listeners:
+            del self._listeners[taskId]
+            try:
+                await self._pubsub.unsubscribe(_channel(taskId))
+            except Exception as e:
+                logger.warning(f"Failed to unsubscribe from job {taskId}: {e}")
+
+    async def _read(self):
+        while self._listeners:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Progress subscription lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+                await self._reconnect()
+                continue
+            if message is None or message.get("type") != "message":
+                continue
+            taskId = message["channel"][len(CHANNEL_PREFIX):]
+            event = json.loads(message["data"])
+            for queue in self._listeners.get(taskId, ()):
+                queue.put_nowait((event["id"], event["data"]))
+
+    async def _reconnect(self):
+        try:
+            await self._pubsub.aclose()
+        except Exception:
+            pass
+        self._pubsub = self._redis.pubsub()
+        try:
+            if self._listeners:
+                await self._pubsub.subscribe(*[_channel(taskId) for taskId in self._listeners])
+        except Exception as e:
+            logger.warning(f"Progress resubscribe failed: {e}")
+            return
+        for queues in self._listeners.values():
+            for queue in queues:
+                # Events published while disconnected are only in the stream
+                queue.put_nowait((None, None))
+
+    async def _replay(self, taskId: str, lastEventId):
+        events = await self._redis.xrange(_streamKey(taskId), min=lastEventId or "-")
+        return [
+            (eventId, fields["data"])
+            for eventId, fields in events
+            if lastEventId is None or _eventOrder(eventId) > _eventOrder(lastEventId)
+        ]
+
+    async def listen(self, taskId: str, lastEventId=None):
+        """Yield `(eventId, data)` for a job from `lastEventId` on; `(None, None)` is a keepalive.
+
+        Ends after the job's terminal event.
+        """
+        queue = asyncio.Queue()
+        # Subscribe before replaying so nothing published in between is missed
+        await self._subscribe(taskId, queue)
+        try:
+            pending = await self._replay(taskId, lastEventId)
+            while True:
+                for eventId, data in pending:
+                    if lastEventId is not None and _eventOrder(eventId) <= _eventOrder(lastEventId):
+                        continue
+                    lastEventId = eventId
+                    yield eventId, data
+                    if _isTerminal(data):
+                        return
+
+                try:
+                    eventId, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None, None
+                    pending = []
+                    continue
+                if eventId is None:
+                    pending = await self._replay(taskId, lastEventId)
+                else:
+                    pending = [(eventId, data)]
+        finally:
+            await self._unsubscribe(taskId, queue)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+
+progressHub = ProgressHub()
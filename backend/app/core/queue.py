@@ -1,9 +1,17 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 import ssl
 from app.config import Config
+from app.core.db import get_worker_db, close_worker_db
+from app.core.workerLoop import runOnWorkerLoop
+from app.core.redis import PRIORITY_SEP, PRIORITY_STEPS
 
 BROKER_URL = Config.REDIS_URL
 
+# Split pipeline queues: many I/O-bound workers for LLM stages, few CPU-sized ones for renders
+LLM_QUEUE = "llm"
+RENDER_QUEUE = "render"
+
 if not BROKER_URL:
     raise ValueError("REDIS_URL environment variable not set. Please create a .env file.")
 
@@ -11,7 +19,7 @@ taskQueue = Celery(
     "taskQueue",
     broker=BROKER_URL,
     backend=BROKER_URL,
-    include=["app.services.manim.manim"] 
+    include=["app.services.manim.manim", "app.services.manim.pipeline"]
 )
 
 taskQueue.conf.update(
@@ -22,5 +30,43 @@ taskQueue.conf.update(
         "ssl_cert_reqs": ssl.CERT_NONE
     },
     task_acks_late = True,
-    worker_prefetch_multiplier = 1
+    worker_prefetch_multiplier = 1,
+    task_routes = {
+        "pipeline.render": {"queue": RENDER_QUEUE},
+        "pipeline.*": {"queue": LLM_QUEUE},
+    },
+    # One list per priority level; workers drain lower numbers first (see core/scheduler.py)
+    broker_transport_options = {
+        "priority_steps": list(PRIORITY_STEPS),
+        "sep": PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    }
 )
+
+
+def _forksPoolChildren(worker):
+    pool = getattr(worker, "pool_cls", "")
+    name = pool if isinstance(pool, str) else getattr(pool, "__module__", "")
+    return "prefork" in name or name == "processes"
+
+
+@worker_process_init.connect
+def connectPoolChild(**kwargs):
+    # Prefork children: one client per child, created after the fork
+    runOnWorkerLoop(get_worker_db())
+
+
+@worker_init.connect
+def connectWorker(sender=None, **kwargs):
+    # Threads/solo pools run tasks in this process; prefork parents never touch Mongo
+    if not _forksPoolChildren(sender):
+        runOnWorkerLoop(get_worker_db())
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def disconnectWorker(**kwargs):
+    try:
+        runOnWorkerLoop(close_worker_db())
+    except Exception as e:
+        print(f"Warning: Failed to close database connection: {e}")
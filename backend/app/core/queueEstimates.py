@@ -0,0 +1,215 @@
+import math
+import statistics
+import time
+from typing import Optional
+from pydantic import BaseModel
+from app.config import Config
+from cachetools import TTLCache
+from app.core.redis import r, ar
+from app.core.metrics import observe
+from app.core.scheduler import MAX_PRIORITY
+
+# Jobs accepted but not started yet, ordered the way the broker serves them:
+# priority first, then submission time. Members have no expiry of their own;
+# a job lost before it was picked up is pruned by score once it is older than
+# ACTIVE_JOB_TTL_SECONDS, like its job hash.
+WAITING_KEY = "queue:waiting"
+PRIORITY_STRIDE = 1e10
+JOB_PREFIX = "queue:job:"
+SAMPLES_PREFIX = "queue:durations:"
+
+# Segment used before the animation type is known, and as a fallback
+ANY_TYPE = "ANY"
+
+# Medians move slowly; status requests reuse them instead of re-reading the samples
+TYPICAL_CACHE_SECONDS = 30
+
+STAGES = ["feasibility", "description", "codegen", "render", "upload"]
+
+# Progress stage names reported by the pipeline, mapped to the timed stages
+STAGE_FOR_PROGRESS = {
+    "Checking Feasibility": "feasibility",
+    "Description Generation": "description",
+    "Generating Description": "description",
+    "Generating Manim Code": "codegen",
+    "Preflight Check": "render",
+    "Waiting for Renderer": "render",
+    "Rendering Animation": "render",
+    "Uploading": "upload",
+}
+FINISHED_PROGRESS = ("Completed", "Failed", "Error", "Cancelled")
+
+
+class QueueEstimate(BaseModel):
+    position: Optional[int] = None
+    etaSeconds: Optional[float] = None
+
+
+def _jobKey(taskId: str) -> str:
+    return f"{JOB_PREFIX}{taskId}"
+
+
+def _samplesKey(stage: str, animationType: str, quality: str) -> str:
+    return f"{SAMPLES_PREFIX}{stage}:{animationType}:{quality}"
+
+
+def pruneWaitingJobs(pipe) -> int:
+    """Queue the removal of waiting jobs older than ACTIVE_JOB_TTL_SECONDS on a pipeline.
+
+    Returns how many replies the removal adds, for callers to skip.
+    """
+    cutoff = time.time() - Config.ACTIVE_JOB_TTL_SECONDS
+    for priority in range(MAX_PRIORITY + 1):
+        pipe.zremrangebyscore(WAITING_KEY, priority * PRIORITY_STRIDE, priority * PRIORITY_STRIDE + cutoff)
+    return MAX_PRIORITY + 1
+
+
+async def trackQueuedJob(taskId: str, priority: int, quality: str):
+    """Register a submitted job so its queue position and ETA can be reported."""
+    # The broker serves lower priorities first and FIFO within a priority
+    score = priority * PRIORITY_STRIDE + time.time()
+    pipe = ar.pipeline()
+    pruneWaitingJobs(pipe)
+    pipe.zadd(WAITING_KEY, {taskId: score})
+    pipe.hset(_jobKey(taskId), mapping={"quality": quality, "animationType": ANY_TYPE})
+    pipe.expire(_jobKey(taskId), Config.ACTIVE_JOB_TTL_SECONDS)
+    await pipe.execute()
+
+
+def forgetJob(taskId: str):
+    pipe = r.pipeline()
+    pipe.zrem(WAITING_KEY, taskId)
+    pipe.delete(_jobKey(taskId))
+    pipe.execute()
+
+
+def setJobAnimationType(taskId: str, animationType):
+    r.hset(_jobKey(taskId), "animationType", str(getattr(animationType, "value", animationType)))
+
+
+def recordProgress(taskId: str, progressStage: str):
+    """Advance the job's stage clock from a progress update.
+
+    Time is accumulated per stage, so a render that goes back to a rewrite
+    keeps adding to the same totals. When the job completes, the totals are
+    added to the rolling samples for its animation type and quality.
+    """
+    if progressStage == "Initializing":
+        # Picked up by a worker: no longer waiting, nothing timed yet
+        r.zrem(WAITING_KEY, taskId)
+        return
+    stage = STAGE_FOR_PROGRESS.get(progressStage)
+    if stage is None and progressStage not in FINISHED_PROGRESS:
+        return
+
+    key = _jobKey(taskId)
+    job = r.hgetall(key)
+    now = time.time()
+    pipe = r.pipeline()
+    pipe.zrem(WAITING_KEY, taskId)
+
+    current = job.get("stage")
+    if current and current != stage:
+        pipe.hincrbyfloat(key, f"t:{current}", now - float(job.get("stageStartedAt", now)))
+
+    if progressStage == "Completed":
+        pipe.execute()
+        _recordSamples(r.hgetall(key))
+        r.delete(key)
+        return
+    if progressStage in FINISHED_PROGRESS:
+        pipe.delete(key)
+        pipe.execute()
+        return
+
+    if current != stage:
+        pipe.hset(key, mapping={"stage": stage, "stageStartedAt": now})
+        pipe.expire(key, Config.ACTIVE_JOB_TTL_SECONDS)
+    pipe.execute()
+
+
+def _recordSamples(job: dict):
+    animationType = job.get("animationType") or ANY_TYPE
+    quality = job.get("quality", "ql")
+    pipe = r.pipeline()
+    total = 0.0
+    for stage in STAGES:
+        seconds = job.get(f"t:{stage}")
+        if seconds is None:
+            continue
+        total += float(seconds)
+        observe("manim_stage_duration_seconds", float(seconds), stage=stage, animationType=animationType, quality=quality)
+        for segment in {animationType, ANY_TYPE}:
+            sampleKey = _samplesKey(stage, segment, quality)
+            pipe.lpush(sampleKey, round(float(seconds), 2))
+            pipe.ltrim(sampleKey, 0, Config.ETA_SAMPLE_WINDOW - 1)
+    pipe.execute()
+    observe("manim_job_duration_seconds", total, animationType=animationType, quality=quality)
+
+
+_typicalCache = TTLCache(maxsize=256, ttl=TYPICAL_CACHE_SECONDS)
+
+
+async def typicalStageSeconds(animationType: str, quality: str) -> dict:
+    """Median duration of each stage over the rolling window; falls back to all animation types."""
+    cacheKey = (animationType, quality)
+    if cacheKey in _typicalCache:
+        return _typicalCache[cacheKey]
+
+    pipe = ar.pipeline()
+    for stage in STAGES:
+        pipe.lrange(_samplesKey(stage, animationType, quality), 0, -1)
+        pipe.lrange(_samplesKey(stage, ANY_TYPE, quality), 0, -1)
+    results = await pipe.execute()
+
+    typical = {}
+    for index, stage in enumerate(STAGES):
+        samples = results[2 * index] or results[2 * index + 1]
+        if samples:
+            typical[stage] = statistics.median(float(sample) for sample in samples)
+    _typicalCache[cacheKey] = typical
+    return typical
+
+
+def queueEstimate(rank: Optional[int], job: dict, typical: dict) -> QueueEstimate:
+    """Queue position (1 = next to start) and seconds until the job should finish."""
+    position = rank + 1 if rank is not None else None
+    if not job or "render" not in typical:
+        # Untracked job, or not enough history for this quality yet
+        return QueueEstimate(position=position)
+    # Stages a job can skip (upload after a render cache hit) count as free
+    typical = {stage: typical.get(stage, 0.0) for stage in STAGES}
+    jobSeconds = sum(typical.values())
+
+    if rank is not None:
+        # Jobs ahead start in batches of ETA_PARALLEL_JOBS
+        batchesAhead = math.floor(rank / max(1, Config.ETA_PARALLEL_JOBS))
+        return QueueEstimate(position=position, etaSeconds=round((batchesAhead + 1) * jobSeconds, 1))
+
+    current = job.get("stage")
+    if current not in STAGES:
+        return QueueEstimate(etaSeconds=round(jobSeconds, 1))
+    # A render sent back for a rewrite re-enters a stage that already has time on it
+    elapsed = float(job.get(f"t:{current}", 0)) + time.time() - float(job.get("stageStartedAt", time.time()))
+    remaining = max(0.0, typical[current] - elapsed)
+    remaining += sum(typical[stage] for stage in STAGES[STAGES.index(current) + 1:])
+    return QueueEstimate(etaSeconds=round(remaining, 1))
+
+
+def queueEstimateReads(pipe, taskId: str):
+    """Queue the reads `queueEstimate` needs on a pipeline: rank, then the job hash."""
+    pipe.zrank(WAITING_KEY, taskId)
+    pipe.hgetall(_jobKey(taskId))
+
+
+async def estimateJobFrom(rank: Optional[int], job: dict) -> QueueEstimate:
+    typical = await typicalStageSeconds(job.get("animationType") or ANY_TYPE, job.get("quality", "ql")) if job else {}
+    return queueEstimate(rank, job, typical)
+
+
+async def estimateJob(taskId: str) -> QueueEstimate:
+    pipe = ar.pipeline()
+    pruned = pruneWaitingJobs(pipe)
+    queueEstimateReads(pipe, taskId)
+    rank, job = (await pipe.execute())[pruned:]
+    return await estimateJobFrom(rank, job)
@@ -1,10 +1,28 @@
 import redis
+import redis.asyncio as aioredis
 from app.config import Config
 
 REDIS_URL = Config.REDIS_URL
 r = redis.from_url(REDIS_URL, decode_responses=True)
 
+# Connection-pooled client for the FastAPI event loop; request handlers must not use `r`
+ar = aioredis.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=Config.REDIS_MAX_CONNECTIONS
+)
+
 QUEUE_KEY = "celery"
+# Must match broker_transport_options in core/queue.py
+PRIORITY_SEP = ":"
+PRIORITY_STEPS = range(10)
+
+def priority_queue_keys(queue=QUEUE_KEY):
+    """Kombu keeps one Redis list per priority level: `celery`, `celery:1` ... `celery:9`"""
+    return [queue if priority == 0 else f"{queue}{PRIORITY_SEP}{priority}" for priority in PRIORITY_STEPS]
 
 def get_queue_length():
-    return r.llen(QUEUE_KEY)
+    pipe = r.pipeline()
+    for key in priority_queue_keys():
+        pipe.llen(key)
+    return sum(pipe.execute())
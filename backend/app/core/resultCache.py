@@ -0,0 +1,71 @@
+import hashlib
+import json
+import threading
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+from app.config import Config
+from app.core.redis import r
+
+RESULT_CACHE_PREFIX = "resultCache:"
+
+# TTLCache evicts expired entries first and then the least recently used ones
+_localCache = TTLCache(
+    maxsize=Config.RESULT_CACHE_MAX_ENTRIES,
+    ttl=Config.RESULT_CACHE_TTL_SECONDS
+)
+_localLock = threading.Lock()
+
+
+def normalizeQuery(query: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return " ".join(query.lower().split())
+
+
+def resultCacheKey(query: str, quality: str, format: str, resolution: str) -> str:
+    payload = json.dumps(
+        {
+            "query": normalizeQuery(query),
+            "quality": quality,
+            "format": format,
+            "resolution": resolution or "1920x1080",
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def getCachedResult(key: str):
+    """Return the cached job result for `key`, checking memory before Redis."""
+    with _localLock:
+        cached = _localCache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        raw = r.get(f"{RESULT_CACHE_PREFIX}{key}")
+    except RedisError as e:
+        print(f"Warning: Result cache lookup in Redis failed: {e}")
+        return None
+    if raw is None:
+        return None
+
+    try:
+        cached = json.loads(raw)
+    except ValueError:
+        return None
+    with _localLock:
+        _localCache[key] = cached
+    return cached
+
+
+def setCachedResult(key: str, value: dict):
+    with _localLock:
+        _localCache[key] = value
+    try:
+        r.set(
+            f"{RESULT_CACHE_PREFIX}{key}",
+            json.dumps(value),
+            ex=Config.RESULT_CACHE_TTL_SECONDS
+        )
+    except RedisError as e:
+        print(f"Warning: Result cache write to Redis failed: {e}")
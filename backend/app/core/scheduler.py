@@ -0,0 +1,66 @@
+import time
+from app.config import Config
+from app.core.redis import r, ar
+
+# Redis transport priorities: 0 is served first, 9 last
+MAX_PRIORITY = 9
+
+# Previews are cheap and block an interactive user; finals can wait a little
+PREVIEW_QUALITIES = ("ql", "qm")
+
+ACTIVE_JOBS_PREFIX = "scheduler:active:"
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a user already has their maximum number of queued or running jobs."""
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"At most {limit} generations can be queued or running at once")
+
+
+def _activeKey(userId: str) -> str:
+    return f"{ACTIVE_JOBS_PREFIX}{userId}"
+
+
+def concurrencyLimit(isPaid: bool) -> int:
+    return Config.PAID_USER_MAX_ACTIVE_JOBS if isPaid else Config.FREE_USER_MAX_ACTIVE_JOBS
+
+
+def jobPriority(isPaid: bool, quality: str, activeJobs: int) -> int:
+    """Priority tier from plan and quality, pushed back by the user's own backlog.
+
+    Every job a user already has in flight lowers the priority of their next
+    one, so a burst from one user interleaves with everyone else's first jobs
+    instead of filling the head of the queue.
+    """
+    tier = 0 if isPaid else 3
+    if quality not in PREVIEW_QUALITIES:
+        tier += 2
+    return min(MAX_PRIORITY, tier + activeJobs * Config.SCHEDULER_BACKLOG_PENALTY)
+
+
+async def reserveJobSlot(userId: str, taskId: str, isPaid: bool) -> int:
+    """Count `taskId` against the user's active jobs. Returns how many were active before it.
+
+    Raises ConcurrencyLimitExceeded when the user is at their cap. Entries
+    older than ACTIVE_JOB_TTL_SECONDS are dropped, so a lost release never
+    locks a user out for good.
+    """
+    key = _activeKey(userId)
+    now = time.time()
+    pipe = ar.pipeline()
+    pipe.zremrangebyscore(key, "-inf", now - Config.ACTIVE_JOB_TTL_SECONDS)
+    pipe.zadd(key, {taskId: now})
+    pipe.zcard(key)
+    pipe.expire(key, Config.ACTIVE_JOB_TTL_SECONDS)
+    _, _, active, _ = await pipe.execute()
+
+    limit = concurrencyLimit(isPaid)
+    if active > limit:
+        await ar.zrem(key, taskId)
+        raise ConcurrencyLimitExceeded(limit)
+    return active - 1
+
+
+def releaseJobSlot(userId: str, taskId: str):
+    r.zrem(_activeKey(userId), taskId)
@@ -0,0 +1,102 @@
+import json
+from typing import Dict, List, Optional
+from app.core.queue import taskQueue
+from app.core.redis import ar
+from app.core.queueEstimates import estimateJobFrom, queueEstimateReads, pruneWaitingJobs
+
+# Reads Celery task state straight from the Redis result backend with the async
+# client. `AsyncResult.state` does the same GET, but blocks the event loop.
+
+
+def taskMetaKey(taskId: str) -> str:
+    return taskQueue.backend.get_key_for_task(taskId).decode()
+
+
+def parseTaskMeta(raw: Optional[str]) -> dict:
+    """Decode a stored result; a missing key means the task is still PENDING."""
+    if raw is None:
+        return {"status": "PENDING", "result": None}
+    return json.loads(raw)
+
+
+def _exceptionMessage(result) -> str:
+    # JSON results store exceptions as {"exc_type", "exc_message", "exc_module"}
+    if not isinstance(result, dict):
+        return str(result)
+    message = result.get("exc_message")
+    if isinstance(message, (list, tuple)):
+        return ", ".join(str(part) for part in message)
+    return str(message)
+
+
+async def taskStatusResponse(meta: dict, rank: Optional[int], job: dict) -> dict:
+    """Build the `/result/{task_id}` response from the stored meta and the queue data."""
+    state = meta.get("status")
+    info = meta.get("result")
+
+    if state == 'PROGRESS':
+        info = info or {}
+        estimate = await estimateJobFrom(rank, job)
+        return {
+            "status": "in_progress",
+            "state": state,
+            "current_stage": info.get('current_stage'),
+            "progress": info.get('progress'),
+            "details": info.get('details'),
+            "timestamp": info.get('timestamp'),
+            "eta_seconds": estimate.etaSeconds,
+        }
+    elif state == 'SUCCESS':
+        return {
+            "status": "completed",
+            "state": state,
+            "data": info,
+        }
+    elif state == 'FAILURE':
+        return {
+            "status": "failed",
+            "state": state,
+            "error": _exceptionMessage(info),
+        }
+    elif state == 'REVOKED':
+        return {
+            "status": "cancelled",
+            "state": state,
+            "message": "Task was cancelled by user",
+        }
+    else:
+        estimate = await estimateJobFrom(rank, job)
+        return {
+            "status": "pending",
+            "state": state,
+            "queue_left": estimate.position,
+            "eta_seconds": estimate.etaSeconds
+        }
+
+
+async def getTaskStatus(taskId: str) -> dict:
+    """Status of one task in a single pipelined round trip."""
+    pipe = ar.pipeline()
+    pruned = pruneWaitingJobs(pipe)
+    pipe.get(taskMetaKey(taskId))
+    queueEstimateReads(pipe, taskId)
+    raw, rank, job = (await pipe.execute())[pruned:]
+    return await taskStatusResponse(parseTaskMeta(raw), rank, job)
+
+
+async def getTaskStatuses(taskIds: List[str]) -> Dict[str, dict]:
+    """Statuses of many tasks: one MGET for the results plus their queue data, in one round trip."""
+    if not taskIds:
+        return {}
+    pipe = ar.pipeline()
+    pruned = pruneWaitingJobs(pipe)
+    pipe.mget([taskMetaKey(taskId) for taskId in taskIds])
+    for taskId in taskIds:
+        queueEstimateReads(pipe, taskId)
+    raws, *queueData = (await pipe.execute())[pruned:]
+
+    statuses = {}
+    for index, taskId in enumerate(taskIds):
+        rank, job = queueData[2 * index], queueData[2 * index + 1]
+        statuses[taskId] = await taskStatusResponse(parseTaskMeta(raws[index]), rank, job)
+    return statuses
@@ -0,0 +1,48 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+# Poll interval for revocation while a task thread waits on its coroutine
+CANCEL_POLL_SECONDS = 1.0
+
+_loop = None
+_loopPid = None
+_loopLock = threading.Lock()
+
+
+def getWorkerLoop() -> asyncio.AbstractEventLoop:
+    """Event loop that lives for the whole worker process, running in a daemon thread.
+
+    Every generation job in the process runs as a coroutine on this loop, so
+    jobs waiting on Gemini overlap instead of each owning a blocked thread,
+    and loop-bound clients (Mongo, Redis) are created once. The pid check
+    recreates the loop in prefork children, which inherit the parent's memory
+    but not its threads.
+    """
+    global _loop, _loopPid
+    with _loopLock:
+        if _loop is None or _loopPid != os.getpid() or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="worker-loop", daemon=True)
+            thread.start()
+            _loop = loop
+            _loopPid = os.getpid()
+    return _loop
+
+
+def runOnWorkerLoop(coro, isCancelled=None):
+    """Run `coro` on the worker loop and block the calling task thread until it finishes.
+
+    `isCancelled` is polled while waiting; when it returns True the coroutine is
+    cancelled and `asyncio.CancelledError` is raised in the caller. Thread pools
+    cannot kill a running task, so this is how `/cancel` reaches it.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, getWorkerLoop())
+    while True:
+        try:
+            return future.result(timeout=CANCEL_POLL_SECONDS)
+        except concurrent.futures.TimeoutError:
+            if isCancelled is not None and isCancelled():
+                future.cancel()
+                raise asyncio.CancelledError()
@@ -1,12 +1,15 @@
 from app.router import (
     mainmGeneration, 
-    userRouter
+    userRouter,
+    metricsRouter
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from app.core.db import init_db
+from app.core.progressEvents import progressHub
+from app.core.redis import ar
 from app.utils.auth import getCurrentUser
 from app.exceptions import UserAlreadyVerifiedException, UserNotFoundException
 from fastapi.staticfiles import StaticFiles
@@ -20,6 +23,8 @@ async def lifespan(app: FastAPI):
     try:
         yield
     finally:
+        await progressHub.close()
+        await ar.aclose()
         await app.state.mongo_client.close()
 
 app = FastAPI(lifespan=lifespan)
@@ -61,3 +66,4 @@ app.add_middleware(
 )
 app.include_router(mainmGeneration.router)
 app.include_router(userRouter.router)
+app.include_router(metricsRouter.router)
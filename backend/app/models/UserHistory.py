@@ -2,7 +2,18 @@ from beanie import Document,Indexed
 from bson import ObjectId
 from datetime import datetime, timezone
 from pydantic import Field, BaseModel
-from typing import Optional, List, Annotated
+from typing import Optional, List, Annotated, Dict
+
+class TokenUsage(BaseModel):
+    input: int = 0
+    cached: int = 0
+    output: int = 0
+    calls: int = 0
+    seconds: float = 0
+    costUsd: float = 0
+
+class MessageUsage(TokenUsage):
+    nodes: Dict[str, TokenUsage] = Field(default_factory=dict)
 
 class Message(BaseModel):
     userQuery: str
@@ -12,6 +23,7 @@ class Message(BaseModel):
     filename: Optional[str]=None
     quality: Optional[str] = None
     link: Optional[str] = None
+    usage: Optional[MessageUsage] = None
 
 class UsersHistory(Document):
     userId: Annotated[ObjectId, Indexed()]
@@ -2,18 +2,38 @@ from fastapi import (
     APIRouter, 
     status, 
     HTTPException,
-    Depends
+    Depends,
+    Request
 )
-from app.schema.manimGenerationSchema import MainmUserModel, CancelRequest
+from app.schema.manimGenerationSchema import MainmUserModel, CancelRequest, TaskStatusBatchRequest
 from app.services.manim.manim import call_graph
 # from app.services.task import call_graph
 from fastapi.responses import StreamingResponse
 from app.utils.auth import getCurrentUser
-from celery.result import AsyncResult
 from app.core.queue import taskQueue
 from app.models.UserHistory import UsersHistory
-from app.core.redis import get_queue_length
+from app.core.queueEstimates import trackQueuedJob, forgetJob
+from app.core.metrics import increment
+from app.core.taskStatus import getTaskStatus, getTaskStatuses
+from starlette.concurrency import run_in_threadpool
+from app.core.progressEvents import progressHub, publishJobEvent, cancelledPayload
+from typing import Optional
+from app.core.scheduler import (
+    reserveJobSlot,
+    releaseJobSlot,
+    jobPriority,
+    ConcurrencyLimitExceeded
+)
+from app.core.llmUsage import (
+    checkTokenQuota,
+    dailyTokenQuota,
+    userUsageToday,
+    TokenQuotaExceeded
+)
+from app.models.User import Users
+from bson import ObjectId
 import json
+import uuid
 
 router = APIRouter(
     prefix="/api/manimGeneration"
@@ -32,59 +52,98 @@ router = APIRouter(
 async def generate(query: MainmUserModel, userId: int=Depends(getCurrentUser)):
     
     historyId = getattr(query, "historyId", None)
-    task = call_graph.apply_async(
+    user = await Users.get(ObjectId(userId.id))
+    isPaid = bool(user and user.isPaid)
+
+    try:
+        await checkTokenQuota(userId.id, isPaid)
+    except TokenQuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+    task_id = str(uuid.uuid4())
+    try:
+        activeJobs = await reserveJobSlot(userId.id, task_id, isPaid)
+    except ConcurrencyLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+    priority = jobPriority(isPaid, query.quality, activeJobs)
+    await trackQueuedJob(task_id, priority, query.quality)
+    # Publishing to the broker is blocking kombu I/O
+    task = await run_in_threadpool(
+        call_graph.apply_async,
         args=[
             query.userQuery,
             userId.id,query.quality,
             query.format, 
             historyId,
-            query.resolution
-        ]
+            query.resolution,
+            query.bypassCache
+        ],
+        task_id=task_id,
+        priority=priority
     )
     return {"task_id": task.id}
 
+
+@router.get("/usage")
+async def get_usage(userId: int = Depends(getCurrentUser)):
+    """The user's LLM usage for the current UTC day and their daily token quota (0 means none)."""
+    user = await Users.get(ObjectId(userId.id))
+    return {
+        **await userUsageToday(userId.id),
+        "quota": dailyTokenQuota(bool(user and user.isPaid)),
+    }
+
+
+def _cancelJob(taskId: str, userId: str):
+    taskQueue.control.revoke(taskId, terminate=True, signal="SIGKILL")
+    releaseJobSlot(userId, taskId)
+    forgetJob(taskId)
+    publishJobEvent(taskId, cancelledPayload())
+    increment("manim_jobs_total", outcome="cancelled")
+
+
 @router.post("/cancel", status_code=status.HTTP_202_ACCEPTED)
 async def cancel_task(req: CancelRequest,  userId: int = Depends(getCurrentUser)):
-    taskQueue.control.revoke(req.taskId, terminate=True, signal="SIGKILL")
+    # Revoke is a broadcast over the broker with the sync client
+    await run_in_threadpool(_cancelJob, req.taskId, userId.id)
     return {"status": "revoked", "taskId": req.taskId}
 
 
+@router.get("/events/{task_id}")
+async def task_events(task_id: str, request: Request, lastEventId: Optional[str] = None, userId: int = Depends(getCurrentUser)):
+    """Server-sent events for one job, resumable through the Last-Event-ID header."""
+    lastEventId = request.headers.get("last-event-id") or lastEventId
+
+    async def event_generator():
+        async for eventId, data in progressHub.listen(task_id, lastEventId):
+            if await request.is_disconnected():
+                break
+            if eventId is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {eventId}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/result/{task_id}")
 async def get_result(task_id: str, userId: int = Depends(getCurrentUser)):
-    result = AsyncResult(task_id, app=taskQueue)
-
-    if result.state == 'PROGRESS':
-        return {
-            "status": "in_progress",
-            "state": result.state,
-            "current_stage": result.info.get('current_stage'),
-            "progress": result.info.get('progress'),
-            "details": result.info.get('details'),
-            "timestamp": result.info.get('timestamp'),
-
-        }
-    elif result.state == 'SUCCESS':
-        return {
-            "status": "completed",
-            "state": result.state,
-            "data": result.result,
-        }
-    elif result.state == 'FAILURE':
-        return {
-            "status": "failed",
-            "state": result.state,
-            "error": str(result.info),
-        }
-    elif result.state == 'REVOKED':
-        return {
-            "status": "cancelled",
-            "state": result.state,
-            "message": "Task was cancelled by user",
-        }
-    else:
-        queue_length = get_queue_length()
-        return {
-            "status": "pending",
-            "state": result.state,
-            "queue_left": queue_length
-        }
\ No newline at end of file
+    return await getTaskStatus(task_id)
+
+
+@router.post("/results")
+async def get_results(req: TaskStatusBatchRequest, userId: int = Depends(getCurrentUser)):
+    """Same response as `/result/{task_id}` for each task, keyed by task id."""
+    # dict.fromkeys drops duplicates and keeps the order
+    return await getTaskStatuses(list(dict.fromkeys(req.taskIds)))
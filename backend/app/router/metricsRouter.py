@@ -0,0 +1,32 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.config import Config
+from app.core.metrics import renderMetrics
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def checkScrapeToken(authorization: Optional[str]):
+    """Only scrapers holding METRICS_TOKEN see the metrics; without a token the endpoint is off."""
+    if not Config.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), Config.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(default=None)):
+    checkScrapeToken(authorization)
+    # Series are shared through Redis, so any API process reports every worker
+    return PlainTextResponse(await renderMetrics(), media_type=PROMETHEUS_CONTENT_TYPE)
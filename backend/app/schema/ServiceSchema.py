@@ -75,4 +75,6 @@ class mainmState(BaseModel):
     createAgain: int = 0
     code: Optional[str] = None
     animationType: AnimationType
-    resolution: str
\ No newline at end of file
+    resolution: str
+    renderCacheKey: Optional[str] = None
+    cachedLink: Optional[str] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 
 class MainmUserModel(BaseModel):
     userQuery: str
@@ -7,6 +7,10 @@ class MainmUserModel(BaseModel):
     format: str
     historyId: Optional[str] = None
     resolution: str
+    bypassCache: bool = False
 
 class CancelRequest(BaseModel):
-    taskId: str
\ No newline at end of file
+    taskId: str
+
+class TaskStatusBatchRequest(BaseModel):
+    taskIds: List[str] = Field(min_length=1, max_length=50)
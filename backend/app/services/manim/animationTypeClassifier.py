@@ -0,0 +1,72 @@
+import re
+from typing import Optional
+from app.schema.ServiceSchema import AnimationType
+
+# Keyword guess at the animation type the feasibility check will pick, used to
+# start the description before the check returns. Keywords are word prefixes
+# ("sort" matches "sorting") with weights, except WHOLE_WORDS, whose prefixes
+# start unrelated words ("sin" in "single", "tan" in "tank"). The generic "3d"
+# words weigh less than topic words, so "3D pendulum" goes to PHYSICS as the
+# check's rules say.
+KEYWORDS = {
+    AnimationType.COMPUTER_DATASTRUCTURE: {
+        "algorithm": 2, "sort": 2, "search": 2, "binary": 2, "tree": 2, "stack": 2, "queue": 2,
+        "linked list": 3, "array": 2, "hash": 2, "heap": 2, "bfs": 3, "dfs": 3, "dijkstra": 3,
+        "traversal": 2, "recursion": 2, "recursive": 2, "data structure": 3, "flowchart": 2,
+    },
+    AnimationType.STATISTICS: {
+        "bar chart": 3, "pie chart": 3, "histogram": 3, "box plot": 3, "scatter": 2, "distribution": 2,
+        "probability": 2, "regression": 2, "correlation": 2, "statistic": 2, "mean": 1, "median": 2,
+        "variance": 2, "standard deviation": 3, "data": 1, "survey": 2, "sales": 2, "chart": 1,
+    },
+    AnimationType.PHYSICS: {
+        "physics": 3, "pendulum": 3, "force": 2, "projectile": 3, "velocity": 2, "acceleration": 2,
+        "momentum": 2, "gravity": 2, "gravitational": 2, "orbit": 2, "wave": 2, "electric": 2,
+        "magnetic": 2, "electromagnetic": 3, "charge": 2, "particle": 2, "optics": 3, "lens": 2,
+        "refraction": 3, "oscillat": 2, "spring": 2, "friction": 2, "collision": 2, "quantum": 2,
+        "thermodynamic": 3, "energy": 1,
+    },
+    AnimationType.GRAPH3D: {
+        "3d": 1, "three dimensional": 1, "three-dimensional": 1, "torus": 3, "sphere": 2,
+        "surface": 2, "mobius": 3, "helix": 2, "paraboloid": 3, "cone": 2, "cylinder": 2,
+    },
+    AnimationType.GRAPH2D: {
+        "plot": 1, "function": 1, "sin": 2, "sine": 2, "cos": 2, "cosine": 2, "tan": 2,
+        "polynomial": 2, "parabola": 2, "derivative": 2, "integral": 2, "tangent": 2, "exponential": 2, "logarithm": 2, "equation": 1,
+        "axes": 1, "coordinate": 1, "curve": 1, "limit": 1,
+    },
+}
+
+WHOLE_WORDS = {"sin", "cos", "tan", "mean", "data", "sales", "lens", "cone", "limit", "3d", "bfs", "dfs"}
+
+
+def _keywordPattern(keyword: str):
+    end = r"\b" if keyword in WHOLE_WORDS else ""
+    return re.compile(rf"\b{re.escape(keyword)}{end}")
+
+
+PATTERNS = {
+    animationType: [(_keywordPattern(keyword), weight) for keyword, weight in keywords.items()]
+    for animationType, keywords in KEYWORDS.items()
+}
+
+# The best type must score at least this and beat the runner-up by this much
+MIN_SCORE = 2
+MIN_MARGIN = 2
+
+
+def predictAnimationType(query: str) -> Optional[AnimationType]:
+    """The likely animation type of `query`, or None when the keywords do not settle it."""
+    text = query.lower()
+    scores = sorted(
+        (
+            (sum(weight for pattern, weight in patterns if pattern.search(text)), animationType)
+            for animationType, patterns in PATTERNS.items()
+        ),
+        key=lambda score: score[0],
+        reverse=True,
+    )
+    (best, animationType), (runnerUp, _) = scores[0], scores[1]
+    if best < MIN_SCORE or best - runnerUp < MIN_MARGIN:
+        return None
+    return animationType
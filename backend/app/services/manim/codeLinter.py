@@ -0,0 +1,275 @@
+import ast
+import builtins
+import importlib
+from functools import lru_cache
+from typing import List, Optional
+from pydantic import BaseModel
+
+# Names removed or renamed in Manim v0.19 -> replacement hint
+REMOVED_NAMES = {
+    "ShowCreation": "use `Create`",
+    "ParametricSurface": "renamed to `Surface`",
+    "PBRMaterial": "does not exist; style with `.set_fill()` / `.set_stroke()`",
+    "Text3D": "does not exist; extrude a 2D `Text` instead",
+    "QuadraticBezier": "use `Bezier([p0, p1, p2])`",
+    "TextMobject": "use `Text`",
+    "TexMobject": "use `MathTex`",
+    "GraphScene": "use `Scene` with `Axes`",
+    "ThreeDAxesScene": "use `ThreeDScene` with `ThreeDAxes`",
+}
+
+# Methods removed in Manim v0.19 -> replacement hint
+REMOVED_METHODS = {
+    "get_graph": "use `axes.plot()`",
+    "to_center": "use `.move_to(ORIGIN)`",
+    "set_background": "set `self.camera.background_color` instead",
+}
+
+# Methods missing on axes only; `NumberLine.add_numbers()` is still valid
+AXES_CLASSES = {"Axes", "ThreeDAxes"}
+REMOVED_AXES_METHODS = {
+    "add_numbers": "use `.add_coordinates()`",
+}
+
+# Constructor keyword arguments that no v0.19 mobject accepts, so they end up
+# rejected by Mobject.__init__. Keywords valid on some classes (e.g.
+# `Angle(other_angle=...)`) do not belong here.
+REMOVED_KWARGS = {
+    "opacity": "call `.set_opacity()` after construction",
+    "disappearing_time": "use `dissipating_time`",
+    "get_x_axis_label": "call `axes.get_x_axis_label()` after construction",
+}
+
+# Method keyword arguments removed in v0.19, per method
+REMOVED_METHOD_KWARGS = {
+    "next_to": {"align_l": "use `aligned_edge=`"},
+}
+
+# Calls whose presence means the static pass cannot vouch for the code
+DYNAMIC_CALLS = {"exec", "eval", "__import__", "getattr", "globals", "locals"}
+
+
+class LintIssue(BaseModel):
+    line: int
+    rule: str
+    message: str
+
+
+class LintResult(BaseModel):
+    issues: List[LintIssue] = []
+    uncertain: bool = False
+
+    @property
+    def isCodeGood(self) -> bool:
+        return not self.issues
+
+    @property
+    def errorMessage(self) -> str:
+        return "\n".join(f"Line {issue.line}: [{issue.rule}] {issue.message}" for issue in self.issues)
+
+
+@lru_cache(maxsize=1)
+def manimNamespace() -> Optional[frozenset]:
+    """Names exported by the installed `manim` package, or None if it is not importable."""
+    try:
+        manim = importlib.import_module("manim")
+    except Exception:
+        return None
+    return frozenset(dir(manim))
+
+
+def _calledName(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _receiverKey(node) -> Optional[str]:
+    """`name` or `self.name` for an expression that can be tracked across statements."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+        return f"self.{node.attr}"
+    return None
+
+
+def _isSelfCall(node, method: str) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == method
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == "self"
+    )
+
+
+class _ManimApiVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.issues: List[LintIssue] = []
+        self.bound = set(dir(builtins))
+        self.loaded = []
+        self.starImports = set()
+        self.manimImports = []
+        self.dynamic = False
+        # Names and self attributes currently holding Axes / ThreeDAxes
+        self.axes = set()
+
+    def add(self, node, rule, message):
+        self.issues.append(LintIssue(line=getattr(node, "lineno", 0), rule=rule, message=message))
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.bound.add((alias.asname or alias.name).split(".")[0])
+            if alias.name.startswith("manim."):
+                self.add(node, "deprecated-import", f"import `{alias.name}` from the top-level `manim` package instead")
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ""
+        for alias in node.names:
+            if alias.name == "*":
+                self.starImports.add(module)
+            else:
+                self.bound.add(alias.asname or alias.name)
+                if module == "manim":
+                    self.manimImports.append((node, alias.name))
+        if module.startswith("manim.mobject") or module.startswith("manim.mobjects"):
+            self.add(node, "deprecated-import", f"import from the top-level `manim` package instead of `{module}`")
+
+    def visit_FunctionDef(self, node):
+        self.bound.add(node.name)
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            self.bound.add(arg.arg)
+        if args.vararg:
+            self.bound.add(args.vararg.arg)
+        if args.kwarg:
+            self.bound.add(args.kwarg.arg)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            self.bound.add(arg.arg)
+        if args.vararg:
+            self.bound.add(args.vararg.arg)
+        if args.kwarg:
+            self.bound.add(args.kwarg.arg)
+        self.generic_visit(node)
+
+    def visit_ClassDef(self, node):
+        self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        isAxes = isinstance(node.value, ast.Call) and _calledName(node.value) in AXES_CLASSES
+        for target in node.targets:
+            key = _receiverKey(target)
+            if key is None:
+                continue
+            if isAxes:
+                self.axes.add(key)
+            else:
+                self.axes.discard(key)
+        self.generic_visit(node)
+
+    def _isAxes(self, node) -> bool:
+        if isinstance(node, ast.Call):
+            return _calledName(node) in AXES_CLASSES
+        return _receiverKey(node) in self.axes
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, (ast.Store, ast.Del)):
+            self.bound.add(node.id)
+        else:
+            self.loaded.append(node)
+            if node.id in REMOVED_NAMES:
+                self.add(node, "removed-name", f"`{node.id}` is not available in Manim v0.19: {REMOVED_NAMES[node.id]}")
+
+    def visit_Attribute(self, node):
+        # self.camera.animate does not exist on ThreeDCamera
+        if (
+            node.attr == "animate"
+            and isinstance(node.value, ast.Attribute)
+            and node.value.attr == "camera"
+            and isinstance(node.value.value, ast.Name)
+            and node.value.value.id == "self"
+        ):
+            self.add(node, "camera-animate", "`self.camera.animate` is not supported; use `self.move_camera(...)` or `self.camera.frame.animate`")
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = _calledName(node)
+
+        if name in DYNAMIC_CALLS and isinstance(node.func, ast.Name):
+            self.dynamic = True
+
+        if isinstance(node.func, ast.Attribute) and name in REMOVED_METHODS:
+            self.add(node, "removed-method", f"`.{name}()` is not available in Manim v0.19: {REMOVED_METHODS[name]}")
+
+        if isinstance(node.func, ast.Attribute) and name in REMOVED_AXES_METHODS and self._isAxes(node.func.value):
+            self.add(node, "removed-method", f"`.{name}()` is not available on axes in Manim v0.19: {REMOVED_AXES_METHODS[name]}")
+
+        if isinstance(node.func, ast.Attribute) and name in REMOVED_METHOD_KWARGS:
+            for keyword in node.keywords:
+                if keyword.arg in REMOVED_METHOD_KWARGS[name]:
+                    self.add(node, "removed-kwarg", f"`.{name}(..., {keyword.arg}=...)` is rejected in Manim v0.19: {REMOVED_METHOD_KWARGS[name][keyword.arg]}")
+
+        if name and name[:1].isupper():
+            for keyword in node.keywords:
+                if keyword.arg in REMOVED_KWARGS:
+                    self.add(node, "removed-kwarg", f"`{name}(..., {keyword.arg}=...)` is rejected in Manim v0.19: {REMOVED_KWARGS[keyword.arg]}")
+
+        if name == "TracedPath" and not node.args and not any(k.arg == "traced_point_func" for k in node.keywords):
+            self.add(node, "traced-path", "`TracedPath` requires `traced_point_func=lambda: mob.get_center()`")
+
+        if _isSelfCall(node, "play"):
+            if not node.args:
+                self.add(node, "empty-play", "`self.play()` needs at least one animation")
+            for arg in node.args:
+                if _isSelfCall(arg, "move_camera"):
+                    self.add(node, "play-move-camera", "`self.move_camera(...)` returns None; call it directly instead of passing it to `self.play()`")
+
+        self.generic_visit(node)
+
+
+def lintManimCode(code: str, sceneName: Optional[str] = None) -> LintResult:
+    """Statically check generated scene code for Manim v0.19 execution breakers."""
+    try:
+        compile(code, sceneName or "<scene>", "exec")
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return LintResult(issues=[LintIssue(line=e.lineno or 0, rule="syntax", message=f"SyntaxError: {e.msg}")])
+
+    visitor = _ManimApiVisitor()
+    visitor.visit(tree)
+    issues = visitor.issues
+    uncertain = visitor.dynamic or bool(visitor.starImports - {"manim"})
+
+    if sceneName and not any(isinstance(node, ast.ClassDef) and node.name == sceneName for node in tree.body):
+        issues.append(LintIssue(line=0, rule="scene-name", message=f"The scene class must be named exactly `{sceneName}`"))
+
+    namespace = manimNamespace()
+    if namespace is None:
+        uncertain = True
+    else:
+        for node, name in visitor.manimImports:
+            if name not in namespace:
+                issues.append(LintIssue(line=node.lineno, rule="unresolved-import", message=f"`{name}` cannot be imported from `manim`"))
+
+        known = visitor.bound | (namespace if "manim" in visitor.starImports else frozenset())
+        reported = set()
+        for node in visitor.loaded:
+            if node.id not in known and node.id not in reported and node.id not in REMOVED_NAMES:
+                reported.add(node.id)
+                issues.append(LintIssue(line=node.lineno, rule="undefined-name", message=f"NameError: `{node.id}` is not defined or imported"))
+
+    return LintResult(issues=sorted(issues, key=lambda issue: issue.line), uncertain=uncertain)
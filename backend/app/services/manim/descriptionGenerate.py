@@ -29,20 +29,8 @@ from pydantic import ValidationError
 from app.core.internalServerErrorHandle import retry
 import logging
 from app.schema.ServiceSchema import AnimationType 
-from app.services.manim.animationTypes import (
-    COMPUTER_DATASTRUCTURE,
-    GRAPH2D,
-    GRAPH3D,
-    STATISTICS,
-    PHYSICS,
-)
-ANIMATION_MAP = {
-    AnimationType.GRAPH2D: GRAPH2D,
-    AnimationType.COMPUTER_DATASTRUCTURE: COMPUTER_DATASTRUCTURE,
-    AnimationType.GRAPH3D: GRAPH3D,
-    AnimationType.STATISTICS: STATISTICS,
-    AnimationType.PHYSICS: PHYSICS,
-}
+from app.services.manim.prompts import withRulesPrefix
+from app.services.manim.ruleRegistry import stageRules
 
 load_dotenv()
 
@@ -67,11 +55,11 @@ validation = """
 
 async def generateDetailedDescription(state: DescriptionGenerationState):
     print("\n******Generating detailed description ********\n")
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
+    animationTypeRule = stageRules(state.animationType, "description")
     userQuery = state.userQuery
     structuredLlm = llmFlash.with_structured_output(DetailDescription)
     
-    systemPrompt = """
+    systemPrompt = withRulesPrefix("""
 You are a **Manim v0.19+ Animation Planner**.
 Your task: Convert the user’s request into a **complete, step-by-step scene description**.
 
@@ -96,12 +84,6 @@ Your task: Convert the user’s request into a **complete, step-by-step scene de
 
 ---
 
-## Animation Type Rules
-
-{animationTypeRule}
-
----
-
 ## Output Format
 
 * Always use **Step N:** format.
@@ -115,7 +97,7 @@ Step 1: Place a NumberPlane at coordinates (0,0) with x_range from -5 to 5 and y
 Step 2: Show the text 'ax² + bx + c = 0' at position (0,2), font='Arial', font_size=64, color=white, opacity=1. Animate the writing of the text over 2 seconds. 
 Step 3: Move the character 'c' to position (3,2) using a transformation animation over 2 seconds. 
 Step 4: Place a red cube at coordinates (-2,0,1), size 1, opacity 0.8. Rotate the cube around the y-axis for 3 seconds.
-"""
+""")
 
     # msg = [
     #     SystemMessage(content=systemPrompt.format(
@@ -162,10 +144,10 @@ def validateDescription(state: DescriptionGenerationState):
     print("\n******Checking is this Correct or not ********\n")
     detailedDescription = state.detailedDescription
     userQuery = state.userQuery
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
+    animationTypeRule = stageRules(state.animationType, "description")
     structured_llm = llmFlash.with_structured_output(CheckDetailedDescription)
     
-    system_prompt = """
+    system_prompt = withRulesPrefix("""
 You are a **Manim v0.19+ description validator**.
 Your task: Check if the description matches the **user’s original request** and is **technically implementable** under Manim v0.19+.
 
@@ -175,10 +157,6 @@ Your task: Check if the description matches the **user’s original request** an
 
 {validation}
 
-## Animation Type Rules
-
-{animationTypeRule}
-
 ---
 
 ## Description to Validate
@@ -204,7 +182,7 @@ Your task: Check if the description matches the **user’s original request** an
 
 Focus only on **matching the user request and completeness**, ignoring any code or syntax concerns.
 
-"""
+""")
 
     messages = [
         SystemMessage(content=system_prompt.format(
@@ -239,7 +217,7 @@ Focus only on **matching the user request and completeness**, ignoring any code
 
 async def refineDescription(state: DescriptionGenerationState):
     print("\n**** refineDescription *****\n")
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
+    animationTypeRule = stageRules(state.animationType, "description")
 
     userQuery = state.userQuery
     description = state.detailedDescription
@@ -247,7 +225,7 @@ async def refineDescription(state: DescriptionGenerationState):
     structured = llmFlash.with_structured_output(DetailDescription)
     descriptionRefine = state.descriptionRefine + 1
     
-    systemPrompt = """
+    systemPrompt = withRulesPrefix("""
 You are a **Manim v0.19+ description refiner**.
 Your task: Revise the given description so it satisfies **all validation rules** in one pass.
 
@@ -262,10 +240,6 @@ Do not just fix the listed errors. Instead:
 
 {validation}
 
-## Animation Type Rules
-
-{animationTypeRule}
-
 ---
 
 ## Inputs
@@ -292,7 +266,7 @@ Step 2: Show the text 'ax² + bx + c = 0' at position (0,2), font='Arial', font_
 Step 3: Move the character 'c' to position (3,2) using a transformation animation over 2 seconds. 
 Step 4: Place a red cube at coordinates (-2,0,1), size 1, opacity 0.8. Rotate the cube around the y-axis for 3 seconds.
 
-"""
+""")
 
     # messages = [
     #     SystemMessage(content=systemPrompt.format(
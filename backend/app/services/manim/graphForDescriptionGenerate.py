@@ -4,6 +4,7 @@ from langgraph.graph import (
     START, 
     END
 )
+from app.core.metrics import timedNode
 from app.services.manim.descriptionGenerate import (
     generateDetailedDescription,
     validateDescription,
@@ -16,9 +17,9 @@ from app.services.manim.descriptionGenerate import (
 graph_build = StateGraph(DescriptionGenerationState)
 
 # graph_build.add_node("isUserQueryPossible", isUserQueryPossible)
-graph_build.add_node("generateDetailedDescription", generateDetailedDescription)
-graph_build.add_node("validateDescription", validateDescription)
-graph_build.add_node("refineDescription", refineDescription)
+graph_build.add_node("generateDetailedDescription", timedNode("generateDetailedDescription", generateDetailedDescription))
+graph_build.add_node("validateDescription", timedNode("validateDescription", validateDescription))
+graph_build.add_node("refineDescription", timedNode("refineDescription", refineDescription))
 
 graph_build.add_edge(START, "generateDetailedDescription")
 
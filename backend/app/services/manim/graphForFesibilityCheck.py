@@ -6,10 +6,11 @@ from langgraph.graph import (
 from app.schema.ServiceSchema import isQueryPossible
 
 from app.services.manim.queryFeasibilityCheck import isQuery
+from app.core.metrics import timedNode
 
 graph_build = StateGraph(isQueryPossible)
 
-graph_build.add_node("isQuery", isQuery)
+graph_build.add_node("isQuery", timedNode("isQuery", isQuery))
 
 graph_build.add_edge(START, "isQuery")
 graph_build.add_edge("isQuery", END)
@@ -10,50 +10,74 @@ from app.services.manim.manimCodeGeneration import (
     agentRunManimCode, 
     manimRouter,executionRouter, 
     shouldStartOverRouter, 
-    handleFailureAndReset
+    handleFailureAndReset,
+    entryRouter
 )
 from app.schema.ServiceSchema import mainmState
+from app.core.metrics import timedNode
 
-graph_build = StateGraph(mainmState)
 
-graph_build.add_node("agentCreateFile", agentCreateFile)
-graph_build.add_node("agentCheckFileCode", agentCheckFileCode)
-graph_build.add_node("agentReWriteManimCode", agentReWriteManimCode)
-graph_build.add_node("agentRunManimCode", agentRunManimCode)
-graph_build.add_node("handleFailureAndReset", handleFailureAndReset)
+def buildCodeGraph(withRender: bool = True):
+    """Code generation loop; without the render node it stops once the code passes the checks.
 
+    The render-less graph backs the split pipeline, where renders run on their
+    own queue and failed renders come back to it to be rewritten.
+    """
+    graph_build = StateGraph(mainmState)
 
-graph_build.add_edge(START, "agentCreateFile")
-graph_build.add_edge("agentCreateFile", "agentCheckFileCode")
-graph_build.add_edge("agentReWriteManimCode", "agentCheckFileCode")
+    graph_build.add_node("agentCreateFile", timedNode("agentCreateFile", agentCreateFile))
+    graph_build.add_node("agentCheckFileCode", timedNode("agentCheckFileCode", agentCheckFileCode))
+    graph_build.add_node("agentReWriteManimCode", timedNode("agentReWriteManimCode", agentReWriteManimCode))
+    graph_build.add_node("handleFailureAndReset", timedNode("handleFailureAndReset", handleFailureAndReset))
 
-graph_build.add_conditional_edges(
-    "agentCheckFileCode",
-    manimRouter,
-    {
-        "agentRunManimCode": "agentRunManimCode",
-        "agentReWriteManimCode": "agentReWriteManimCode",
-        "limit_reached": "handleFailureAndReset",
-    },
-)
+    if withRender:
+        graph_build.add_node("agentRunManimCode", timedNode("agentRunManimCode", agentRunManimCode))
+        graph_build.add_edge(START, "agentCreateFile")
+    else:
+        graph_build.add_conditional_edges(
+            START,
+            entryRouter,
+            {
+                "agentCreateFile": "agentCreateFile",
+                "agentReWriteManimCode": "agentReWriteManimCode",
+            },
+        )
 
-graph_build.add_conditional_edges(
-    "agentRunManimCode",
-    executionRouter,
-    {
-        "fix": "agentReWriteManimCode",        
-        "done": END, 
-        "limit": "handleFailureAndReset",
-    },
-)
+    graph_build.add_edge("agentCreateFile", "agentCheckFileCode")
+    graph_build.add_edge("agentReWriteManimCode", "agentCheckFileCode")
+
+    graph_build.add_conditional_edges(
+        "agentCheckFileCode",
+        manimRouter,
+        {
+            "agentRunManimCode": "agentRunManimCode" if withRender else END,
+            "agentReWriteManimCode": "agentReWriteManimCode",
+            "limit_reached": "handleFailureAndReset",
+        },
+    )
+
+    if withRender:
+        graph_build.add_conditional_edges(
+            "agentRunManimCode",
+            executionRouter,
+            {
+                "fix": "agentReWriteManimCode",        
+                "done": END, 
+                "limit": "handleFailureAndReset",
+            },
+        )
+
+    graph_build.add_conditional_edges(
+        "handleFailureAndReset",
+        shouldStartOverRouter,
+        {
+            "agentCreateFile": "agentCreateFile", 
+            "stop": END,
+        },
+    )
+
+    return graph_build.compile()
 
-graph_build.add_conditional_edges(
-    "handleFailureAndReset",
-    shouldStartOverRouter,
-    {
-        "agentCreateFile": "agentCreateFile", 
-        "stop": END,
-    },
-)
 
-graph_for_mainm_code_generate = graph_build.compile()
\ No newline at end of file
+graph_for_mainm_code_generate = buildCodeGraph()
+graph_for_mainm_code_write = buildCodeGraph(withRender=False)
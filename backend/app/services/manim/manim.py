@@ -8,202 +8,443 @@ from app.services.manim.graphForManimCodeGenerate import graph_for_mainm_code_ge
 from app.services.manim.graphForFesibilityCheck import graph_for_query_fesibility_check
 from app.core.queue import taskQueue
 from app.models.UserHistory import Message, UsersHistory
-from app.core.db import init_beanie_for_workers, close_worker_db
+from app.core.db import get_worker_db
+from app.core.workerLoop import runOnWorkerLoop
+from celery.worker.state import revoked as revoked_tasks
+from celery.exceptions import Ignore
+from celery.signals import task_postrun
+from celery import states
 from bson import ObjectId
 import asyncio
 from datetime import datetime
 import os
 import shutil
-from app.utils.supabaseClient import uploadFile
+from app.utils.supabaseClient import uploadFile, SIGNED_URL_EXPIRES_IN
+from app.services.manim.renderCache import storeRenderLink
+from app.core.resultCache import resultCacheKey, getCachedResult, setCachedResult
+from app.config import Config
+from app.core.scheduler import releaseJobSlot
+from app.core.queueEstimates import recordProgress, setJobAnimationType, FINISHED_PROGRESS
+from app.core.metrics import increment, timed
+from app.core.llmCache import skipLlmCacheReads, llmCacheJob, settleJobLlmCache
+from app.core.llmUsage import bindJobUsage, currentJobUsage
+from app.core.logger import logger
+from app.services.manim.animationTypeClassifier import predictAnimationType
+from app.core.progressEvents import (
+    publishJobEvent,
+    runJobWrite,
+    progressPayload,
+    resultPayload,
+    failedPayload,
+    cancelledPayload
+)
 from app.schema.ServiceSchema import AnimationType
 
-@taskQueue.task(name="call_graph_task", bind=True)
-def call_graph(self, query, userID, quality, format, historyId=None, resolution="1920x1080"):
-    async def _inner():
-        try:
-            await init_beanie_for_workers()
-            
-            def update_progress(stage, progress_percent, details=None):
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'current_stage': stage,
-                        'progress': progress_percent,
-                        'details': details,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                )
-            
-            try:
-                update_progress("Initializing", 10, "Setting up description generation state")
-                update_progress("Checking Feasibility", 20, "Analyzing if user query is possible")
-                print(f"DEBUG: About to check feasibility for query: {query}")
-
-                fesibleState = isQueryPossible(
-                    userQuery=query,
-                    chatName=None,
-                    animationType=None,
-                )
-                print(f"DEBUG: Created feasibility state: {fesibleState}")
-
-                fesibleResult = graph_for_query_fesibility_check.invoke(fesibleState)
-                print(f"DEBUG: Feasibility check result: {fesibleResult}")
+async def saveMessageToHistory(userID, historyId, chatName, message):
+    """Append `message` to an existing history or start a new one. Returns the history id."""
+    if historyId:
+        existing_history = await UsersHistory.get(ObjectId(historyId))
+        if existing_history:
+            existing_history.messages.append(message)
+            await existing_history.save()
+            return str(existing_history.id)
+
+    history = UsersHistory(
+        userId=ObjectId(userID),
+        chatName=chatName,
+        messages=[message]
+    )
+    await history.insert()
+    return str(history.id)
+
+
+async def reuseCachedResult(update_progress, cached, query, userID, historyId):
+    print(f"DEBUG: Result cache hit for query: {query}")
+    message = Message(
+        userQuery=query,
+        description=cached.get("description"),
+        code=cached.get("code"),
+        quality=cached.get("quality"),
+        filename=cached.get("filename"),
+        link=cached.get("link")
+    )
+    history_id = await saveMessageToHistory(userID, historyId, cached.get("chat_name"), message)
+    update_progress("Completed", 100, "Reused a recent result for the same request")
+    return {
+        "success": True,
+        "link": cached.get("link"),
+        "historyId": history_id,
+        "data": cached.get("data"),
+        "chat_name": cached.get("chat_name"),
+        "description": cached.get("description"),
+        "quality": cached.get("quality"),
+        "code": cached.get("code"),
+        "cached": True,
+    }
+
+
+async def checkFeasibility(update_progress, query):
+    """Returns the feasibility result, or the job's final result when the query is not feasible."""
+    update_progress("Checking Feasibility", 20, "Analyzing if user query is possible")
+    print(f"DEBUG: About to check feasibility for query: {query}")
+
+    fesibleState = isQueryPossible(
+        userQuery=query,
+        chatName=None,
+        animationType=None,
+    )
+    print(f"DEBUG: Created feasibility state: {fesibleState}")
+
+    fesibleResult = await graph_for_query_fesibility_check.ainvoke(fesibleState)
+    print(f"DEBUG: Feasibility check result: {fesibleResult}")
+
+    if fesibleResult.get("isFeasible") is False:
+        print(f"DEBUG: STOPPING EXECUTION - Query not feasible: {fesibleResult.get('reason')}")
+        update_progress("Failed", 100, f"Not feasible: {fesibleResult.get('reason', 'Unknown reason')}")
+        return fesibleResult, {
+            "success": False,
+            "message": "Not possible",
+            "reason": fesibleResult.get('reason'),
+            "stage": "feasibility_check"
+        }
+
+    print(f"DEBUG: CONTINUING EXECUTION - Query is feasible")
+    update_progress(
+        "Description Generation",
+        30,
+        f"Chat name: {fesibleResult.get('chatName')}",
+        animationType=fesibleResult.get("animationType")
+    )
+    return fesibleResult, None
+
+
+def newDescriptionState(query, format, animationType, chatName=None, reason=None):
+    return DescriptionGenerationState(
+        userQuery=query,
+        descriptions=[],
+        detailedDescription="",
+        descriptionRefine=0,
+        AutoComplete=True,
+        isGood=None,
+        detailedDescriptionError= None,
+        format = format,
+        chatName=chatName,
+        reason=reason,
+        animationType=animationType,
+    )
+
+
+async def generateDescription(update_progress, query, format, fesibleResult):
+    descriptionState = newDescriptionState(
+        query,
+        format,
+        fesibleResult.get("animationType"),
+        fesibleResult.get('chatName'),
+        fesibleResult.get('reason'),
+    )
+
+    update_progress("Generating Description", 30, "Detailed description in progress")
+    return await graph_for_description_generate.ainvoke(descriptionState)
+
+
+def speculateDescription(query, format):
+    """Start the description for the predicted animation type. None when nothing is predicted.
+
+    The description prompts only read the query, format and animation type, so
+    when the feasibility check agrees with the prediction the speculative
+    result is exactly what the regular description stage would produce.
+    """
+    if not Config.SPECULATIVE_DESCRIPTION:
+        return None
+    animationType = predictAnimationType(query)
+    if animationType is None:
+        return None
+    # The task copies this context, so the job's cache and usage settings apply
+    task = asyncio.create_task(
+        graph_for_description_generate.ainvoke(newDescriptionState(query, format, animationType))
+    )
+    return animationType, task
+
+
+async def cancelSpeculation(speculation, outcome):
+    if speculation is None:
+        return
+    animationType, task = speculation
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    increment("manim_speculations_total", outcome=outcome, animationType=animationType)
+
+
+async def checkFeasibilityAndDescribe(update_progress, query, format):
+    """Run the feasibility check with the description speculatively alongside.
+
+    Returns the feasibility result, the final result when the query is not
+    feasible, and the description result when the speculation was kept (None
+    when the description still has to be generated).
+    """
+    speculation = speculateDescription(query, format)
+    try:
+        fesibleResult, notFeasible = await checkFeasibility(update_progress, query)
+    except BaseException:
+        # Job cancellation included; the speculative task must not outlive the job
+        await cancelSpeculation(speculation, "failed")
+        raise
+    if speculation is None:
+        return fesibleResult, notFeasible, None
+    if notFeasible:
+        await cancelSpeculation(speculation, "infeasible")
+        return fesibleResult, notFeasible, None
+
+    animationType, task = speculation
+    if animationType != fesibleResult.get("animationType"):
+        await cancelSpeculation(speculation, "mismatch")
+        return fesibleResult, None, None
+
+    update_progress("Generating Description", 30, "Detailed description in progress")
+    try:
+        result = await task
+    except Exception as e:
+        logger.warning(f"Speculative description failed, generating it again: {e}")
+        increment("manim_speculations_total", outcome="failed", animationType=animationType)
+        return fesibleResult, None, None
+    increment("manim_speculations_total", outcome="used", animationType=animationType)
+    return fesibleResult, None, result
+
+
+def newManimState(description, format, quality, animationType, resolution):
+    return mainmState(
+        description= description,
+        isCodeGood=None,
+        format=format,
+        error_message="",
+        rewriteAttempts=0,
+        filename="",
+        executionSuccess = None,
+        quality = quality,
+        createAgain = 0,
+        animationType=animationType,
+        resolution=resolution
+    )
+
+
+def uploadRender(update_progress, manimGeneration):
+    """Upload the rendered video (unless a cached link exists) and remove local render files."""
+    filename_without_extension = manimGeneration.get("filename").replace(".py", "")
+    link = manimGeneration.get("cachedLink")
+    if not link:
+        update_progress("Uploading", 92, "Uploading the rendered video")
+        with timed("manim_upload_duration_seconds", format=manimGeneration.get("format")):
+            link = uploadFile(filename_without_extension, manimGeneration.get("format"))
+        if manimGeneration.get("renderCacheKey"):
+            storeRenderLink(manimGeneration.get("renderCacheKey"), link, SIGNED_URL_EXPIRES_IN)
+
+    try:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        backend_dir = os.path.dirname(os.path.dirname(current_dir))
+        
+        video_file_path_with_suffix = os.path.join(backend_dir, "videos", f"{filename_without_extension}_ManimCE_v0.19.0.{manimGeneration.get('format')}")
+        video_file_path_without_suffix = os.path.join(backend_dir, "videos", f"{filename_without_extension}.{manimGeneration.get('format')}")
+        
+        if os.path.exists(video_file_path_with_suffix):
+            os.remove(video_file_path_with_suffix)
+            # print(f"Successfully removed video file: {video_file_path_with_suffix}")
+        elif os.path.exists(video_file_path_without_suffix):
+            os.remove(video_file_path_without_suffix)
+            # print(f"Successfully removed video file: {video_file_path_without_suffix}")
+        else:
+            print(f"Video file not found for cleanup: {video_file_path_with_suffix} or {video_file_path_without_suffix}")
+        
+        # Remove the partial movie files directory
+        partial_movie_dir = os.path.join(backend_dir, "videos", "partial_movie_files", filename_without_extension)
+        if os.path.exists(partial_movie_dir):
+            shutil.rmtree(partial_movie_dir)
+            print(f"Successfully removed partial movie files directory: {partial_movie_dir}")
+        else:
+            print(f"Partial movie files directory not found for cleanup: {partial_movie_dir}")
             
-                is_feasible = fesibleResult.get("isFeasible")
-                # print(f"DEBUG: Extracted feasibility value: {is_feasible}")
-                
-                if is_feasible is False:
-                    print(f"DEBUG: STOPPING EXECUTION - Query not feasible: {fesibleResult.get('reason')}")
-                    update_progress("Failed", 100, f"Not feasible: {fesibleResult.get('reason', 'Unknown reason')}")
-                    return {
-                        "success": False,
-                        "message": "Not possible",
-                        "reason": fesibleResult.get('reason'),
-                        "stage": "feasibility_check"
-                    }
-                
-                print(f"DEBUG: CONTINUING EXECUTION - Query is feasible")
-                update_progress("Description Generation", 30, f"Chat name: {fesibleResult.get('chatName')}")
-                
-                print(f"DEBUG: CONTINUING EXECUTION - Query is feasible")
-                update_progress("Description Generation", 30, f"Chat name: {fesibleResult.get('chatName')}")
-                
-                descriptionState=DescriptionGenerationState(
-                    userQuery=query,
-                    descriptions=[],
-                    detailedDescription="",
-                    descriptionRefine=0,
-                    AutoComplete=True,
-                    isGood=None,
-                    detailedDescriptionError= None,
-                    format = format,
-                    chatName=fesibleResult.get('chatName'),
-                    reason=fesibleResult.get('reason'),
-                    animationType=fesibleResult.get("animationType"),
-                )
-
-
-
-                update_progress("Generating Description", 30, "Detailed description in progress")
-                
-                result = await graph_for_description_generate.ainvoke(descriptionState)
-
-                update_progress("Generating Manim Code", 50, "Creating animation code")
-                manimGenerationState = mainmState(
-                    description= result.get("detailedDescription"),
-                    isCodeGood=None,
-                    format=descriptionState.format,
-                    error_message="",
-                    rewriteAttempts=0,
-                    filename="",
-                    executionSuccess = None,
-                    quality = quality,
-                    createAgain = 0,
-                    animationType=fesibleResult.get("animationType"),
-                    resolution=resolution
-                )
-
-                manimGeneration = await graph_for_mainm_code_generate.ainvoke(manimGenerationState)
-
-                code = manimGeneration.get('code')
-                userQuery = query
-                description = manimGeneration.get('description')
-                generated_quality = manimGeneration.get('quality')
-
-                filename_without_extension = manimGeneration.get("filename").replace(".py", "")
-                link = uploadFile(filename_without_extension, manimGeneration.get("format"))
-
-                
-                try:
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    backend_dir = os.path.dirname(os.path.dirname(current_dir))
-                    
-                    video_file_path_with_suffix = os.path.join(backend_dir, "videos", f"{filename_without_extension}_ManimCE_v0.19.0.{manimGeneration.get('format')}")
-                    video_file_path_without_suffix = os.path.join(backend_dir, "videos", f"{filename_without_extension}.{manimGeneration.get('format')}")
-                    
-                    if os.path.exists(video_file_path_with_suffix):
-                        os.remove(video_file_path_with_suffix)
-                        # print(f"Successfully removed video file: {video_file_path_with_suffix}")
-                    elif os.path.exists(video_file_path_without_suffix):
-                        os.remove(video_file_path_without_suffix)
-                        # print(f"Successfully removed video file: {video_file_path_without_suffix}")
-                    else:
-                        print(f"Video file not found for cleanup: {video_file_path_with_suffix} or {video_file_path_without_suffix}")
-                    
-                    # Remove the partial movie files directory
-                    partial_movie_dir = os.path.join(backend_dir, "videos", "partial_movie_files", filename_without_extension)
-                    if os.path.exists(partial_movie_dir):
-                        shutil.rmtree(partial_movie_dir)
-                        print(f"Successfully removed partial movie files directory: {partial_movie_dir}")
-                    else:
-                        print(f"Partial movie files directory not found for cleanup: {partial_movie_dir}")
-                        
-                except Exception as cleanup_error:
-                    print(f"Warning: Failed to remove files during cleanup: {cleanup_error}")
-
-                message = Message(
-                    userQuery=query,
-                    description=result.get("detailedDescription"),
-                    code=code,
-                    quality=generated_quality,
-                    filename=filename_without_extension,
-                    link=link
-                )
-
-                if historyId:
-                    existing_history = await UsersHistory.get(ObjectId(historyId))
-                    if existing_history:
-                        existing_history.messages.append(message)
-                        await existing_history.save()
-                        history = existing_history
-                    else:
-                        history = UsersHistory(
-                            userId=ObjectId(userID),
-                            chatName=fesibleResult.get("chatName"),
-                            messages=[message]
-                        )
-                        await history.insert()
-                    history_id = str(history.id)
-                else:
-                    history = UsersHistory(
-                        userId=ObjectId(userID),
-                        chatName=fesibleResult.get("chatName"),
-                        messages=[message]
-                    )
-                    await history.insert()
-                    history_id = str(history.id)
-
-                update_progress("Completed", 100, "Video generation completed successfully")
-                
-                return {
-                    "success": True,
-                    "link": link,
-                    "historyId": history_id,
-                    "data": manimGeneration,
-                    "chat_name": result.get("chatName"),
-                    "description": result.get("detailedDescription"),
-                    "quality": generated_quality,
-                    "code": code,
-                }
-                
-            except Exception as e:
-                error_msg = str(e)
-                update_progress("Error", 100, f"An error occurred: {error_msg}")
-                return {
-                    "success": False,
-                    "error": error_msg,
-                    "stage": "unknown"
-                }
-        finally:
-            try:
-                await close_worker_db()
-            except Exception as cleanup_error:
-                print(f"Warning: Failed to close database connection: {cleanup_error}")
+    except Exception as cleanup_error:
+        print(f"Warning: Failed to remove files during cleanup: {cleanup_error}")
+
+    return link
+
+
+async def persistGeneration(update_progress, cacheKey, query, userID, historyId, chatName, detailedDescription, manimGeneration, link):
+    """Save the message to the user's history, remember the result and build the task result."""
+    code = manimGeneration.get('code')
+    description = manimGeneration.get('description')
+    generated_quality = manimGeneration.get('quality')
+    filename_without_extension = manimGeneration.get("filename").replace(".py", "")
+    usage = currentJobUsage()
+
+    message = Message(
+        userQuery=query,
+        description=detailedDescription,
+        code=code,
+        quality=generated_quality,
+        filename=filename_without_extension,
+        link=link,
+        usage=usage
+    )
+
+    history_id = await saveMessageToHistory(userID, historyId, chatName, message)
+
+    setCachedResult(cacheKey, {
+        "link": link,
+        "chat_name": chatName,
+        "description": detailedDescription,
+        "quality": generated_quality,
+        "code": code,
+        "filename": filename_without_extension,
+        "data": {
+            "code": code,
+            "filename": manimGeneration.get("filename"),
+            "format": manimGeneration.get("format"),
+            "quality": generated_quality,
+            "description": description,
+        },
+    })
+
+    update_progress("Completed", 100, "Video generation completed successfully")
     
+    return {
+        "success": True,
+        "link": link,
+        "historyId": history_id,
+        "data": manimGeneration,
+        "chat_name": chatName,
+        "description": detailedDescription,
+        "quality": generated_quality,
+        "code": code,
+        "usage": usage,
+    }
+
+
+async def runGenerationJob(update_progress, query, userID, quality, format, historyId=None, resolution="1920x1080", bypassCache=False, jobId=None):
+    """One generation job as a coroutine; many of these share the worker event loop."""
+    await get_worker_db()
+    # Scoped to this job's task, and copied into the threads its LLM calls run in
+    skipLlmCacheReads.set(bypassCache)
+    if jobId:
+        llmCacheJob.set(jobId)
+        bindJobUsage(jobId, userID)
+
+    try:
+        update_progress("Initializing", 10, "Setting up description generation state")
+
+        cacheKey = resultCacheKey(query, quality, format, resolution)
+        cached = None if bypassCache else getCachedResult(cacheKey)
+        if cached:
+            return await reuseCachedResult(update_progress, cached, query, userID, historyId)
+
+        fesibleResult, notFeasible, result = await checkFeasibilityAndDescribe(update_progress, query, format)
+        if notFeasible:
+            return notFeasible
+
+        if result is None:
+            result = await generateDescription(update_progress, query, format, fesibleResult)
+
+        update_progress("Generating Manim Code", 50, "Creating animation code")
+        manimGenerationState = newManimState(
+            result.get("detailedDescription"),
+            format,
+            quality,
+            fesibleResult.get("animationType"),
+            resolution
+        )
+
+        manimGeneration = await graph_for_mainm_code_generate.ainvoke(
+            manimGenerationState,
+            config={"configurable": {"progressCallback": update_progress}}
+        )
+
+        link = await asyncio.to_thread(uploadRender, update_progress, manimGeneration)
+
+        return await persistGeneration(
+            update_progress,
+            cacheKey,
+            query,
+            userID,
+            historyId,
+            fesibleResult.get("chatName"),
+            result.get("detailedDescription"),
+            manimGeneration,
+            link
+        )
+        
+    except Exception as e:
+        error_msg = str(e)
+        update_progress("Error", 100, f"An error occurred: {error_msg}")
+        return {
+            "success": False,
+            "error": error_msg,
+            "stage": "unknown"
+        }
+
+
+def progressReporter(task_id):
+    """Progress callback writing PROGRESS meta for `task_id`, from any thread or worker.
+
+    The writes go through runJobWrite, so a call on the worker loop returns at once.
+    """
+    def write(stage, meta, animationType):
+        if animationType:
+            setJobAnimationType(task_id, animationType)
+        recordProgress(task_id, stage)
+        taskQueue.backend.store_result(task_id, meta, 'PROGRESS')
+        publishJobEvent(task_id, progressPayload(meta))
+
+    def update_progress(stage, progress_percent, details=None, animationType=None):
+        if stage in FINISHED_PROGRESS:
+            increment("manim_jobs_total", outcome=stage.lower())
+        meta = {
+            'current_stage': stage,
+            'progress': progress_percent,
+            'details': details,
+            'timestamp': datetime.now().isoformat()
+        }
+        runJobWrite(write, stage, meta, animationType)
+    return update_progress
+
+
+@taskQueue.task(name="call_graph_task", bind=True)
+def call_graph(self, query, userID, quality, format, historyId=None, resolution="1920x1080", bypassCache=False):
+    # Task context is thread-local, and the job itself runs on the loop thread
+    task_id = self.request.id
+
+    if Config.PIPELINE_MODE == "split":
+        from app.services.manim.pipeline import startPipeline
+        priority = (self.request.delivery_info or {}).get("priority")
+        startPipeline(task_id, query, userID, quality, format, historyId, resolution, bypassCache, priority)
+        # The last pipeline stage stores the result under this task's id
+        raise Ignore()
+
     try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        result = runOnWorkerLoop(
+            runGenerationJob(progressReporter(task_id), query, userID, quality, format, historyId, resolution, bypassCache, task_id),
+            isCancelled=lambda: task_id in revoked_tasks
+        )
+    except asyncio.CancelledError:
+        # Thread pools cannot terminate a running task, so the revoke is recorded here,
+        # after the job's queued progress writes
+        settleJobLlmCache(task_id, False)
+        runJobWrite(self.backend.mark_as_revoked, task_id, "cancelled")
+        runJobWrite(publishJobEvent, task_id, cancelledPayload())
+        raise Ignore()
+    except Exception as e:
+        settleJobLlmCache(task_id, False)
+        runJobWrite(publishJobEvent, task_id, failedPayload(e))
+        raise
+    settleJobLlmCache(task_id, bool(result.get("success")))
+    # Waits for the queued progress writes, so Celery stores the result last
+    runJobWrite(publishJobEvent, task_id, resultPayload(result))
+    return result
+
 
-    return loop.run_until_complete(_inner())
\ No newline at end of file
+@task_postrun.connect(sender=call_graph)
+def releaseUserSlot(task_id=None, args=None, state=None, **kwargs):
+    # Split jobs are still running when call_graph_task returns; their last stage releases the slot
+    if state != states.IGNORED and args and len(args) > 1:
+        releaseJobSlot(args[1], task_id)
@@ -19,32 +19,51 @@ from app.core.llm import (
     llmFlash
 )
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
 from langgraph.graph import END
 import os
 import subprocess
+import threading
+import time
 import uuid
 from app.core.internalServerErrorHandle import retry
 from app.core.logger import logger
+from app.core.metrics import increment, observe
+from app.core.llmCache import skipLlmCacheReads
 from app.schema.ServiceSchema import AnimationType 
-from app.services.manim.animationTypes import (
-    COMPUTER_DATASTRUCTURE,
-    GRAPH2D,
-    GRAPH3D,
-    STATISTICS,
-    PHYSICS,
+from app.services.manim.renderCache import (
+    renderCacheKey,
+    lookupRender,
+    restoreRender,
+    storeRender
 )
-ANIMATION_MAP = {
-    AnimationType.GRAPH2D: GRAPH2D,
-    AnimationType.COMPUTER_DATASTRUCTURE: COMPUTER_DATASTRUCTURE,
-    AnimationType.GRAPH3D: GRAPH3D,
-    AnimationType.STATISTICS: STATISTICS,
-    AnimationType.PHYSICS: PHYSICS,
-}
+from app.services.manim.renderProgress import (
+    parseProgressLine,
+    estimateAnimationCount,
+    ThrottledProgressReporter
+)
+from app.services.manim.sectionedRender import (
+    SECTIONABLE_FORMATS,
+    sectionWorkerCount,
+    countSceneAnimations,
+    run_manim_scene_sectioned
+)
+from app.services.manim.preflight import run_manim_preflight
+from app.services.manim.codeLinter import lintManimCode
+from app.services.manim.sceneChecker import getSceneChecker
+from app.services.manim.renderPool import getRenderPool, RenderPoolUnavailable
+from app.services.manim.renderSupervisor import superviseCommand
+from app.services.manim.texCache import TexWorkspace, MANIM_COMMAND
+from app.config import Config
+from app.services.manim.prompts import withRulesPrefix
+from app.services.manim.ruleRegistry import stageRules
 
 load_dotenv()
 
-MANIM_RENDER_TIMEOUT = 1000
+MANIM_RENDER_TIMEOUT = Config.MANIM_RENDER_TIMEOUT
+# Jobs share one worker process; only this many may check and render at a time
+renderSlots = threading.BoundedSemaphore(max(1, Config.RENDER_SLOTS))
 critical = """
 <CRITICAL>:You MUST write code that is compatible with Manim v0.19+ ONLY. Do NOT use any deprecated or removed methods..
 
@@ -376,7 +395,46 @@ def read_file(filename):
 import subprocess
 import os
 
-def run_manim_scene(filename, state: mainmState):
+def formatExecutionFailure(filename, full_output, reason=None):
+    logger.error("MANIM EXECUTION FAILED for file '%s'. Full output:\n%s", filename, "".join(full_output))
+    if reason is not None:
+        tail = "".join(full_output[-20:])
+        return f"MANIM EXECUTION FAILED. The file '{filename}' was stopped: {reason}\n\nLast output:\n{tail}"
+    error_text = None
+    print("------------Collecting All the Error Only--------------")
+    for i, line in enumerate(full_output):
+        if "ERROR" in line or "Traceback" in line:
+            # Join from the first error-related line till the end
+            error_text = "".join(full_output[i:])
+            break
+    if error_text is not None:
+        return f"MANIM EXECUTION FAILED. The file '{filename}' has an error. Review output below:\n\n{error_text}"
+    last_line = full_output[-1] if full_output else "No output captured."
+    return f"MANIM EXECUTION FAILED. The file '{filename}' has an error. Review output below:\n\n{last_line}"
+
+
+def renderScene(filename, state: mainmState, onProgress=None, animationCount=None, extraArgs=()):
+    """Render with the sectioned parallel mode when the scene is long enough, otherwise in one process."""
+    code = read_file(filename)
+    if (
+        state.format in SECTIONABLE_FORMATS
+        and sectionWorkerCount() > 1
+        and estimateAnimationCount(code) >= Config.RENDER_SECTION_MIN_ANIMATIONS
+    ):
+        if animationCount is None:
+            animationCount = countSceneAnimations(filename, extraArgs)
+        if animationCount is not None and animationCount >= Config.RENDER_SECTION_MIN_ANIMATIONS:
+            success, full_output, reason = run_manim_scene_sectioned(filename, state, animationCount, onProgress, extraArgs)
+            if success:
+                return f"Manim render completed for {filename}."
+            if success is False:
+                return formatExecutionFailure(filename, full_output, reason)
+            print("Sectioned render unavailable, falling back to a single process render")
+
+    return run_manim_scene(filename=filename, state=state, onProgress=onProgress, extraArgs=extraArgs)
+
+
+def run_manim_scene(filename, state: mainmState, onProgress=None, extraArgs=()):
     print("****************** running a manim file ****************")
     flags=f"--progress_bar display -{state.quality}"
     filepath = f"./temp/{filename}"
@@ -386,39 +444,35 @@ def run_manim_scene(filename, state: mainmState):
     if not os.path.exists(filepath):
         return f"Error: File '{filepath}' not found."
 
-    command = ["manim", "render", filepath, scene_name, "--format", output_format, "--custom_folders", "-r", f"{width},{height}"]
-    command.extend(flags.split())
+    args = ["render", filepath, scene_name, "--format", output_format, "--custom_folders", "-r", f"{width},{height}"]
+    args.extend(flags.split())
+    args.extend(extraArgs)
+    command = [*MANIM_COMMAND, *args]
 
     print(f"--- Running Manim Command: {' '.join(command)} ---")
 
+    def handleLine(line):
+        print(line, end='')
+        if onProgress is not None:
+            event = parseProgressLine(line)
+            if event is not None:
+                onProgress(event)
+
+    if Config.RENDER_POOL_SIZE > 0:
+        try:
+            returncode, full_output, reason = getRenderPool().run(args, MANIM_RENDER_TIMEOUT, handleLine)
+            if returncode != 0:
+                return formatExecutionFailure(filename, full_output, reason)
+            print("--- Finished rendering successfully ---")
+            return f"Manim render completed for {filename}."
+        except RenderPoolUnavailable as e:
+            print(f"Warning: Render pool unavailable ({e}), falling back to the manim CLI")
+
     try:
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
-        )
+        result = superviseCommand(command, MANIM_RENDER_TIMEOUT, handleLine)
 
-        full_output = []
-        for line in process.stdout:
-            print(line, end='')
-            full_output.append(line)
-
-        process.wait()
-
-        if process.returncode != 0:
-            logger.error("MANIM EXECUTION FAILED for file '%s'. Full output:\n%s", full_output, exc_info=True)
-            error_text = None
-            print("------------Collecting All the Error Only--------------")
-            for i, line in enumerate(full_output):
-                if "ERROR" in line or "Traceback" in line:
-                    # Join from the first error-related line till the end
-                    error_text = "".join(full_output[i:])
-                    break
-            if error_text is not None:
-                return f"MANIM EXECUTION FAILED. The file '{filename}' has an error. Review output below:\n\n{error_text}"
-            return f"MANIM EXECUTION FAILED. The file '{filename}' has an error. Review output below:\n\n{full_output[-1]}"
+        if result.returncode != 0:
+            return formatExecutionFailure(filename, result.output, result.reason)
 
         print("--- Finished rendering successfully ---")
         return f"Manim render completed for {filename}."
@@ -428,11 +482,11 @@ def run_manim_scene(filename, state: mainmState):
 
 async def agentCreateFile(state: mainmState):
     tools = [createFileAndWriteMainmCode]
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
+    animationTypeRule = stageRules(state.animationType, "codegen")
     # Generate unique name first
     unique_name = f"Animation_{uuid.uuid4().hex[:8]}"
     state.filename = f"{unique_name}.py"
-    systemPrompt = """
+    systemPrompt = withRulesPrefix("""
     You are a Manim code generation expert. Your task is to:
     1. Create complete, working Manim v0.19+ Optimise code, Do not include any explanation, markdown, or extra text. Output only valid Manim Python code
     2. You MUST call the tool `createFileAndWriteMainmCode` with:
@@ -450,23 +504,9 @@ Note:
     - filename: "{filename}"
     - content: [complete Python code as string
 
-    ## Mandatory way to design
-
-1. Title: Always at the top. Do not include the equation in the title.
-2. Axes: Create axes immediately after the title.
-3. Use integers mostly if needed then use 2 decimal precision and do not include "π".
-4. Only show central axes (no grid).
-5. Equation: Placed below title or in corners (left, right, bottom-left, bottom-right). If no space → fade it out before graph.
-7. Margins: Leave a 5% gap at the bottom, left, and right edges.
-8. Sequence: Title → Axes → Equation (adaptive) → Graph.
-
-
 ## Very Very Important
-    ANIMATION RULES - Follow these specific guidelines:
-    {animationTypeRule}
-
-
-    """
+    Follow the ## Animation Type Rules above, including every mandatory section.
+    """)
 
     human_message = f"""
     Create Manim animation for: {state.description}
@@ -499,17 +539,24 @@ Note:
         # })
 
 
-        result = await retry(
-            agentExecutor,
-            {
-                "input": human_message,
-                "filename": state.filename,
-                "class_name": unique_name,
-                "animationTypeRule": animationTypeRule,
-            },
-            retries=3,
-            delay=1
-        )
+        # A start-over sends the same prompt as the attempt that failed; it must
+        # not be answered with that attempt's cached code
+        cacheToken = skipLlmCacheReads.set(True) if state.createAgain else None
+        try:
+            result = await retry(
+                agentExecutor,
+                {
+                    "input": human_message,
+                    "filename": state.filename,
+                    "class_name": unique_name,
+                    "animationTypeRule": animationTypeRule,
+                },
+                retries=3,
+                delay=1
+            )
+        finally:
+            if cacheToken is not None:
+                skipLlmCacheReads.reset(cacheToken)
         print(f"Agent result: {result}")
 
         filepath = f"./temp/{state.filename}"
@@ -526,8 +573,22 @@ Note:
 def agentCheckFileCode(state: mainmState):
     code= read_file(state.filename)
     message = state.description
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
-    systemPrompt = """
+
+    lintResult = lintManimCode(code, state.filename.replace(".py", ""))
+    if not lintResult.isCodeGood or not (lintResult.uncertain and Config.CODE_CHECK_LLM_FALLBACK):
+        print("\n--- Checking Code file (static) ---")
+        state.isCodeGood = lintResult.isCodeGood
+        if not lintResult.isCodeGood:
+            state.validationError = lintResult.errorMessage
+            state.validationErrorHistory.append(lintResult.errorMessage)
+        else:
+            state.validationError = None
+        print(f"Is Code Good: {state.isCodeGood}")
+        print(f"Error Message: {state.validationError}")
+        return state
+
+    animationTypeRule = stageRules(state.animationType, "codeCheck")
+    systemPrompt = withRulesPrefix("""
     You are a Manim v0.19+ code validator. Your job is to analyze Python code for potential execution errors.
 
 
@@ -538,9 +599,7 @@ def agentCheckFileCode(state: mainmState):
     ```
 
 
-    ## ANIMATION RULES - Follow these specific guidelines for VALIDATION:
-    Always follow ## Mandatory way to design
-    {animationTypeRule}
+    ## Validate against the ## Animation Type Rules above, including every mandatory section.
 
     ### Validation Protocol:
     1. Check if the code follows **all listed rules**.  
@@ -559,7 +618,7 @@ def agentCheckFileCode(state: mainmState):
     - "error_message": "" if good, otherwise specific issue found
 
     Focus on execution-breaking errors, not style preferences.
-    """
+    """)
     structured_llm = llmFlash.with_structured_output(CheckMaimCode)
     print("\n--- Checking Code file ---")
 
@@ -589,18 +648,20 @@ def agentCheckFileCode(state: mainmState):
 
 async def agentReWriteManimCode(state: mainmState):
     tools = [createFileAndWriteMainmCode]
-    animationTypeRule = ANIMATION_MAP.get(state.animationType)
     filename = state.filename
     validationError = state.validationError
     validationErrorHistory = state.validationErrorHistory
     executionErrorHistory = state.executionErrorHistory
     executionError = state.executionError
+    # Sections matching the current error are added to the usual rewrite rules
+    animationTypeRule = stageRules(state.animationType, "rewrite", query=executionError or validationError)
     description = state.description
     state.rewriteAttempts += 1
+    increment("manim_rewrites_total", animationType=state.animationType, reason="execution" if executionError else "validation")
     code = read_file(filename)
 
 
-    systemPrompt = """
+    systemPrompt = withRulesPrefix("""
 You are a Manim v0.19+ code debugger.  
 Your job is to fix the broken code based on error analysis and provide error-free, optimized code.
 
@@ -628,10 +689,8 @@ Previous Validation Failures: {validationErrorHistory}
 
 
 ## Very Very Important
-# ANIMATION RULES - Follow these specific guidelines:
-If a rule is missing, fix in the most correct Manim v0.19+ way:
-Always follow ## Mandatory way to design
-{animationTypeRule}
+Follow the ## Animation Type Rules above, including every mandatory section.
+If a rule is missing, fix in the most correct Manim v0.19+ way.
 
 **TASK:**
 1. Generate the corrected code that fixes ALL errors listed above
@@ -640,7 +699,7 @@ Always follow ## Mandatory way to design
    - content: [fixed code as string]
 
 Focus on making the code execute without errors while following v0.19+ syntax.
-"""
+""")
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", systemPrompt),
@@ -685,18 +744,79 @@ Focus on making the code execute without errors while following v0.19+ syntax.
 
     return state
 
-def agentRunManimCode(state: mainmState):
+def checkAndRenderScene(state: mainmState, code, progressCallback, texWorkspace):
+    """Warm scene check, then low-quality preflight, then the real render; stops at the first failure."""
+    preflight = None
+    if Config.SCENE_CHECKER:
+        # Construction-time errors come back from the warm checker in milliseconds
+        preflight = getSceneChecker().check(state.filename, state.resolution, texWorkspace.path)
+    if Config.RENDER_PREFLIGHT and (preflight is None or preflight.success):
+        if progressCallback is not None:
+            progressCallback("Preflight Check", 52, "Running the scene at low quality to catch errors early")
+        preflight = run_manim_preflight(state.filename, texWorkspace.manimArgs)
+
+    if preflight is not None and not preflight.success:
+        print("Preflight failed, skipping the full quality render")
+        return formatExecutionFailure(state.filename, preflight.output, preflight.reason)
+
+    animationCount = preflight.animationCount if preflight is not None else None
+    onProgress = None
+    if progressCallback is not None:
+        onProgress = ThrottledProgressReporter(progressCallback, animationCount or estimateAnimationCount(code))
+    return renderScene(
+        filename=state.filename,
+        state=state,
+        onProgress=onProgress,
+        animationCount=animationCount,
+        extraArgs=texWorkspace.manimArgs
+    )
+
+
+def agentRunManimCode(state: mainmState, config: RunnableConfig = None):
     code = read_file(state.filename)
     state.code = code
-    resultMessage = run_manim_scene(filename=state.filename, state=state)
+    state.renderCacheKey = renderCacheKey(code, state.quality, state.format, state.resolution)
+    scene_name = state.filename.replace(".py", "")
+
+    cached = lookupRender(state.renderCacheKey, state.format)
+    if cached is not None:
+        print(f"--- Render cache hit for {state.filename} ({state.renderCacheKey[:12]}) ---")
+        if cached["link"]:
+            state.cachedLink = cached["link"]
+        else:
+            restoreRender(cached["path"], scene_name, state.format)
+        resultMessage = f"Manim render restored from cache for {state.filename}."
+    else:
+        progressCallback = ((config or {}).get("configurable") or {}).get("progressCallback")
+        if not renderSlots.acquire(blocking=False):
+            if progressCallback is not None:
+                progressCallback("Waiting for Renderer", 55, "Other animations are rendering on this worker")
+            renderSlots.acquire()
+        try:
+            renderStart = time.perf_counter()
+            with TexWorkspace() as texWorkspace:
+                resultMessage = checkAndRenderScene(state, code, progressCallback, texWorkspace)
+            observe(
+                "manim_render_duration_seconds", time.perf_counter() - renderStart,
+                animationType=state.animationType, quality=state.quality,
+                outcome="error" if "MANIM EXECUTION FAILED" in resultMessage else "ok",
+            )
+        finally:
+            renderSlots.release()
     print(f"Execution Result: {resultMessage}")
 
 
     if "MANIM EXECUTION FAILED" in resultMessage:
+        increment("manim_render_failures_total", animationType=state.animationType)
         state.executionSuccess = False
         state.executionError = resultMessage
         state.executionErrorHistory.append(resultMessage)
     else:
+        if cached is None:
+            try:
+                storeRender(state.renderCacheKey, scene_name, state.format)
+            except OSError as e:
+                print(f"Warning: Failed to store render in cache: {e}")
         state.executionSuccess = True
         state.executionError = ""
 
@@ -707,6 +827,12 @@ def agentRunManimCode(state: mainmState):
     return state
 
 
+def entryRouter(state: mainmState):
+    """Starts the render-less graph at the rewrite node when a render just failed."""
+    if state.executionSuccess is False and state.executionError:
+        return "agentReWriteManimCode"
+    return "agentCreateFile"
+
 def manimRouter(state: mainmState):
     if state.isCodeGood is True:
         return "agentRunManimCode"
@@ -737,6 +863,7 @@ def handleFailureAndReset(state: mainmState) -> mainmState:
         return END
     else:
         print(f"Maximum rewrite attempts reached. Resetting and starting over.")
+        increment("manim_start_over_total", animationType=state.animationType)
         state.rewriteAttempts  = 0
         state.createAgain += 1
         return state
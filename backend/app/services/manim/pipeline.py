@@ -0,0 +1,246 @@
+import asyncio
+from celery import states
+from celery.exceptions import Ignore
+from celery.worker.state import revoked as revoked_tasks
+from app.core.queue import taskQueue
+from app.core.db import get_worker_db
+from app.core.workerLoop import runOnWorkerLoop
+from app.core.resultCache import resultCacheKey, getCachedResult
+from app.core.scheduler import releaseJobSlot
+from app.core.metrics import increment
+from app.core.llmCache import skipLlmCacheReads, llmCacheJob, settleJobLlmCache
+from app.core.llmUsage import bindJobUsage
+from app.core.progressEvents import publishJobEvent, runJobWrite, resultPayload, cancelledPayload
+from app.schema.ServiceSchema import mainmState
+from app.services.manim.graphForManimCodeGenerate import graph_for_mainm_code_write
+from app.services.manim.manimCodeGeneration import (
+    agentRunManimCode,
+    executionRouter,
+    createFileAndWriteMainmCode,
+    read_file,
+)
+from app.services.manim.manim import (
+    progressReporter,
+    reuseCachedResult,
+    checkFeasibilityAndDescribe,
+    generateDescription,
+    newManimState,
+    uploadRender,
+    persistGeneration,
+)
+
+# Split pipeline: every stage is its own task and hands the job to the next one.
+# LLM stages run on LLM_QUEUE, renders on RENDER_QUEUE, so each worker type can
+# be sized for its own bottleneck. Progress and the final result are written
+# under the id of the original call_graph task, which is what the client polls.
+#
+# feasibility -> description -> codegen -> render -> persist
+#                                  ^          |
+#                                  +-- fix ---+
+
+
+def startPipeline(rootId, query, userID, quality, format, historyId=None, resolution="1920x1080", bypassCache=False, priority=None):
+    job = {
+        "rootId": rootId,
+        "query": query,
+        "userID": userID,
+        "quality": quality,
+        "format": format,
+        "historyId": historyId,
+        "resolution": resolution,
+        "bypassCache": bypassCache,
+        "cacheKey": resultCacheKey(query, quality, format, resolution),
+        "priority": priority,
+    }
+    enqueue(feasibilityStage, job)
+
+
+def enqueue(stage, job, *args):
+    """Queue the next stage with the priority the scheduler gave the job."""
+    stage.apply_async(args=[job, *args], priority=job.get("priority"))
+
+
+def _storeFinalResult(job, result):
+    taskQueue.backend.store_result(job["rootId"], result, states.SUCCESS)
+    settleJobLlmCache(job["rootId"], bool(result.get("success")))
+    publishJobEvent(job["rootId"], resultPayload(result))
+    releaseJobSlot(job["userID"], job["rootId"])
+
+
+def finishJob(job, result):
+    """Store the job's final result where the client is polling for it, after its queued progress."""
+    runJobWrite(_storeFinalResult, job, result)
+
+
+def _storeCancelled(job):
+    taskQueue.backend.mark_as_revoked(job["rootId"], "cancelled")
+    settleJobLlmCache(job["rootId"], False)
+    publishJobEvent(job["rootId"], cancelledPayload())
+    releaseJobSlot(job["userID"], job["rootId"])
+
+
+def failJob(job, stage, error):
+    progressReporter(job["rootId"])("Error", 100, f"An error occurred: {error}")
+    finishJob(job, {"success": False, "error": str(error), "stage": stage})
+
+
+def isJobCancelled(job):
+    return job["rootId"] in revoked_tasks
+
+
+async def _inJobContext(job, coro):
+    skipLlmCacheReads.set(job["bypassCache"])
+    llmCacheJob.set(job["rootId"])
+    bindJobUsage(job["rootId"], job["userID"])
+    return await coro
+
+
+def runStage(job, stage, coro):
+    """Run a stage coroutine on the worker loop. Returns None when the job has ended."""
+    if isJobCancelled(job):
+        coro.close()
+        return None
+    try:
+        return runOnWorkerLoop(_inJobContext(job, coro), isCancelled=lambda: isJobCancelled(job))
+    except asyncio.CancelledError:
+        runJobWrite(_storeCancelled, job)
+        raise Ignore()
+    except Exception as e:
+        failJob(job, stage, e)
+        return None
+
+
+def dumpState(state: mainmState):
+    return state.model_dump(mode="json")
+
+
+@taskQueue.task(name="pipeline.feasibility")
+def feasibilityStage(job):
+    update_progress = progressReporter(job["rootId"])
+
+    async def _stage():
+        update_progress("Initializing", 10, "Setting up description generation state")
+        cached = None if job["bypassCache"] else getCachedResult(job["cacheKey"])
+        if cached:
+            await get_worker_db()
+            finishJob(job, await reuseCachedResult(update_progress, cached, job["query"], job["userID"], job["historyId"]))
+            return
+
+        fesibleResult, notFeasible, description = await checkFeasibilityAndDescribe(update_progress, job["query"], job["format"])
+        if notFeasible:
+            finishJob(job, notFeasible)
+            return
+        enqueue(descriptionStage, {
+            **job,
+            "chatName": fesibleResult.get("chatName"),
+            "reason": fesibleResult.get("reason"),
+            "animationType": fesibleResult.get("animationType"),
+            # Set when the speculative description was kept
+            "detailedDescription": description.get("detailedDescription") if description else None,
+        })
+
+    runStage(job, "feasibility_check", _stage())
+
+
+@taskQueue.task(name="pipeline.description")
+def descriptionStage(job):
+    update_progress = progressReporter(job["rootId"])
+
+    async def _stage():
+        fesibleResult = {
+            "chatName": job["chatName"],
+            "reason": job["reason"],
+            "animationType": job["animationType"],
+        }
+        if job.get("detailedDescription") is None:
+            result = await generateDescription(update_progress, job["query"], job["format"], fesibleResult)
+            job["detailedDescription"] = result.get("detailedDescription")
+
+        update_progress("Generating Manim Code", 50, "Creating animation code")
+        state = newManimState(
+            job["detailedDescription"],
+            job["format"],
+            job["quality"],
+            job["animationType"],
+            job["resolution"]
+        )
+        enqueue(codegenStage, job, dumpState(state))
+
+    runStage(job, "description", _stage())
+
+
+@taskQueue.task(name="pipeline.codegen")
+def codegenStage(job, state):
+    state = mainmState(**state)
+    if state.code:
+        # A rewrite after a failed render may land on a different host
+        createFileAndWriteMainmCode.invoke({"filename": state.filename, "content": state.code})
+
+    async def _stage():
+        return await graph_for_mainm_code_write.ainvoke(state)
+
+    result = runStage(job, "code_generation", _stage())
+    if result is None:
+        return
+
+    state = mainmState(**result)
+    if not state.isCodeGood:
+        failJob(job, "code_generation", state.validationError or "Could not generate valid Manim code")
+        return
+    state.code = read_file(state.filename)
+    enqueue(renderStage, job, dumpState(state))
+
+
+@taskQueue.task(name="pipeline.render")
+def renderStage(job, state):
+    if isJobCancelled(job):
+        return
+    update_progress = progressReporter(job["rootId"])
+    state = mainmState(**state)
+    createFileAndWriteMainmCode.invoke({"filename": state.filename, "content": state.code})
+
+    try:
+        state = agentRunManimCode(state, {"configurable": {"progressCallback": update_progress}})
+        route = executionRouter(state)
+        if route == "done":
+            link = uploadRender(update_progress, state.model_dump())
+            enqueue(persistStage, job, dumpState(state), link)
+            return
+    except Exception as e:
+        failJob(job, "render", e)
+        return
+
+    if route == "limit":
+        if state.createAgain >= 1:
+            failJob(job, "render", state.executionError or "Manim execution failed")
+            return
+        print(f"Maximum rewrite attempts reached. Resetting and starting over.")
+        increment("manim_start_over_total", animationType=state.animationType)
+        state.rewriteAttempts = 0
+        state.createAgain += 1
+        state.executionSuccess = None
+        state.executionError = None
+
+    # "fix" goes back to the rewrite node, a reset starts from a new file
+    enqueue(codegenStage, job, dumpState(state))
+
+
+@taskQueue.task(name="pipeline.persist")
+def persistStage(job, state, link):
+    update_progress = progressReporter(job["rootId"])
+
+    async def _stage():
+        await get_worker_db()
+        finishJob(job, await persistGeneration(
+            update_progress,
+            job["cacheKey"],
+            job["query"],
+            job["userID"],
+            job["historyId"],
+            job["chatName"],
+            job["detailedDescription"],
+            state,
+            link
+        ))
+
+    runStage(job, "persist", _stage())
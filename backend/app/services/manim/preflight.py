@@ -0,0 +1,79 @@
+import functools
+import sys
+from typing import List, Optional
+from pydantic import BaseModel
+from app.config import Config
+from app.services.manim.renderSupervisor import superviseCommand
+from app.services.manim.texCache import runManimCli
+
+# Tiny, low frame rate render that writes no files: enough to run construct()
+# end to end and surface runtime and LaTeX errors in seconds.
+PREFLIGHT_FLAGS = ["--dry_run", "-ql", "-r", "64,36", "--progress_bar", "none"]
+
+# The manim CLI, reporting the scene's play count once construct() finished
+PREFLIGHT_COMMAND = [sys.executable, "-m", "app.services.manim.preflight"]
+PLAY_COUNT_PREFIX = "Preflight play count: "
+
+
+class PreflightResult(BaseModel):
+    success: bool
+    output: List[str] = []
+    # renderer.num_plays: every play and wait, the numbering `-n` uses
+    animationCount: Optional[int] = None
+    reason: Optional[str] = None
+
+
+def _parsePlayCount(output) -> Optional[int]:
+    for line in reversed(output):
+        if line.startswith(PLAY_COUNT_PREFIX):
+            return int(line[len(PLAY_COUNT_PREFIX):])
+    return None
+
+
+def run_manim_preflight(filename, extraArgs=()) -> PreflightResult:
+    filepath = f"./temp/{filename}"
+    scene_name = filename.replace(".py", "")
+    command = [*PREFLIGHT_COMMAND, "render", filepath, scene_name, *PREFLIGHT_FLAGS, *extraArgs]
+    print(f"--- Running Manim Preflight: {' '.join(command)} ---")
+
+    try:
+        result = superviseCommand(command, Config.PREFLIGHT_TIMEOUT)
+    except FileNotFoundError:
+        # Let the real render report the missing binary
+        print("Preflight skipped: 'manim' command not found")
+        return PreflightResult(success=True)
+
+    output = result.output
+    if result.returncode != 0:
+        return PreflightResult(success=False, output=output, reason=result.reason)
+    return PreflightResult(success=True, output=output, animationCount=_parsePlayCount(output))
+
+
+def _reportPlayCount():
+    """Print renderer.num_plays after each scene renders.
+
+    Manim's bars only count `play` calls as "Animation N"; non-static waits
+    show as "Waiting N" and static waits print nothing, but all of them are
+    plays to `-n`.
+    """
+    from manim import Scene
+
+    render = Scene.render
+
+    @functools.wraps(render)
+    def renderAndReport(self, *args, **kwargs):
+        result = render(self, *args, **kwargs)
+        sys.stdout.write(f"{PLAY_COUNT_PREFIX}{self.renderer.num_plays}\n")
+        sys.stdout.flush()
+        return result
+
+    Scene.render = renderAndReport
+
+
+if __name__ == "__main__":
+    try:
+        _reportPlayCount()
+    except ImportError:
+        # runManimCli reports the missing manim
+        pass
+    runManimCli()
@@ -0,0 +1,46 @@
+from app.schema.ServiceSchema import AnimationType
+from app.services.manim.animationTypes import (
+    COMPUTER_DATASTRUCTURE,
+    GRAPH2D,
+    GRAPH3D,
+    STATISTICS,
+    PHYSICS,
+)
+
+ANIMATION_MAP = {
+    AnimationType.GRAPH2D: GRAPH2D,
+    AnimationType.COMPUTER_DATASTRUCTURE: COMPUTER_DATASTRUCTURE,
+    AnimationType.GRAPH3D: GRAPH3D,
+    AnimationType.STATISTICS: STATISTICS,
+    AnimationType.PHYSICS: PHYSICS,
+}
+
+# Every planning, validation and code prompt starts with this block, byte for
+# byte, followed by the stage's own instructions and only then the per-call
+# values. Gemini reuses the cached prefix (implicit context caching), so the
+# multi-thousand-token rule block of an animation type is billed and
+# processed in full only on the first call that sends it. Design rules come
+# from the type's own "Mandatory ..." sections, never from a shared block:
+# axes-first layout rules would be wrong for stacks, sorts or bar charts.
+RULES_PREFIX = """# Manim v0.19+ animation rules
+
+## Animation Type Rules
+
+{animationTypeRule}
+
+---
+
+"""
+
+
+def animationRules(animationType) -> str:
+    return ANIMATION_MAP.get(animationType)
+
+
+def withRulesPrefix(stagePrompt: str) -> str:
+    """Put the shared rule block in front of a stage's prompt template.
+
+    The result is still a template: it takes `animationTypeRule` along with
+    the stage's own variables.
+    """
+    return RULES_PREFIX + stagePrompt.lstrip("\n")
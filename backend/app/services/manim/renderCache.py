@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Optional
+from app.config import Config
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+VIDEOS_DIR = os.path.join(backend_dir, "videos")
+RENDER_CACHE_DIR = os.path.join(backend_dir, Config.RENDER_CACHE_DIR)
+
+MANIM_VERSION_SUFFIX = "_ManimCE_v0.19.0"
+SCENE_NAME_PATTERN = re.compile(r"\bAnimation_[0-9a-f]{8}\b")
+CANONICAL_SCENE_NAME = "Animation"
+
+# Signed links are reused only while they stay valid for at least this long
+LINK_MIN_REMAINING_SECONDS = 24 * 60 * 60
+
+
+def normalizeSceneCode(code: str) -> str:
+    """Canonicalize generated scene code so that identical scenes hash the same.
+
+    The random `Animation_<uuid>` class name, line endings and trailing
+    whitespace do not change what Manim renders, so they are removed.
+    """
+    code = SCENE_NAME_PATTERN.sub(CANONICAL_SCENE_NAME, code)
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return "\n".join(lines).strip() + "\n"
+
+
+def renderCacheKey(code: str, quality: str, format: str, resolution: str) -> str:
+    payload = json.dumps(
+        {
+            "code": normalizeSceneCode(code),
+            "quality": quality,
+            "format": format,
+            "resolution": resolution or "1920x1080",
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def findRenderedFile(filename: str, format: str) -> Optional[str]:
+    """Return the path Manim wrote the final video to, or None."""
+    for candidate in (
+        os.path.join(VIDEOS_DIR, f"{filename}{MANIM_VERSION_SUFFIX}.{format}"),
+        os.path.join(VIDEOS_DIR, f"{filename}.{format}"),
+    ):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _artifactPath(key: str, format: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.{format}")
+
+
+def _metadataPath(key: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.json")
+
+
+def _readMetadata(key: str) -> dict:
+    try:
+        with open(_metadataPath(key), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _writeAtomic(path: str, data: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def lookupRender(key: str, format: str) -> Optional[dict]:
+    """Return the cached render for `key` as {"path", "link"} or None on a miss.
+
+    Either field may be None: a host that never rendered the scene can still
+    reuse a link uploaded by another worker, and an expired link still leaves
+    the local artifact usable for a fresh upload.
+    """
+    metadata = _readMetadata(key)
+    link = metadata.get("link")
+    if link and metadata.get("linkExpiresAt", 0) - time.time() < LINK_MIN_REMAINING_SECONDS:
+        link = None
+
+    path = _artifactPath(key, format)
+    if not os.path.exists(path):
+        path = None
+
+    if path is None and link is None:
+        return None
+
+    if path is not None:
+        # Touch the artifact so pruning keeps recently used renders
+        os.utime(path, None)
+    return {"path": path, "link": link}
+
+
+def restoreRender(cachedPath: str, filename: str, format: str) -> str:
+    """Copy a cached artifact to where `uploadFile` expects a fresh render."""
+    os.makedirs(VIDEOS_DIR, exist_ok=True)
+    destination = os.path.join(VIDEOS_DIR, f"{filename}.{format}")
+    shutil.copyfile(cachedPath, destination)
+    return destination
+
+
+def storeRender(key: str, filename: str, format: str):
+    """Copy a freshly rendered video into the cache."""
+    rendered = findRenderedFile(filename, format)
+    if rendered is None:
+        print(f"Render cache: no output found for {filename}.{format}, skipping store")
+        return
+
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    destination = _artifactPath(key, format)
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    shutil.copyfile(rendered, tmp_path)
+    os.replace(tmp_path, destination)
+    pruneRenderCache()
+
+
+def storeRenderLink(key: str, link: str, expires_in: int):
+    """Remember the uploaded link for a cached render."""
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    metadata = _readMetadata(key)
+    metadata.update({
+        "link": link,
+        "linkExpiresAt": time.time() + expires_in,
+    })
+    _writeAtomic(_metadataPath(key), json.dumps(metadata))
+
+
+def pruneRenderCache(max_bytes: int = Config.RENDER_CACHE_MAX_BYTES):
+    """Evict the least recently used artifacts until the cache fits in `max_bytes`."""
+    try:
+        entries = []
+        for name in os.listdir(RENDER_CACHE_DIR):
+            if name.endswith((".json", ".tmp")):
+                continue
+            path = os.path.join(RENDER_CACHE_DIR, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
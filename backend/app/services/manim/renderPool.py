@@ -0,0 +1,214 @@
+import json
+import os
+import queue
+import re
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+from app.config import Config
+from app.services.manim.renderSupervisor import applyResourceLimits, explainTermination, cpuSecondsUsed
+from app.services.manim.texCache import installTexCacheLookup
+
+# tqdm redraws with carriage returns; treat them as line breaks like text-mode pipes do
+LINE_BREAK_PATTERN = re.compile(r"\r\n|\r|\n")
+
+
+class RenderPoolUnavailable(Exception):
+    """Raised when no warm render worker could run the job; callers fall back to the CLI."""
+    pass
+
+
+def _renderInChild(args):
+    """Run `manim <args>` inside the already warm interpreter."""
+    import traceback
+    try:
+        from manim.__main__ import main
+        main.main(args=args, prog_name="manim", standalone_mode=False)
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+
+
+def _runJob(protocol, args, timeout):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Own process group so a timeout also takes down latex, dvisvgm and ffmpeg children
+        os.setsid()
+        applyResourceLimits()
+        os.close(read_fd)
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        code = 1
+        try:
+            code = _renderInChild(args)
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+    os.close(write_fd)
+    buffer = ""
+    deadline = time.monotonic() + timeout
+    timedOut = False
+    output_tail = []
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timedOut = True
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            buffer += chunk.decode("utf-8", errors="replace")
+            *lines, buffer = LINE_BREAK_PATTERN.split(buffer)
+            for line in lines:
+                protocol.write(json.dumps({"line": line + "\n"}) + "\n")
+            output_tail = (output_tail + lines)[-50:]
+    finally:
+        os.close(read_fd)
+        try:
+            # Also reaps latex/ffmpeg children left behind after a normal exit
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        _, status, usage = os.wait4(pid, 0)
+
+    if buffer:
+        protocol.write(json.dumps({"line": buffer + "\n"}) + "\n")
+    returncode = os.waitstatus_to_exitcode(status)
+    reason = explainTermination(returncode, output_tail, timedOut, timeout, cpuSecondsUsed(usage))
+    protocol.write(json.dumps({"returncode": returncode, "reason": reason}) + "\n")
+
+
+def _serve():
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    # The whole point of the pool: pay for manim, numpy, cairo and pango once
+    import manim  # noqa: F401
+    import manim.__main__  # noqa: F401
+    installTexCacheLookup()
+
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    for line in sys.stdin:
+        request = json.loads(line)
+        _runJob(protocol, request["args"], request["timeout"])
+
+
+class _RenderWorker:
+    def __init__(self):
+        self._process = None
+        # Protocol bytes read from the worker but not yet parsed
+        self._pending = b""
+
+    def _ensureStarted(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "app.services.manim.renderPool"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=os.getcwd(),
+        )
+        self._pending = b""
+        self._readMessage(120)
+
+    def _readMessage(self, timeout):
+        # Reads the raw fd: select() cannot see lines already pulled into a
+        # file object's buffer, which would stall the stream of messages
+        fd = self._process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("render worker did not answer")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("render worker exited")
+            self._pending += chunk
+        line, self._pending = self._pending.split(b"\n", 1)
+        return json.loads(line)
+
+    def run(self, args, timeout, onLine=None):
+        try:
+            self._ensureStarted()
+            self._process.stdin.write(json.dumps({"args": args, "timeout": timeout}) + "\n")
+            full_output = []
+            while True:
+                # The worker enforces the job timeout; the margin covers a slow final flush
+                message = self._readMessage(timeout + 30)
+                if "line" in message:
+                    full_output.append(message["line"])
+                    if onLine is not None:
+                        onLine(message["line"])
+                    continue
+                return message["returncode"], full_output, message.get("reason")
+        except (EOFError, OSError, ValueError, TimeoutError) as e:
+            self.close()
+            raise RenderPoolUnavailable(str(e))
+
+    def close(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process = None
+            self._pending = b""
+
+
+class RenderPool:
+    """Warm, pre-imported Manim processes that fork one isolated child per render."""
+
+    def __init__(self, size):
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(_RenderWorker())
+
+    def run(self, args, timeout, onLine=None):
+        worker = self._idle.get()
+        try:
+            return worker.run(args, timeout, onLine)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """Stop the idle workers; renders still running keep theirs."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_renderPool = None
+_renderPoolLock = threading.Lock()
+
+
+def getRenderPool() -> RenderPool:
+    global _renderPool
+    with _renderPoolLock:
+        if _renderPool is None:
+            _renderPool = RenderPool(Config.RENDER_POOL_SIZE)
+    return _renderPool
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,82 @@
+import re
+import time
+from typing import Callable, Optional
+from pydantic import BaseModel
+
+# Manim's tqdm bar, e.g. "Animation 3: Create(Circle):  45%|####   | 27/60 [00:01<00:01, 20.1it/s]"
+ANIMATION_PROGRESS_PATTERN = re.compile(r"Animation\s+(\d+)\s*:.*?(\d+)/(\d+)\s*\[")
+PLAY_CALL_PATTERN = re.compile(r"\bself\.(?:play|wait|move_camera)\s*\(")
+
+RENDER_PROGRESS_START = 55
+RENDER_PROGRESS_END = 90
+
+
+class RenderProgressEvent(BaseModel):
+    animationIndex: int
+    frame: int
+    totalFrames: int
+
+
+def parseProgressLine(line: str) -> Optional[RenderProgressEvent]:
+    match = ANIMATION_PROGRESS_PATTERN.search(line)
+    if match is None:
+        return None
+    return RenderProgressEvent(
+        animationIndex=int(match.group(1)),
+        frame=int(match.group(2)),
+        totalFrames=int(match.group(3)),
+    )
+
+
+def estimateAnimationCount(code: str) -> int:
+    """Rough number of `play`/`wait` calls; loops make this a lower bound."""
+    return max(1, len(PLAY_CALL_PATTERN.findall(code or "")))
+
+
+class ThrottledProgressReporter:
+    """Maps render progress events onto the task's progress range.
+
+    Manim redraws its bar many times per second, so `callback` is only called
+    when the percentage moved and at most once per `minInterval` seconds.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str, int, Optional[str]], None],
+        totalAnimations: int,
+        startPercent: int = RENDER_PROGRESS_START,
+        endPercent: int = RENDER_PROGRESS_END,
+        minInterval: float = 2.0,
+    ):
+        self.callback = callback
+        self.totalAnimations = max(1, totalAnimations)
+        self.startPercent = startPercent
+        self.endPercent = endPercent
+        self.minInterval = minInterval
+        self.lastPercent = startPercent
+        self.lastReportedAt = 0.0
+
+    def __call__(self, event: RenderProgressEvent):
+        # The static estimate undercounts loops; never let the bar pass 100%
+        if event.animationIndex >= self.totalAnimations:
+            self.totalAnimations = event.animationIndex + 1
+
+        fraction = event.frame / event.totalFrames if event.totalFrames else 1.0
+        done = (event.animationIndex + fraction) / self.totalAnimations
+        percent = int(self.startPercent + (self.endPercent - self.startPercent) * done)
+        percent = min(self.endPercent, max(self.lastPercent, percent))
+
+        now = time.monotonic()
+        if percent == self.lastPercent or now - self.lastReportedAt < self.minInterval:
+            return
+
+        self.lastPercent = percent
+        self.lastReportedAt = now
+        try:
+            self.callback(
+                "Rendering Animation",
+                percent,
+                f"Animation {event.animationIndex + 1} of ~{self.totalAnimations}: frame {event.frame}/{event.totalFrames}",
+            )
+        except Exception as e:
+            print(f"Warning: Failed to report render progress: {e}")
@@ -0,0 +1,169 @@
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+from pydantic import BaseModel
+from app.config import Config
+
+MEMORY_ERROR_MARKERS = ("MemoryError", "std::bad_alloc", "Cannot allocate memory")
+
+# Sets the limits in the child and execs the real command. preexec_fn would do
+# the same, but it can deadlock the child when the parent has other threads
+# (Celery's thread pool, the sectioned render executor).
+LIMITS_SHIM = """import os, resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+if cpu > 0:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+if memory > 0:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+try:
+    os.execvp(sys.argv[3], sys.argv[3:])
+except FileNotFoundError:
+    sys.stderr.write(f"{sys.argv[3]}: command not found\\n")
+    sys.exit(127)
+"""
+
+
+class SupervisedResult(BaseModel):
+    returncode: Optional[int] = None
+    output: List[str] = []
+    reason: Optional[str] = None
+
+
+def applyResourceLimits(
+    cpuSeconds: int = Config.RENDER_CPU_LIMIT_SECONDS,
+    memoryMb: int = Config.RENDER_MEMORY_LIMIT_MB,
+):
+    """Cap CPU time and address space of the current process; inherited by its children.
+
+    RLIMIT_RSS is not enforced on Linux, so memory is bounded through RLIMIT_AS.
+    """
+    if cpuSeconds > 0:
+        # SIGXCPU at the soft limit, SIGKILL a little later if it is ignored
+        resource.setrlimit(resource.RLIMIT_CPU, (cpuSeconds, cpuSeconds + 5))
+    if memoryMb > 0:
+        limit = memoryMb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def limitedCommand(command, cpuSeconds: int = None, memoryMb: int = None) -> list:
+    """`command` wrapped so it runs under the render CPU and memory limits."""
+    cpuSeconds = Config.RENDER_CPU_LIMIT_SECONDS if cpuSeconds is None else cpuSeconds
+    memoryMb = Config.RENDER_MEMORY_LIMIT_MB if memoryMb is None else memoryMb
+    memoryBytes = memoryMb * 1024 * 1024 if memoryMb > 0 else 0
+    return [sys.executable, "-c", LIMITS_SHIM, str(cpuSeconds), str(memoryBytes), *command]
+
+
+def cpuSecondsUsed(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+
+def _killGroup(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def explainTermination(returncode: Optional[int], output: List[str], timedOut: bool, timeout: int, cpuSeconds: Optional[float] = None) -> Optional[str]:
+    """Describe why a render was stopped, in terms the rewrite loop can act on.
+
+    SIGXCPU always means the CPU limit; SIGKILL only when the CPU time used
+    reached it (the hard limit), otherwise the kernel most likely ran out of
+    memory.
+    """
+    cpuLimit = Config.RENDER_CPU_LIMIT_SECONDS
+    memoryMessage = (
+        f"Render exceeded the {Config.RENDER_MEMORY_LIMIT_MB} MB memory limit. "
+        "Reduce Surface/mesh resolution and the number of mobjects kept on screen."
+    )
+    if timedOut:
+        return (
+            f"Render exceeded the {timeout} second wall-clock limit and was killed. "
+            "Look for updaters or loops that never finish and reduce Surface resolution or run_time."
+        )
+    cpuKilled = returncode == -signal.SIGKILL and cpuSeconds is not None and cpuSeconds >= cpuLimit
+    if cpuLimit > 0 and (returncode == -signal.SIGXCPU or cpuKilled):
+        return (
+            f"Render exceeded the {cpuLimit} second CPU time limit. "
+            "Reduce the number of animations, Surface resolution or frame-by-frame updaters."
+        )
+    if returncode == -signal.SIGKILL:
+        return memoryMessage
+    if returncode and any(marker in line for line in output[-50:] for marker in MEMORY_ERROR_MARKERS):
+        return memoryMessage
+    return None
+
+
+def _waitWithUsage(pid: int, timeout: Optional[float]):
+    """Reap `pid` and return (exit code, CPU seconds), or None when `timeout` passes first.
+
+    wait4 is polled instead of Popen.wait so the child's resource usage is
+    available to tell a CPU limit kill from an OOM kill.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        reaped, status, usage = os.wait4(pid, 0 if deadline is None else os.WNOHANG)
+        if reaped:
+            return os.waitstatus_to_exitcode(status), cpuSecondsUsed(usage)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.25)
+
+
+def superviseCommand(command, timeout: int, onLine=None) -> SupervisedResult:
+    """Run `command` in its own process group with resource limits and a wall-clock deadline.
+
+    The whole group (manim plus latex, dvisvgm and ffmpeg children) is killed
+    on timeout and cleaned up after a normal exit.
+    """
+    process = subprocess.Popen(
+        limitedCommand(command),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        start_new_session=True,
+    )
+
+    full_output = []
+
+    def readOutput():
+        for line in process.stdout:
+            full_output.append(line)
+            if onLine is not None:
+                onLine(line)
+
+    reader = threading.Thread(target=readOutput, daemon=True)
+    reader.start()
+
+    timedOut = False
+    exited = None
+    try:
+        exited = _waitWithUsage(process.pid, timeout)
+        if exited is None:
+            timedOut = True
+            print(f"Render timed out after {timeout} seconds, killing process group {process.pid}")
+    finally:
+        _killGroup(process.pid)
+        if exited is None:
+            exited = _waitWithUsage(process.pid, None)
+        # Reaped here, so Popen must not wait for it again
+        process.returncode, cpuSeconds = exited
+        reader.join(timeout=5)
+
+    if process.returncode == 127 and full_output and full_output[-1].endswith(": command not found\n"):
+        raise FileNotFoundError(command[0])
+
+    return SupervisedResult(
+        returncode=process.returncode,
+        output=full_output,
+        reason=explainTermination(process.returncode, full_output, timedOut, timeout, cpuSeconds),
+    )
@@ -0,0 +1,181 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from app.config import Config
+from app.services.manim.prompts import ANIMATION_MAP
+
+# The rule blocks in animationTypes.py are long markdown documents. The
+# registry splits them at their `##` / `###` headings into sections, tags each
+# section from its heading, and lets every stage take only the sections it
+# uses, within a token budget.
+
+HEADING_PATTERN = re.compile(r"^(#{2,3})\s+(.*\S)\s*$")
+WORD_PATTERN = re.compile(r"[a-z_][a-z0-9_]{2,}")
+
+# Rough token count, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Heading keywords -> tag; a section can carry several tags
+TAG_KEYWORDS = {
+    "api": (
+        "deprecated", "error", "avoid", "method", "axes", "graph", "numberline", "shape",
+        "text / labels", "color", "camera", "3d object", "latex",
+    ),
+    "layout": (
+        "font", "spacing", "layout", "position", "overlap", "margin", "frame",
+        "transparency", "multi-element", "design", "structure",
+    ),
+    "sequence": ("sequence", "step", "timing", "progressive", "transition", "order"),
+    "example": ("template", "example", "surface plot", "saddle"),
+    "checklist": ("checklist", "principles", "summary", "validation"),
+}
+
+
+class RuleSection(BaseModel):
+    title: str
+    text: str
+    tags: Tuple[str, ...]
+    mandatory: bool
+    order: int
+
+    @property
+    def tokens(self) -> int:
+        return len(self.text) // CHARS_PER_TOKEN
+
+
+class StageProfile(BaseModel):
+    # Tags in order of importance for the stage
+    tags: Tuple[str, ...]
+    budgetTokens: int
+    # Rank the remaining sections against the stage's error or description
+    ranked: bool = False
+
+
+STAGE_PROFILES: Dict[str, StageProfile] = {
+    # Planning, validating and refining descriptions: layout and ordering, no code
+    "description": StageProfile(tags=("layout", "sequence", "checklist"), budgetTokens=2500),
+    # Writing a scene from scratch gets the most context
+    "codegen": StageProfile(tags=("api", "layout", "sequence", "example", "checklist", "general"), budgetTokens=7000),
+    # Reviewing code: API pitfalls first
+    "codeCheck": StageProfile(tags=("api", "checklist"), budgetTokens=3000),
+    # Fixing code: whatever matches the error, then API pitfalls and layout
+    "rewrite": StageProfile(tags=("api", "layout", "checklist"), budgetTokens=4000, ranked=True),
+}
+
+
+def _tagsFor(title: str) -> Tuple[str, ...]:
+    lowered = title.lower()
+    tags = tuple(tag for tag, keywords in TAG_KEYWORDS.items() if any(word in lowered for word in keywords))
+    return tags or ("general",)
+
+
+def splitRuleBlock(block: str) -> List[RuleSection]:
+    """Split a rule block at its `##` / `###` headings.
+
+    Code fences in the blocks are not reliably balanced, so they are not
+    tracked; code comments use a single `#` and never match a heading.
+    """
+    sections = []
+    title, tags, lines, parent = "Overview", ("general",), [], None
+
+    def flush():
+        text = "\n".join(lines).strip()
+        if text:
+            sections.append(RuleSection(
+                title=title,
+                text=text,
+                tags=tags,
+                mandatory="mandatory" in title.lower(),
+                order=len(sections),
+            ))
+
+    for line in block.splitlines():
+        heading = HEADING_PATTERN.match(line)
+        if heading is not None:
+            flush()
+            level, name = heading.groups()
+            name = name.strip("*").strip()
+            tags = _tagsFor(name)
+            if len(level) == 2:
+                parent = (name, tags)
+                title = name
+            elif parent is not None:
+                title = f"{parent[0]} / {name}"
+                # Subsections without telling keywords inherit their parent's tags
+                if tags == ("general",):
+                    tags = parent[1]
+            else:
+                title = name
+            lines = [line]
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+@lru_cache(maxsize=None)
+def ruleSections(animationType) -> Tuple[RuleSection, ...]:
+    block = ANIMATION_MAP.get(animationType)
+    return tuple(splitRuleBlock(block)) if block else ()
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _similarity(section: RuleSection, queryWords: set) -> float:
+    sectionWords = _words(section.text)
+    if not sectionWords or not queryWords:
+        return 0.0
+    return len(sectionWords & queryWords) / len(queryWords)
+
+
+def selectSections(sections, profile: StageProfile, query: Optional[str] = None) -> List[RuleSection]:
+    """Sections for a stage within its budget.
+
+    Mandatory sections are always kept, whatever their tags, and count against
+    the budget first; the rest is filled by the stage's tag order. The chosen
+    sections keep their document order, so the same stage always gets the
+    same text and the provider's prompt cache still applies. With a query on a
+    ranked stage, sections most similar to it are added after those.
+    """
+    budget = profile.budgetTokens
+    chosen = [section for section in sections if section.mandatory]
+    used = sum(section.tokens for section in chosen)
+    optional = [section for section in sections if not section.mandatory and set(section.tags) & set(profile.tags)]
+
+    def priority(section):
+        tagRank = min(profile.tags.index(tag) for tag in section.tags if tag in profile.tags)
+        return (tagRank, section.order)
+
+    ranking = profile.ranked and query and Config.RULE_RANKING
+    if ranking:
+        # Hold back part of the budget for the sections the query points at
+        budget = budget * 2 // 3
+    for section in sorted(optional, key=priority):
+        if used + section.tokens <= budget:
+            chosen.append(section)
+            used += section.tokens
+    chosen.sort(key=lambda section: section.order)
+
+    if ranking:
+        queryWords = _words(query)
+        remaining = [section for section in sections if section not in chosen]
+        for section in sorted(remaining, key=lambda section: -_similarity(section, queryWords)):
+            if _similarity(section, queryWords) == 0:
+                break
+            if used + section.tokens <= profile.budgetTokens:
+                chosen.append(section)
+                used += section.tokens
+    return chosen
+
+
+def stageRules(animationType, stage: str, query: Optional[str] = None) -> Optional[str]:
+    """The rule text for one stage's prompt; the whole block when selection is off."""
+    if not Config.RULE_SELECTION:
+        return ANIMATION_MAP.get(animationType)
+    sections = ruleSections(animationType)
+    if not sections:
+        return ANIMATION_MAP.get(animationType)
+    return "\n\n".join(section.text for section in selectSections(sections, STAGE_PROFILES[stage], query))
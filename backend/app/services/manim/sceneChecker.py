@@ -0,0 +1,209 @@
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+from app.config import Config
+from app.services.manim.preflight import PreflightResult
+from app.services.manim.renderCache import backend_dir
+from app.services.manim.renderSupervisor import applyResourceLimits
+from app.services.manim.texCache import installTexCacheLookup
+
+# Width of the throwaway frame buffer; height follows the requested aspect ratio
+CHECK_PIXEL_WIDTH = 64
+
+
+def _runCheck(filepath, sceneName, resolution, texDir):
+    """Import the generated module and run construct() with animations skipped."""
+    import importlib.util
+    import traceback
+    try:
+        from manim import config
+
+        width, height = (resolution or "1920x1080").split("x")
+        config.dry_run = True
+        config.disable_caching = True
+        config.progress_bar = "none"
+        config.pixel_width = CHECK_PIXEL_WIDTH
+        config.pixel_height = max(1, round(CHECK_PIXEL_WIDTH * int(height) / int(width)))
+        config.frame_rate = 15
+        config.media_dir = "videos"
+        config.tex_dir = texDir or os.path.join("videos", "temp_files")
+
+        spec = importlib.util.spec_from_file_location(sceneName, filepath)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sceneClass = getattr(module, sceneName)
+
+        scene = sceneClass(skip_animations=True)
+        scene.render()
+        return {"success": True, "output": [], "animationCount": scene.renderer.num_plays}
+    except BaseException:
+        return {"success": False, "output": traceback.format_exc().splitlines(keepends=True)}
+
+
+def _checkInFork(filepath, sceneName, resolution, texDir, timeout):
+    """Run one check in a child forked from the warm interpreter so checks never leak state."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.setsid()
+        applyResourceLimits()
+        os.close(read_fd)
+        try:
+            payload = json.dumps(_runCheck(filepath, sceneName, resolution, texDir)).encode("utf-8")
+            while payload:
+                written = os.write(write_fd, payload)
+                payload = payload[written:]
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    chunks = []
+    deadline = time.monotonic() + timeout
+    timedOut = False
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timedOut = True
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(read_fd)
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        os.waitpid(pid, 0)
+
+    if timedOut:
+        return {"success": False, "output": [f"Scene check timed out after {timeout} seconds. The scene may loop forever while constructing.\n"]}
+    try:
+        return json.loads(b"".join(chunks).decode("utf-8"))
+    except ValueError:
+        return {"success": False, "output": ["Scene check crashed without reporting a result.\n"]}
+
+
+def _serve():
+    # Manim logs to stdout; keep the real stdout for the protocol and send logs to stderr
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    # Paid once for the lifetime of the checker, not once per attempt
+    import manim  # noqa: F401
+    installTexCacheLookup()
+
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    for line in sys.stdin:
+        request = json.loads(line)
+        result = _checkInFork(
+            request["filepath"],
+            request["sceneName"],
+            request["resolution"],
+            request.get("texDir"),
+            request["timeout"]
+        )
+        protocol.write(json.dumps(result) + "\n")
+
+
+class SceneChecker:
+    """Client for a long-lived process that has `manim` imported and checks scenes on demand.
+
+    The checker is a plain subprocess speaking JSON lines, so it can be started
+    from Celery's daemonic pool processes, which may not use multiprocessing.
+    """
+
+    def __init__(self, timeout=Config.SCENE_CHECK_TIMEOUT):
+        self.timeout = timeout
+        self._process = None
+        self._lock = threading.Lock()
+        # Protocol bytes read from the checker but not yet parsed
+        self._pending = b""
+
+    def _ensureStarted(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "app.services.manim.sceneChecker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=backend_dir,
+        )
+        self._pending = b""
+        # The first line is sent once manim is imported
+        self._readLine(self.timeout + 60)
+
+    def _readLine(self, timeout):
+        # Reads the raw fd: select() cannot see a line already pulled into the
+        # file object's buffer, and would wait for one the checker already sent
+        fd = self._process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("scene checker did not answer")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("scene checker exited")
+            self._pending += chunk
+        line, self._pending = self._pending.split(b"\n", 1)
+        return json.loads(line)
+
+    def check(self, filename, resolution, texDir=None) -> PreflightResult:
+        request = {
+            "filepath": os.path.abspath(f"./temp/{filename}"),
+            "sceneName": filename.replace(".py", ""),
+            "resolution": resolution,
+            "texDir": texDir,
+            "timeout": self.timeout,
+        }
+        with self._lock:
+            try:
+                self._ensureStarted()
+                self._process.stdin.write(json.dumps(request) + "\n")
+                # The server enforces the timeout itself; the margin covers the fork
+                result = self._readLine(self.timeout + 10)
+            except (EOFError, OSError, ValueError, TimeoutError) as e:
+                print(f"Warning: Scene checker unavailable ({e}), restarting it next time")
+                self.close()
+                return PreflightResult(success=True)
+        return PreflightResult(success=result["success"], output=result["output"], animationCount=result.get("animationCount"))
+
+    def close(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process = None
+            self._pending = b""
+
+
+_sceneChecker = None
+
+
+def getSceneChecker() -> SceneChecker:
+    global _sceneChecker
+    if _sceneChecker is None:
+        _sceneChecker = SceneChecker()
+    return _sceneChecker
+
+
+if __name__ == "__main__":
+    _serve()
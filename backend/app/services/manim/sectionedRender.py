@@ -0,0 +1,151 @@
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+from app.services.manim.renderSupervisor import superviseCommand
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+from app.config import Config
+from app.schema.ServiceSchema import mainmState
+from app.services.manim.renderCache import VIDEOS_DIR
+from app.services.manim.renderProgress import RenderProgressEvent
+from app.services.manim.preflight import run_manim_preflight
+from app.services.manim.texCache import MANIM_COMMAND
+
+# Formats whose partial outputs can be joined losslessly with `ffmpeg -c copy`
+SECTIONABLE_FORMATS = {"mp4", "mov", "webm"}
+MIN_ANIMATIONS_PER_SECTION = 3
+
+
+def sectionWorkerCount() -> int:
+    return Config.RENDER_SECTION_WORKERS or os.cpu_count() or 1
+
+
+def countSceneAnimations(filename: str, extraArgs=()) -> Optional[int]:
+    """Execute the scene without writing frames and return renderer.num_plays (plays and waits)."""
+    return run_manim_preflight(filename, extraArgs).animationCount
+
+
+def splitAnimationRanges(animationCount: int, workers: int) -> list[tuple[int, int]]:
+    """Split `animationCount` animations into contiguous, inclusive ranges."""
+    sections = max(1, min(workers, animationCount // MIN_ANIMATIONS_PER_SECTION))
+    base, extra = divmod(animationCount, sections)
+    ranges = []
+    start = 0
+    for i in range(sections):
+        size = base + (1 if i < extra else 0)
+        ranges.append((start, start + size - 1))
+        start += size
+    return ranges
+
+
+def _renderSection(filepath, scene_name, state: mainmState, start, end, workdir, extraArgs):
+    """Render plays `start` to `end`, or to the end of the scene when `end` is None."""
+    width, height = (state.resolution or "1920x1080").split("x")
+    output_name = f"section_{start:05d}"
+    # Sections render the same module and scene, so a shared media dir would
+    # share partial_movie_files/<scene>/ and its concat list between them
+    media_dir = tempfile.mkdtemp(prefix=f"{output_name}_", dir=workdir)
+    command = [
+        *MANIM_COMMAND, "render", filepath, scene_name,
+        "--format", state.format,
+        "--media_dir", media_dir,
+        "-r", f"{width},{height}",
+        "-n", str(start) if end is None else f"{start},{end}",
+        "-o", output_name,
+        f"-{state.quality}",
+        "--progress_bar", "none",
+        *extraArgs,
+    ]
+    result = superviseCommand(command, Config.MANIM_RENDER_TIMEOUT)
+    outputs = [
+        path for path in glob.glob(os.path.join(media_dir, "videos", "**", f"{output_name}.{state.format}"), recursive=True)
+        if "partial_movie_files" not in path
+    ]
+    return result, outputs[0] if outputs else None
+
+
+def _concatSections(section_files: list[str], destination: str, workdir: str) -> bool:
+    list_path = os.path.join(workdir, "sections.txt")
+    with open(list_path, "w") as f:
+        for path in section_files:
+            f.write(f"file '{path}'\n")
+
+    command = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0",
+        "-i", list_path,
+        "-c", "copy",
+        destination,
+    ]
+    try:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except FileNotFoundError:
+        print("Sectioned render: ffmpeg not found")
+        return False
+    if completed.returncode != 0:
+        print(f"Sectioned render: ffmpeg concat failed:\n{completed.stdout}")
+        return False
+    return True
+
+
+def run_manim_scene_sectioned(filename, state: mainmState, animationCount: int, onProgress=None, extraArgs=()):
+    """Render animation ranges of one scene in parallel and join them with ffmpeg.
+
+    Returns (success, output_lines, reason). `success` is None when the sectioned path
+    itself could not produce a video (missing ffmpeg, lost section output) and
+    the caller should fall back to a regular single-process render.
+
+    The last section has no upper bound, so plays past a short count still
+    end up in the video. Manim skips the plays before a section's start with
+    one `update_to_time(run_time)` each, so updaters see one large dt per
+    skipped play instead of a dt per frame; scenes whose updaters integrate
+    over dt can start a section in a different state than the single render
+    reaches at that point.
+    """
+    filepath = os.path.abspath(f"./temp/{filename}")
+    scene_name = filename.replace(".py", "")
+    ranges = splitAnimationRanges(animationCount, sectionWorkerCount())
+    lastStart = ranges[-1][0]
+    print(f"--- Sectioned render of {scene_name}: {animationCount} animations in {len(ranges)} sections ---")
+
+    workdir = tempfile.mkdtemp(prefix=f"{scene_name}_sections_", dir=os.path.abspath("./temp"))
+    try:
+        section_files = {}
+        completedAnimations = 0
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = {
+                executor.submit(
+                    _renderSection, filepath, scene_name, state, start, None if start == lastStart else end, workdir, extraArgs
+                ): (start, end)
+                for start, end in ranges
+            }
+            for future in as_completed(futures):
+                start, end = futures[future]
+                result, output_file = future.result()
+                if result.returncode != 0:
+                    for other in futures:
+                        other.cancel()
+                    return False, result.output, result.reason
+                if output_file is None:
+                    print(f"Sectioned render: no output for animations {start}-{end}")
+                    return None, result.output, None
+                section_files[start] = output_file
+                completedAnimations += end - start + 1
+                if onProgress is not None:
+                    onProgress(RenderProgressEvent(
+                        animationIndex=completedAnimations - 1,
+                        frame=1,
+                        totalFrames=1,
+                    ))
+
+        os.makedirs(VIDEOS_DIR, exist_ok=True)
+        destination = os.path.join(VIDEOS_DIR, f"{scene_name}.{state.format}")
+        ordered = [section_files[start] for start, _ in ranges]
+        if not _concatSections(ordered, destination, workdir):
+            return None, [], None
+        print("--- Finished sectioned rendering successfully ---")
+        return True, [], None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
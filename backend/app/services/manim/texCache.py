@@ -0,0 +1,157 @@
+import fcntl
+import functools
+import os
+import shutil
+import sys
+import tempfile
+from app.config import Config
+from app.services.manim.renderCache import backend_dir
+
+# Absolute paths (e.g. a volume shared by every render node) are kept as is
+TEX_CACHE_DIR = os.path.join(backend_dir, Config.TEX_CACHE_DIR)
+WORKSPACE_ROOT = os.path.join(TEX_CACHE_DIR, ".work")
+LOCK_PATH = os.path.join(TEX_CACHE_DIR, ".lock")
+
+# The manim CLI with shared TeX cache lookups installed; run from backend_dir
+MANIM_COMMAND = [sys.executable, "-m", "app.services.manim.texCache"]
+
+
+def _linkOrCopy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def installTexCacheLookup():
+    """Make Manim fetch compiled TeX from the shared cache when its tex_dir misses.
+
+    Manim names compiled TeX after a hash of the expression and template and
+    skips latex/dvisvgm when `<hash>.svg` exists next to the `.tex` file it
+    writes. Linking the cached SVG in right after that file is written seeds
+    a workspace with only the entries the scene uses.
+    """
+    from manim.utils import tex_file_writing
+
+    generate = tex_file_writing.generate_tex_file
+    if getattr(generate, "usesTexCache", False):
+        return
+
+    @functools.wraps(generate)
+    def generateWithCacheLookup(*args, **kwargs):
+        texFile = generate(*args, **kwargs)
+        svgFile = texFile.with_suffix(".svg")
+        if not svgFile.exists() and os.path.abspath(svgFile.parent) != os.path.abspath(TEX_CACHE_DIR):
+            try:
+                _linkOrCopy(os.path.join(TEX_CACHE_DIR, svgFile.name), str(svgFile))
+            except OSError:
+                # Not cached, or evicted meanwhile: Manim compiles it
+                pass
+        return texFile
+
+    generateWithCacheLookup.usesTexCache = True
+    tex_file_writing.generate_tex_file = generateWithCacheLookup
+
+
+class TexWorkspace:
+    """Private Manim tex_dir backed by the shared TeX-to-SVG cache.
+
+    The workspace starts empty; Manim processes with installTexCacheLookup
+    link cached SVGs in as the scene asks for them, so concurrent renders
+    never see each other's half-written files. New SVGs are published back
+    with an atomic rename on exit. The `.tex` sources Manim leaves behind tell
+    which cached entries were used, and those are touched for LRU eviction.
+
+    The config file lives next to the tex_dir, not in it: Manim deletes
+    everything but `.svg` and `.tex` files from tex_dir after each compile.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.path = None
+        self.configPath = None
+
+    def __enter__(self):
+        os.makedirs(WORKSPACE_ROOT, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix="tex_", dir=WORKSPACE_ROOT)
+        self.path = os.path.join(self.root, "tex")
+        os.makedirs(self.path)
+
+        config_path = os.path.join(self.root, "manim.cfg")
+        with open(config_path, "w") as f:
+            f.write(f"[CLI]\ntex_dir = {self.path}\n\n[custom_folders]\ntex_dir = {self.path}\n")
+        self.configPath = config_path
+        return self
+
+    @property
+    def manimArgs(self):
+        return ["--config_file", self.configPath]
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._publish()
+            pruneTexCache()
+        except OSError as e:
+            print(f"Warning: Failed to update the TeX cache: {e}")
+        finally:
+            shutil.rmtree(self.root, ignore_errors=True)
+        return False
+
+    def _publish(self):
+        for name in os.listdir(self.path):
+            stem, extension = os.path.splitext(name)
+            if extension == ".tex":
+                cached = os.path.join(TEX_CACHE_DIR, f"{stem}.svg")
+                if os.path.exists(cached):
+                    os.utime(cached, None)
+            elif extension == ".svg" and not os.path.exists(os.path.join(TEX_CACHE_DIR, name)):
+                tmp_path = os.path.join(TEX_CACHE_DIR, f".{name}.{os.getpid()}.tmp")
+                _linkOrCopy(os.path.join(self.path, name), tmp_path)
+                os.replace(tmp_path, os.path.join(TEX_CACHE_DIR, name))
+
+
+def pruneTexCache(max_bytes: int = Config.TEX_CACHE_MAX_BYTES):
+    """Evict least recently used SVGs until the shared cache fits in `max_bytes`."""
+    with open(LOCK_PATH, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another worker is already pruning
+            return
+
+        entries = []
+        for name in os.listdir(TEX_CACHE_DIR):
+            if not name.endswith(".svg"):
+                continue
+            path = os.path.join(TEX_CACHE_DIR, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+def runManimCli():
+    """Run the manim CLI on sys.argv with shared TeX cache lookups installed."""
+    try:
+        installTexCacheLookup()
+        from manim.__main__ import main
+    except ImportError:
+        # Reported like a missing binary, see renderSupervisor.LIMITS_SHIM
+        sys.stderr.write("manim: command not found\n")
+        sys.exit(127)
+    main(prog_name="manim")
+
+
+if __name__ == "__main__":
+    runManimCli()
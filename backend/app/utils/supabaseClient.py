@@ -7,9 +7,11 @@ SUPABASE_URL = Config.SUPABASE_URL
 SUPABASE_BUCKET = Config.SUPABASE_BUCKET
 SUPABASE_SERVICE_ROLE_KEY = Config.SUPABASE_SERVICE_ROLE_KEY
 
+SIGNED_URL_EXPIRES_IN = 31536000
+
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-def uploadFile(filename, format, expires_in=31536000):
+def uploadFile(filename, format, expires_in=SIGNED_URL_EXPIRES_IN):
 
     current_dir = os.path.dirname(os.path.abspath(__file__))
     backend_dir = os.path.dirname(os.path.dirname(current_dir))
@@ -0,0 +1,66 @@
+import json
+import os
+from typing import List, Optional
+from pydantic import BaseModel
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENES_DIR = os.path.join(BENCHMARKS_DIR, "scenes")
+DEFAULT_CORPUS = os.path.join(BENCHMARKS_DIR, "corpus.jsonl")
+
+
+class CorpusEntry(BaseModel):
+    id: str
+    query: str
+    animationType: str
+    chatName: str
+    description: str
+    scene: Optional[str] = None
+    # Written by rewrites; lets an entry exercise the fix loop
+    fixedScene: Optional[str] = None
+    feasible: bool = True
+    reason: str = "The request can be animated with Manim"
+    quality: str = "ql"
+    format: str = "mp4"
+    resolution: str = "854x480"
+
+    def sceneCode(self, fixed: bool = False) -> str:
+        scene = self.fixedScene if fixed and self.fixedScene else self.scene
+        with open(os.path.join(SCENES_DIR, scene)) as f:
+            return f.read()
+
+    def structured(self, schemaName: str) -> dict:
+        """Field values for a structured-output call, by schema name."""
+        if schemaName == "CodeGenPossibility":
+            return {
+                "isFeasible": self.feasible,
+                "reason": self.reason,
+                "chatName": self.chatName,
+                "animationType": self.animationType,
+            }
+        if schemaName == "DetailDescription":
+            return {"description": self.description}
+        if schemaName == "CheckDetailedDescription":
+            return {"isThisGoodDescrription": True, "detailedDescriptionError": ""}
+        if schemaName == "CheckMaimCode":
+            return {"isCodeGood": True, "errorMessage": ""}
+        raise ValueError(f"The benchmark model has no answer for {schemaName}")
+
+
+class BenchmarkCorpus:
+    def __init__(self, entries: List[CorpusEntry]):
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CORPUS) -> "BenchmarkCorpus":
+        with open(path) as f:
+            return cls([CorpusEntry(**json.loads(line)) for line in f if line.strip()])
+
+    def match(self, text: str) -> Optional[CorpusEntry]:
+        # Early stages quote the user query, code generation quotes the description
+        for entry in self.entries:
+            if entry.query in text:
+                return entry
+        for entry in self.entries:
+            if entry.description in text:
+                return entry
+        return None
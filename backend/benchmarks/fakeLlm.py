@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Scripted stand-in for llmFlash / llmPro. Every answer comes from the corpus
+# entry whose query or description appears in the prompt, so concurrent jobs
+# never see each other's responses and a run is fully deterministic.
+
+WRITE_TOOL = "createFileAndWriteMainmCode"
+FILENAME_PATTERN = re.compile(r"Animation_[0-9a-f]{8}\.py")
+SCENE_CLASS_PATTERN = re.compile(r"^class\s+\w+\s*\(", re.MULTILINE)
+
+# Rough token count; enough to compare prompt layouts
+CHARS_PER_TOKEN = 4
+
+
+def _promptText(messages) -> str:
+    if hasattr(messages, "to_messages"):
+        messages = messages.to_messages()
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.content) for message in messages)
+
+
+def estimateTokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+class LocalPrefixCache:
+    """Stand-in for Gemini's implicit context caching.
+
+    A prompt counts as cached up to the longest prefix it shares with a recent
+    prompt, once that prefix reaches the provider's minimum cacheable size.
+    """
+
+    def __init__(self, minTokens: int = 1024, window: int = 64):
+        self._minTokens = minTokens
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def cachedTokens(self, prompt: str) -> int:
+        with self._lock:
+            shared = max((self._sharedPrefix(prompt, previous) for previous in self._recent), default=0)
+            self._recent.append(prompt)
+        tokens = shared // CHARS_PER_TOKEN
+        return tokens if tokens >= self._minTokens else 0
+
+    @staticmethod
+    def _sharedPrefix(a: str, b: str) -> int:
+        # Binary search on slice comparisons, which run in C
+        low, high = 0, min(len(a), len(b))
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[:middle] == b[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+
+class BenchmarkChatModel(BaseChatModel):
+    model: str = "benchmark-scripted"
+    corpus: Any
+    latency: float = 0.0
+    prefixCache: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-scripted"
+
+    def _entry(self, text: str):
+        entry = self.corpus.match(text)
+        if entry is None:
+            raise ValueError("No benchmark corpus entry matches this prompt")
+        return entry
+
+    def _reply(self, messages: List[BaseMessage], tools=None, structuredSchema=None) -> AIMessage:
+        text = _promptText(messages)
+        reply = self._answer(text, messages, tools, structuredSchema)
+        cached = self.prefixCache.cachedTokens(text) if self.prefixCache is not None else 0
+        inputTokens = estimateTokens(text)
+        outputTokens = estimateTokens(json.dumps(reply.tool_calls) if reply.tool_calls else str(reply.content))
+        reply.usage_metadata = {
+            "input_tokens": inputTokens,
+            "output_tokens": outputTokens,
+            "total_tokens": inputTokens + outputTokens,
+            "input_token_details": {"cache_read": cached},
+        }
+        return reply
+
+    def _answer(self, text, messages, tools, structuredSchema) -> AIMessage:
+        entry = self._entry(text)
+        if structuredSchema is not None:
+            return AIMessage(content=json.dumps(entry.structured(structuredSchema)))
+        toolNames = {tool["function"]["name"] for tool in tools or []}
+
+        if WRITE_TOOL not in toolNames:
+            # Plain agents only write descriptions
+            return AIMessage(content=entry.description)
+        if any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(content="The file has been written.")
+
+        filename = FILENAME_PATTERN.search(text)
+        if filename is None:
+            raise ValueError("The code generation prompt does not name a file")
+        filename = filename.group(0)
+        rewrite = "CURRENT CODE TO FIX" in text
+        code = entry.sceneCode(fixed=rewrite)
+        code = SCENE_CLASS_PATTERN.sub(f"class {filename[:-3]}(", code, count=1)
+        return AIMessage(
+            content="",
+            tool_calls=[{
+                "name": WRITE_TOOL,
+                "args": {"filename": filename, "content": code},
+                "id": f"call_{filename[:-3]}",
+                "type": "tool_call",
+            }],
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, structuredSchema=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, tools, structuredSchema))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, structuredSchema=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, tools, structuredSchema))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def with_structured_output(self, schema, **kwargs):
+        # Through the model, so callbacks and usage accounting see the call
+        parse = RunnableLambda(lambda message: schema(**json.loads(message.content)))
+        return self.bind(structuredSchema=schema.__name__) | parse
+
+
+def installBenchmarkLlm(corpus, latency: float = 0.0) -> BenchmarkChatModel:
+    """Replace llmFlash and llmPro. Must run before the graph modules are imported."""
+    import app.core.llm as llm
+    from app.core.llmUsage import llmUsageTracker
+
+    model = BenchmarkChatModel(
+        corpus=corpus,
+        latency=latency,
+        prefixCache=LocalPrefixCache(),
+        callbacks=[llmUsageTracker],
+    )
+    llm.llmFlash = model
+    llm.llmPro = model
+    return model
@@ -0,0 +1,367 @@
+"""Offline end-to-end benchmark of the generation graphs.
+
+Replays benchmarks/corpus.jsonl through the feasibility, description and code
+graphs with a scripted chat model in place of llmFlash / llmPro, renders every
+scene with the real Manim pipeline, and reports per-stage and per-node
+timings, render throughput, peak RSS and success rate. No network is needed.
+
+    cd backend
+    python -m benchmarks.run --rounds 3 --concurrency 2 --output report.json
+    python -m benchmarks.run --baseline report.json --max-regression 0.2
+
+--llm record stores real Gemini answers in a SQLite fixture file (needs the
+network once); --llm replay answers from that file only, failing on a miss.
+
+With --baseline the exit status is 1 when a stage median, the job median or
+peak RSS grows by more than --max-regression, or the success rate drops.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings the graphs never read but Config requires; real values still win
+OFFLINE_SETTINGS = {
+    "LANGSMITH_ENDPOINT": "http://localhost",
+    "LANGSMITH_API_KEY": "offline",
+    "LANGSMITH_PROJECT": "benchmark",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "ALGORITHM": "HS256",
+    "SECRET_KEY": "offline",
+    "ACCESS_TOKEN_SECRET_KEY": "offline",
+    "ACCESS_TOKEN_EXPIRE_TIME": "30",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "REFRESH_TOKEN_SECRET_KEY": "offline",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "SUPABASE_URL": "http://localhost",
+    "SUPABASE_BUCKET": "offline",
+    "SUPABASE_SERVICE_ROLE_KEY": "offline",
+    "MAIL_USERNAME": "offline",
+    "MAIL_PASSWORD": "offline",
+    "MAIL_PORT": "587",
+    "MAIL_SERVER": "localhost",
+    "MAIL_FROM_NAME": "offline",
+    "MAIL_FROM": "offline@example.com",
+    "DOMAIN": "localhost",
+    "GOOGLE_CLIENT_ID": "offline",
+    "GOOGLE_CLIENT_SECRET": "offline",
+    "FRONTEND_DOMAIN": "localhost",
+    "ENV": "benchmark",
+    "GOOGLE_API_KEY": "offline",
+}
+
+# Nodes of the code graph that count as rendering; everything else there is codegen
+RENDER_NODES = {"agentRunManimCode"}
+
+
+def prepareEnvironment(renderCacheDir: str, llm: str, fixtures: str):
+    for name, value in OFFLINE_SETTINGS.items():
+        # Recording talks to Gemini with the key from .env
+        if llm == "record" and name == "GOOGLE_API_KEY":
+            continue
+        os.environ.setdefault(name, value)
+    # Tracing and metrics would both try to reach a server
+    os.environ["LANGSMITH_TRACING"] = "false"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    os.environ["METRICS_ENABLED"] = "false"
+    if llm == "scripted":
+        os.environ["LLM_CACHE"] = "off"
+    else:
+        os.environ["LLM_CACHE"] = "sqlite"
+        os.environ["LLM_CACHE_SQLITE_PATH"] = fixtures
+        os.environ["LLM_CACHE_MODE"] = "replay" if llm == "replay" else "readwrite"
+    # Keep benchmark renders out of the real cache; wiped between rounds
+    os.environ["RENDER_CACHE_DIR"] = renderCacheDir
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values) -> dict:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": round(percentile(values, 0.5), 3) if values else None,
+        "p95": round(percentile(values, 0.95), 3) if values else None,
+        "max": round(max(values), 3) if values else None,
+    }
+
+
+class JobRecord:
+    def __init__(self, entryId: str):
+        self.entryId = entryId
+        self.stages = defaultdict(float)
+        self.nodes = []
+        self.outcome = None
+        self.success = False
+        self.seconds = 0.0
+        self.error = None
+
+
+async def runGraph(graph, state, stageFor, record: JobRecord) -> dict:
+    """Stream a graph, timing each node by the gap between its update and the previous one."""
+    values = {}
+    last = time.perf_counter()
+    async for mode, chunk in graph.astream(state, stream_mode=["updates", "values"]):
+        now = time.perf_counter()
+        if mode == "updates":
+            for node in chunk:
+                record.nodes.append((node, now - last))
+                record.stages[stageFor(node)] += now - last
+        else:
+            values = chunk
+        last = now
+    return values
+
+
+def removeJobFiles(filename: str, format: str):
+    from app.services.manim.renderCache import findRenderedFile
+
+    if not filename:
+        return
+    scene = filename.replace(".py", "")
+    for path in (os.path.join("temp", filename), findRenderedFile(scene, format)):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+async def runJob(entry, graphs) -> JobRecord:
+    from app.schema.ServiceSchema import isQueryPossible, DescriptionGenerationState, mainmState
+
+    feasibilityGraph, descriptionGraph, codeGraph = graphs
+    record = JobRecord(entry.id)
+    start = time.perf_counter()
+    filename = None
+    try:
+        feasible = await runGraph(
+            feasibilityGraph, isQueryPossible(userQuery=entry.query), lambda node: "feasibility", record
+        )
+        if feasible.get("isFeasible") is False:
+            record.outcome = "infeasible"
+            record.success = not entry.feasible
+            return record
+
+        described = await runGraph(descriptionGraph, DescriptionGenerationState(
+            userQuery=entry.query,
+            descriptions=[],
+            detailedDescription="",
+            descriptionRefine=0,
+            AutoComplete=True,
+            format=entry.format,
+            chatName=feasible.get("chatName"),
+            reason=feasible.get("reason"),
+            animationType=feasible.get("animationType"),
+        ), lambda node: "description", record)
+
+        generated = await runGraph(codeGraph, mainmState(
+            description=described.get("detailedDescription"),
+            filename="",
+            format=entry.format,
+            quality=entry.quality,
+            animationType=feasible.get("animationType"),
+            resolution=entry.resolution,
+        ), lambda node: "render" if node in RENDER_NODES else "codegen", record)
+        filename = generated.get("filename")
+        record.outcome = "rendered" if generated.get("executionSuccess") else "failed"
+        record.success = entry.feasible and generated.get("executionSuccess") is True
+        if not record.success:
+            record.error = generated.get("executionError") or generated.get("validationError")
+    except Exception as e:
+        record.outcome = "error"
+        record.error = f"{type(e).__name__}: {e}"
+    finally:
+        record.seconds = time.perf_counter() - start
+        removeJobFiles(filename, entry.format)
+    return record
+
+
+async def runRound(entries, graphs, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(entry):
+        async with slots:
+            return await runJob(entry, graphs)
+
+    return await asyncio.gather(*(limited(entry) for entry in entries))
+
+
+def peakRssMb() -> dict:
+    # ru_maxrss is in KiB on Linux; children only count once they are reaped
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def inputTokenTotals() -> dict:
+    from app.core.llmUsage import llmUsageTracker
+
+    return {model: dict(totals) for model, totals in llmUsageTracker.totals.items()}
+
+
+def buildReport(records, wallSeconds: float, settings: dict) -> dict:
+    stages = defaultdict(list)
+    nodes = defaultdict(list)
+    for record in records:
+        for stage, seconds in record.stages.items():
+            stages[stage].append(seconds)
+        for node, seconds in record.nodes:
+            nodes[node].append(seconds)
+
+    renders = [record for record in records if record.outcome == "rendered"]
+    renderSeconds = sum(stages["render"])
+    return {
+        "settings": settings,
+        "jobs": len(records),
+        "successRate": round(sum(record.success for record in records) / len(records), 3) if records else None,
+        "outcomes": {
+            outcome: sum(record.outcome == outcome for record in records)
+            for outcome in sorted({record.outcome for record in records})
+        },
+        "wallSeconds": round(wallSeconds, 2),
+        "job": summarize([record.seconds for record in records]),
+        "stages": {stage: summarize(values) for stage, values in sorted(stages.items())},
+        "nodes": {node: summarize(values) for node, values in sorted(nodes.items())},
+        "renderThroughput": {
+            "rendersPerMinute": round(len(renders) * 60 / wallSeconds, 2) if wallSeconds else None,
+            "renderSecondsPerRender": round(renderSeconds / len(renders), 2) if renders else None,
+        },
+        "peakRssMb": peakRssMb(),
+        "inputTokens": inputTokenTotals(),
+        "failures": [
+            {"id": record.entryId, "outcome": record.outcome, "error": (record.error or "")[:500]}
+            for record in records if not record.success
+        ],
+    }
+
+
+def printReport(report: dict):
+    print(f"\nJobs: {report['jobs']}  success rate: {report['successRate']}  wall: {report['wallSeconds']}s")
+    print(f"Outcomes: {report['outcomes']}")
+    print(f"Render throughput: {report['renderThroughput']}")
+    print(f"Peak RSS (MB): {report['peakRssMb']}")
+    print(f"Input tokens: {report['inputTokens']}")
+    for title, rows in (("Stage", report["stages"]), ("Node", report["nodes"])):
+        print(f"\n{title:<28}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+        for name, row in rows.items():
+            print(f"{name:<28}{row['count']:>7}{row['mean']:>10}{row['p50']:>10}{row['p95']:>10}{row['max']:>10}")
+    job = report["job"]
+    print(f"{'job':<28}{job['count']:>7}{job['mean']:>10}{job['p50']:>10}{job['p95']:>10}{job['max']:>10}")
+    for failure in report["failures"]:
+        print(f"\nFAILED {failure['id']} ({failure['outcome']}): {failure['error']}")
+
+
+def compareWithBaseline(report: dict, baseline: dict, maxRegression: float) -> list:
+    """Regressions of the report against a baseline report, as messages."""
+    regressions = []
+
+    def check(name, current, previous):
+        if current is None or not previous:
+            return
+        if current > previous * (1 + maxRegression):
+            regressions.append(f"{name}: {previous} -> {current} (+{(current / previous - 1) * 100:.0f}%)")
+
+    for stage, row in report["stages"].items():
+        check(f"stage {stage} p50", row["p50"], baseline.get("stages", {}).get(stage, {}).get("p50"))
+    check("job p50", report["job"]["p50"], baseline.get("job", {}).get("p50"))
+    check("peak RSS", report["peakRssMb"]["self"], baseline.get("peakRssMb", {}).get("self"))
+    if baseline.get("successRate") is not None and report["successRate"] < baseline["successRate"]:
+        regressions.append(f"success rate: {baseline['successRate']} -> {report['successRate']}")
+    return regressions
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Manim generation pipeline")
+    parser.add_argument("--corpus", default=None, help="JSONL corpus (default: benchmarks/corpus.jsonl)")
+    parser.add_argument("--rounds", type=int, default=1, help="times the whole corpus is replayed")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs in flight at once")
+    parser.add_argument("--llm", choices=["scripted", "replay", "record"], default="scripted",
+                        help="scripted answers from the corpus, or Gemini answers recorded in --llm-fixtures")
+    parser.add_argument("--llm-fixtures", default="benchmarks/llm_fixtures.sqlite3", help="SQLite file for --llm record/replay")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds added to every scripted LLM call")
+    parser.add_argument("--only", action="append", default=[], help="run only these corpus ids")
+    parser.add_argument("--warm-render-cache", action="store_true", help="keep the render cache between rounds")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown against the baseline")
+    return parser.parse_args()
+
+
+async def main(args) -> int:
+    # Paths are relative to where the command ran, before moving to backend/
+    for name in ("corpus", "output", "baseline", "llm_fixtures"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    renderCacheDir = tempfile.mkdtemp(prefix="manim-benchmark-cache-")
+    prepareEnvironment(renderCacheDir, args.llm, args.llm_fixtures)
+
+    from benchmarks.corpus import BenchmarkCorpus, DEFAULT_CORPUS
+    from benchmarks.fakeLlm import installBenchmarkLlm
+
+    corpus = BenchmarkCorpus.load(args.corpus or DEFAULT_CORPUS)
+    if args.llm == "scripted":
+        installBenchmarkLlm(corpus, latency=args.llm_latency)
+
+    # Imported only now so the graph modules bind the scripted model
+    from app.services.manim.graphForFesibilityCheck import graph_for_query_fesibility_check
+    from app.services.manim.graphForDescriptionGenerate import graph_for_description_generate
+    from app.services.manim.graphForManimCodeGenerate import graph_for_mainm_code_generate
+    from app.services.manim import renderPool
+
+    graphs = (graph_for_query_fesibility_check, graph_for_description_generate, graph_for_mainm_code_generate)
+    entries = [entry for entry in corpus.entries if not args.only or entry.id in args.only]
+
+    records = []
+    start = time.perf_counter()
+    try:
+        for roundIndex in range(args.rounds):
+            if roundIndex and not args.warm_render_cache:
+                shutil.rmtree(renderCacheDir, ignore_errors=True)
+                os.makedirs(renderCacheDir, exist_ok=True)
+            print(f"--- Benchmark round {roundIndex + 1}/{args.rounds}: {len(entries)} prompts ---")
+            records.extend(await runRound(entries, graphs, max(1, args.concurrency)))
+        wallSeconds = time.perf_counter() - start
+    finally:
+        if renderPool._renderPool is not None:
+            renderPool._renderPool.close()
+        shutil.rmtree(renderCacheDir, ignore_errors=True)
+
+    report = buildReport(records, wallSeconds, {
+        "rounds": args.rounds,
+        "concurrency": args.concurrency,
+        "llm": args.llm,
+        "llmLatency": args.llm_latency,
+        "warmRenderCache": args.warm_render_cache,
+    })
+    printReport(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compareWithBaseline(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parseArgs())))
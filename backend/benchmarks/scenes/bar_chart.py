@@ -0,0 +1,21 @@
+from manim import *
+
+
+class BarChartScene(Scene):
+    def construct(self):
+        title = Text("Monthly Sales", font_size=40).to_edge(UP)
+        values = [3, 5, 2, 4, 6]
+        colors = [BLUE, GREEN, YELLOW, ORANGE, RED]
+        bars = VGroup(*[
+            Rectangle(width=1, height=value * 0.6, fill_color=color, fill_opacity=0.8, stroke_width=0)
+            for value, color in zip(values, colors)
+        ]).arrange(RIGHT, buff=0.5, aligned_edge=DOWN).shift(DOWN)
+        labels = VGroup(*[
+            Text(name, font_size=24).next_to(bar, DOWN)
+            for name, bar in zip(["Jan", "Feb", "Mar", "Apr", "May"], bars)
+        ])
+
+        self.play(Write(title), run_time=1)
+        self.play(LaggedStart(*[GrowFromEdge(bar, DOWN) for bar in bars], lag_ratio=0.2), run_time=3)
+        self.play(FadeIn(labels), run_time=1)
+        self.wait(1)
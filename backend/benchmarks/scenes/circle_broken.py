@@ -0,0 +1,11 @@
+from manim import *
+
+
+class GrowingCircle(Scene):
+    def construct(self):
+        title = Text("Area of a circle", font_size=40).to_edge(UP)
+        circle = Circle(radius=2, color=GREEN)
+
+        self.play(Write(title), run_time=1)
+        self.play(ShowCreation(circle), run_time=2)
+        self.wait(1)
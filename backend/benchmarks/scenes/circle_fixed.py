@@ -0,0 +1,14 @@
+from manim import *
+
+
+class GrowingCircle(Scene):
+    def construct(self):
+        title = Text("Area of a circle", font_size=40).to_edge(UP)
+        circle = Circle(radius=2, color=GREEN)
+        radius = Line(circle.get_center(), circle.get_right(), color=YELLOW)
+
+        self.play(Write(title), run_time=1)
+        self.play(Create(circle), run_time=2)
+        self.play(Create(radius), run_time=1)
+        self.play(circle.animate.set_fill(GREEN, opacity=0.5), run_time=1)
+        self.wait(1)
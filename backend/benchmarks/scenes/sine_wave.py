@@ -0,0 +1,15 @@
+from manim import *
+
+
+class SineWave(Scene):
+    def construct(self):
+        title = Text("Sine and Cosine", font_size=40).to_edge(UP)
+        axes = Axes(x_range=[-4, 4, 1], y_range=[-2, 2, 1], x_length=10, y_length=4).shift(DOWN * 0.5)
+        sine = axes.plot(lambda x: np.sin(x), color=BLUE)
+        cosine = axes.plot(lambda x: np.cos(x), color=RED)
+
+        self.play(Write(title), run_time=1)
+        self.play(Create(axes), run_time=2)
+        self.play(Create(sine), run_time=2)
+        self.play(Create(cosine), run_time=2)
+        self.wait(1)
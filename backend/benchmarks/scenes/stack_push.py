@@ -0,0 +1,23 @@
+from manim import *
+
+
+class StackPush(Scene):
+    def construct(self):
+        title = Text("Stack: push and pop", font_size=40).to_edge(UP)
+        self.play(Write(title), run_time=1)
+
+        base = Line(LEFT * 1.5, RIGHT * 1.5).shift(DOWN * 2.5)
+        self.play(Create(base), run_time=1)
+
+        items = VGroup()
+        for index, value in enumerate([4, 8, 15]):
+            box = Square(side_length=1, color=BLUE, fill_opacity=0.5)
+            label = Text(str(value), font_size=32).move_to(box)
+            item = VGroup(box, label).move_to(UP * 2.5 + RIGHT * 4)
+            self.play(FadeIn(item), run_time=0.5)
+            self.play(item.animate.move_to(DOWN * (2 - index * 1.1)), run_time=1)
+            items.add(item)
+
+        self.play(items[-1].animate.shift(RIGHT * 4), run_time=1)
+        self.play(FadeOut(items[-1]), run_time=0.5)
+        self.wait(1)
@@ -0,0 +1,12 @@
+from manim import *
+
+
+class TitleCard(Scene):
+    def construct(self):
+        heading = Text("Pythagorean Theorem", font_size=48)
+        statement = Text("a² + b² = c²", font_size=40, color=YELLOW).next_to(heading, DOWN, buff=1)
+
+        self.play(Write(heading), run_time=2)
+        self.play(FadeIn(statement, shift=UP), run_time=1)
+        self.play(heading.animate.to_edge(UP), statement.animate.move_to(ORIGIN), run_time=1)
+        self.wait(1)
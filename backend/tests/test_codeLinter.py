@@ -0,0 +1,116 @@
+from app.services.manim.codeLinter import lintManimCode
+
+
+def scene(body: str) -> str:
+    lines = "\n".join(f"        {line}" for line in body.strip().splitlines())
+    return f"from manim import *\n\n\nclass Animation_test(Scene):\n    def construct(self):\n{lines}\n"
+
+
+def rules(code: str) -> list:
+    return [issue.rule for issue in lintManimCode(code, "Animation_test").issues]
+
+
+def test_clean_scene_passes():
+    code = scene("""
+axes = Axes(x_range=[-3, 3], y_range=[-2, 2])
+graph = axes.plot(lambda x: x ** 2, color=BLUE)
+self.play(Create(axes), Create(graph))
+""")
+    assert rules(code) == []
+
+
+def test_syntax_error():
+    assert rules(scene("self.play(Create(Circle())")) == ["syntax"]
+
+
+def test_wrong_scene_name():
+    assert rules("from manim import *\n\nclass Other(Scene):\n    pass\n") == ["scene-name"]
+
+
+def test_removed_names_and_methods():
+    code = scene("""
+axes = Axes()
+graph = axes.get_graph(lambda x: x)
+self.play(ShowCreation(graph))
+""")
+    assert rules(code) == ["removed-method", "removed-name"]
+
+
+def test_add_numbers_on_axes_is_flagged():
+    code = scene("""
+self.axes = ThreeDAxes()
+self.axes.add_numbers()
+Axes().add_numbers()
+self.play(Create(self.axes))
+""")
+    assert rules(code) == ["removed-method", "removed-method"]
+
+
+def test_add_numbers_on_number_line_is_valid():
+    code = scene("""
+line = NumberLine(x_range=[0, 10])
+line.add_numbers()
+NumberLine().add_numbers()
+self.play(Create(line))
+""")
+    assert rules(code) == []
+
+
+def test_add_numbers_after_rebinding_is_valid():
+    code = scene("""
+axes = Axes()
+axes = NumberLine()
+axes.add_numbers()
+self.play(Create(axes))
+""")
+    assert rules(code) == []
+
+
+def test_removed_constructor_kwarg():
+    assert rules(scene("self.play(Create(Circle(opacity=0.5)))")) == ["removed-kwarg"]
+
+
+def test_angle_other_angle_is_valid():
+    code = scene("""
+l1 = Line(LEFT, RIGHT)
+l2 = Line(DOWN, UP)
+self.play(Create(Angle(l1, l2, other_angle=True)))
+""")
+    assert rules(code) == []
+
+
+def test_opacity_is_valid_on_methods():
+    assert rules(scene("self.play(Create(Circle().set_fill(RED, opacity=0.5)))")) == []
+
+
+def test_removed_next_to_kwarg():
+    code = scene("""
+label = Text("a").next_to(Circle(), DOWN, align_l=LEFT)
+self.play(Write(label))
+""")
+    assert rules(code) == ["removed-kwarg"]
+
+
+def test_aligned_edge_is_valid():
+    code = scene("""
+label = Text("a").next_to(Circle(), DOWN, aligned_edge=LEFT)
+self.play(Write(label))
+""")
+    assert rules(code) == []
+
+
+def test_empty_play_and_move_camera():
+    code = scene("""
+self.play()
+self.play(self.move_camera(phi=60 * DEGREES))
+""")
+    assert rules(code) == ["empty-play", "play-move-camera"]
+
+
+def test_traced_path_needs_point_function():
+    assert rules(scene("self.add(TracedPath())")) == ["traced-path"]
+
+
+def test_dynamic_code_is_uncertain():
+    result = lintManimCode(scene('eval("1")\nself.play(Create(Circle()))'), "Animation_test")
+    assert result.uncertain
@@ -6,7 +6,7 @@ import { CodeBlock } from "@/components/ui/code-block";
 import { useAuth } from "@/contexts/AuthContext";
 import { useNavigate } from "react-router-dom";
 import { IconPlus, IconUser, IconLogout, IconMenu2, IconDownload, IconCode, IconX, IconHistory } from "@tabler/icons-react";
-import type { ManimGenerationRequest, UserHistoryItem } from '@/types/api';
+import type { ManimGenerationRequest, TaskResultResponse, UserHistoryItem } from '@/types/api';
 import { ManimApiService } from '@/services/manimApi';
 import { Stepper, Step, StepLabel, Box, useTheme, useMediaQuery } from '@mui/material';
 import HistorySidebar from '@/components/HistorySidebar';
@@ -39,6 +39,11 @@ const PLACEHOLDERS = [
   "Make an animation about the water cycle and climate change",
 ];
 
+const formatEta = (seconds?: number | null) => {
+  if (typeof seconds !== 'number') return '';
+  return seconds < 60 ? ' • less than a minute left' : ` • about ${Math.round(seconds / 60)} min left`;
+};
+
 const SuggestionButton = memo(({ suggestion, onClick }: { suggestion: string, onClick: (suggestion: string, options?: { format: string; quality: string; resolution?: string }) => void }) => (
   <button
     onClick={() => onClick(suggestion, { format: "mp4", quality: "ql", resolution: "1920x1080" })}
@@ -377,124 +382,129 @@ export default function MainPage() {
 
         consecutiveErrors = 0;
 
+        return applyResult(result);
+      } catch (error) {
+        consecutiveErrors++;
+        console.error(`Polling error #${consecutiveErrors}:`, error);
+        
+        if (consecutiveErrors >= maxRetries) {
+          console.error('Max polling errors reached, stopping polling');
+          setMessages(prev => prev.map(msg => 
+            msg.taskId === taskId 
+              ? { 
+                  ...msg, 
+                  content: `Connection failed after ${maxRetries} retries. Task ID: ${taskId}`
+                }
+              : msg
+          ));
+          setIsGenerating(false);
+          return true;
+        }
+
         setMessages(prev => prev.map(msg => 
           msg.taskId === taskId 
             ? { 
                 ...msg, 
-                progress: result.progress,
-                stage: result.current_stage,
-                content: result.status === 'completed'
-                  ? result.data?.success
-                    ? `Animation completed successfully! Your "${result.data.chat_name}" is ready.`
-                    : `Animation generation failed: ${result.data?.reason || result.data?.message || 'Unknown error'}`
-                  : result.status === 'failed'
-                  ? `Animation generation failed. Please try again.`
-                  : result.status === 'cancelled'
-                  ? `Animation generation was cancelled by user.`
-                  : result.status === 'pending'
-                    ? (() => {
-                        const queuePos = typeof result.queue_left === 'number' ? result.queue_left : null;
-                        return queuePos !== null ? `Your Place in Queue: ${queuePos}` : 'In Queue';
-                      })()
-                  : result.status === 'in_progress'
-                    ? `${result.current_stage || 'In Progress'}`
-                  : `${result.current_stage || 'In Queue'}`
+                content: `Connection issue (${consecutiveErrors}/${maxRetries}). Retrying...`
               }
             : msg
         ));
+        
+        return false;
+      }
+    };
 
-        if (result.status === 'completed' || result.status === 'failed' || result.status === 'cancelled') {
-          
-          setIsGenerating(false);
-          
-          if (result.status === 'completed') {
-            if (result.data?.success) {
-              if (result.data.historyId) {
-                setCurrentHistoryId(result.data.historyId);
-              }
-              setMessages(prev => prev.map(msg => 
-                msg.taskId === taskId 
-                  ? { 
-                      ...msg, 
-                      videoUrl: result.data?.link,
-                      code: result.data?.data?.code || result.data?.code,
-                      filename: result.data?.data?.filename || result.data?.filename,
-                      content: `✅ Animation completed successfully! Your "${result.data?.chat_name}" is ready.`,
-                      success: true
-                    }
-                  : msg
-              ));
-
-              setHistoryRefreshKey(prev => prev + 1);
-            } else {
-              const failureReason = result.data?.reason || result.data?.message || 'Animation generation failed for unknown reasons.';
-              setMessages(prev => prev.map(msg => 
-                msg.taskId === taskId 
-                  ? { 
-                      ...msg, 
-                      content: `❌ Animation generation failed: ${failureReason}`,
-                      success: false
-                    }
-                  : msg
-              ));
+    const applyResult = (result: TaskResultResponse) => {
+      setMessages(prev => prev.map(msg => 
+        msg.taskId === taskId 
+          ? { 
+              ...msg, 
+              progress: result.progress,
+              stage: result.current_stage,
+              content: result.status === 'completed'
+                ? result.data?.success
+                  ? `Animation completed successfully! Your "${result.data.chat_name}" is ready.`
+                  : `Animation generation failed: ${result.data?.reason || result.data?.message || 'Unknown error'}`
+                : result.status === 'failed'
+                ? `Animation generation failed. Please try again.`
+                : result.status === 'cancelled'
+                ? `Animation generation was cancelled by user.`
+                : result.status === 'pending'
+                  ? (() => {
+                      const queuePos = typeof result.queue_left === 'number' ? result.queue_left : null;
+                      const eta = formatEta(result.eta_seconds);
+                      return (queuePos !== null ? `Your Place in Queue: ${queuePos}` : 'In Queue') + eta;
+                    })()
+                : result.status === 'in_progress'
+                  ? `${result.current_stage || 'In Progress'}${formatEta(result.eta_seconds)}`
+                : `${result.current_stage || 'In Queue'}`
+            }
+          : msg
+      ));
+
+      if (result.status === 'completed' || result.status === 'failed' || result.status === 'cancelled') {
+        
+        setIsGenerating(false);
+        
+        if (result.status === 'completed') {
+          if (result.data?.success) {
+            if (result.data.historyId) {
+              setCurrentHistoryId(result.data.historyId);
             }
-          } else if (result.status === 'failed') {
             setMessages(prev => prev.map(msg => 
               msg.taskId === taskId 
                 ? { 
                     ...msg, 
-                    content: `❌ Animation generation failed. Please try again.`,
-                    success: false
+                    videoUrl: result.data?.link,
+                    code: result.data?.data?.code || result.data?.code,
+                    filename: result.data?.data?.filename || result.data?.filename,
+                    content: `✅ Animation completed successfully! Your "${result.data?.chat_name}" is ready.`,
+                    success: true
                   }
                 : msg
             ));
-          } else if (result.status === 'cancelled') {
+
+            setHistoryRefreshKey(prev => prev + 1);
+          } else {
+            const failureReason = result.data?.reason || result.data?.message || 'Animation generation failed for unknown reasons.';
             setMessages(prev => prev.map(msg => 
               msg.taskId === taskId 
                 ? { 
                     ...msg, 
-                    content: `🚫 Animation generation was cancelled.`,
-                    success: false,
-                    progress: undefined,
-                    stage: undefined
+                    content: `❌ Animation generation failed: ${failureReason}`,
+                    success: false
                   }
                 : msg
             ));
           }
-          
-          return true;
-        }
-        
-        return false;
-      } catch (error) {
-        consecutiveErrors++;
-        console.error(`Polling error #${consecutiveErrors}:`, error);
-        
-        if (consecutiveErrors >= maxRetries) {
-          console.error('Max polling errors reached, stopping polling');
+        } else if (result.status === 'failed') {
           setMessages(prev => prev.map(msg => 
             msg.taskId === taskId 
               ? { 
                   ...msg, 
-                  content: `Connection failed after ${maxRetries} retries. Task ID: ${taskId}`
+                  content: `❌ Animation generation failed. Please try again.`,
+                  success: false
+                }
+              : msg
+          ));
+        } else if (result.status === 'cancelled') {
+          setMessages(prev => prev.map(msg => 
+            msg.taskId === taskId 
+              ? { 
+                  ...msg, 
+                  content: `🚫 Animation generation was cancelled.`,
+                  success: false,
+                  progress: undefined,
+                  stage: undefined
                 }
               : msg
           ));
-          setIsGenerating(false);
-          return true;
         }
-
-        setMessages(prev => prev.map(msg => 
-          msg.taskId === taskId 
-            ? { 
-                ...msg, 
-                content: `Connection issue (${consecutiveErrors}/${maxRetries}). Retrying...`
-              }
-            : msg
-        ));
         
-        return false;
+        return true;
       }
+      
+      return false;
     };
 
     const shouldStop = await pollTask();
@@ -528,11 +538,30 @@ export default function MainPage() {
       setActivePollingTimeouts(prev => new Set([...prev, timeoutId]));
     };
 
-    scheduleNextPoll();
+    // Prefer the pushed event stream; fall back to polling if it cannot be kept open
+    let source: EventSource | null = null;
+    if (typeof EventSource !== 'undefined') {
+      source = ManimApiService.streamTaskEvents(taskId);
+      source.onmessage = (event) => {
+        if (isCancelled || cancelledTasks.has(taskId) || applyResult(JSON.parse(event.data))) {
+          source?.close();
+        }
+      };
+      source.onerror = () => {
+        // The browser reconnects with Last-Event-ID on its own unless the stream was closed for good
+        if (source?.readyState === EventSource.CLOSED && !isCancelled) {
+          source = null;
+          scheduleNextPoll();
+        }
+      };
+    } else {
+      scheduleNextPoll();
+    }
     
     // Return cleanup function
     return () => {
       isCancelled = true;
+      source?.close();
       timeouts.forEach(timeout => clearTimeout(timeout));
     };
   }, [tokens?.accessToken, cancelledTasks]);
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { ManimGenerationRequest, ManimGenerationResponse, TaskResultResponse, CancelTaskResponse } from '@/types/api';
+import type { ManimGenerationRequest, ManimGenerationResponse, TaskResultResponse, TaskResultBatchResponse, CancelTaskResponse } from '@/types/api';
 
 export class ManimApiService {
   private static getAuthHeaders(accessToken: string) {
@@ -61,6 +61,30 @@ export class ManimApiService {
     }
   }
 
+  static async pollTaskStatuses(taskIds: string[], accessToken: string): Promise<TaskResultBatchResponse> {
+    try {
+      const response = await axios.post<TaskResultBatchResponse>(
+        '/api/manimGeneration/results',
+        { taskIds },
+        {
+          withCredentials: true,
+          headers: this.getAuthHeaders(accessToken),
+          timeout: 20000,
+        }
+      );
+
+      return response.data;
+    } catch (error: any) {
+      console.error('Batch task status polling error:', error);
+      throw error;
+    }
+  }
+
+  static streamTaskEvents(taskId: string): EventSource {
+    // Authenticated by the access token cookie; EventSource cannot send headers
+    return new EventSource(`/api/manimGeneration/events/${taskId}`, { withCredentials: true });
+  }
+
   static async cancelTask(taskId: string, accessToken: string): Promise<CancelTaskResponse> {
     try {
       const response = await axios.post<CancelTaskResponse>(
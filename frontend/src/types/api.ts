@@ -29,6 +29,7 @@ export interface ManimGenerationRequest {
   quality: string;
   historyId: string;
   resolution?: string;
+  bypassCache?: boolean;
 }
 
 export interface ManimGenerationResponse {
@@ -46,6 +47,7 @@ export interface TaskResultResponse {
   timestamp?: string;
   message?: string;
   queue_left?: number;
+  eta_seconds?: number | null;
   data?: {
     success: boolean;
     link?: string;
@@ -76,6 +78,9 @@ export interface TaskResultResponse {
   };
 }
 
+// Keyed by task id, each value shaped like TaskResultResponse
+export type TaskResultBatchResponse = Record<string, TaskResultResponse>;
+
 
 export interface CancelTaskResponse {
   status: "revoked";